@@ -0,0 +1,242 @@
+const express = require('express');
+const cors = require('cors');
+const compression = require('compression');
+const bodyParser = require('body-parser');
+
+const logger = require('./utils/logger');
+const pool = require('./config/database');
+const { getPoolStats, getReplicaPoolStats, replicaPool, warmPool } = pool;
+const { runMigrations } = require('./config/migrate');
+const conditionalGet = require('./middleware/conditionalGet');
+const admissionControl = require('./middleware/admissionControl');
+const dashboardRefresher = require('./utils/dashboardRefresher');
+const tableVersionCompactor = require('./utils/tableVersionCompactor');
+const startup = require('./utils/startup');
+const claimEvents = require('./utils/claimEvents');
+const clusterMode = require('./utils/cluster');
+const metrics = require('./utils/metrics');
+const readRouting = require('./utils/readRouting');
+const requestContext = require('./utils/requestContext');
+const Item = require('./models/Item');
+const userRoutes = require('./routes/userRoutes');
+const guestRoutes = require('./routes/guestRoutes');
+const itemRoutes = require('./routes/itemRoutes');
+const guestItemRoutes = require('./routes/guestItemRoutes');
+const adminRoutes = require('./routes/adminRoutes');
+
+const app = express();
+const PORT = process.env.PORT || 3000;
+
+// X-Forwarded-For is only trusted when TRUST_PROXY is set to the number of
+// proxies in front of the app (1 on Render). Trusting it without a proxy
+// would let clients pick their own req.ip and dodge the per-client rate limit
+const trustProxy = parseInt(process.env.TRUST_PROXY, 10);
+if (trustProxy > 0) {
+  app.set('trust proxy', trustProxy);
+}
+
+// Middleware
+app.use(metrics.middleware);
+app.use(cors({ exposedHeaders: ['ETag', 'X-Primary-Until'] }));
+
+// gzip/brotli negotiated from Accept-Encoding; Server-Sent Event streams are
+// left uncompressed so events are delivered as soon as they are written. The
+// filter runs when the headers are sent, so it goes by the response's type,
+// whatever the client put in Accept
+app.use(compression({
+  filter: (req, res) => {
+    if (String(res.getHeader('Content-Type') || '').startsWith('text/event-stream')) {
+      return false;
+    }
+    return compression.filter(req, res);
+  }
+}));
+app.use(bodyParser.json());
+app.use(bodyParser.urlencoded({ extended: true }));
+
+// Request logging middleware (buffered JSON lines, 2xx/3xx responses sampled)
+app.use(logger.requestLogger);
+
+// Routes
+app.get('/', (req, res) => {
+  res.json({
+    message: 'AZBS Backend API',
+    version: '1.0.0',
+    endpoints: {
+      users: '/api/users',
+      guests: '/api/guests',
+      items: '/api/items',
+      claims: '/api/claims',
+      admin: '/api/admin'
+    }
+  });
+});
+
+// Health check endpoint for monitoring and keep-alive (liveness: answers as
+// soon as the port is bound, without waiting for the database)
+app.get('/health', (req, res) => {
+  res.status(200).json({
+    status: 'healthy',
+    ready: startup.isReady(),
+    timestamp: new Date().toISOString(),
+    uptime: process.uptime(),
+    environment: process.env.NODE_ENV || 'development',
+    database: {
+      pool: getPoolStats(),
+      replica: replicaPool ? { ...readRouting.status(), pool: getReplicaPoolStats() } : null
+    }
+  });
+});
+
+// Prometheus metrics (request rates/latency per route, event loop, heap, pool)
+app.get('/metrics', metrics.handler);
+
+// Readiness: 200 once migrations have run and the pool and caches are warm
+app.get('/ready', (req, res) => {
+  const ready = startup.isReady();
+  res.status(ready ? 200 : 503).json({
+    status: ready ? 'ready' : startup.status().state,
+    timestamp: new Date().toISOString(),
+    startup: startup.status()
+  });
+});
+
+// Shed load (rate limits, pool and in-flight thresholds) before it queues
+app.use('/api', admissionControl);
+
+// API requests that arrive during startup wait for readiness
+app.use('/api', startup.waitUntilReady);
+
+// Per-request context shared with the models (replica pinning, stale sources)
+app.use('/api', requestContext.middleware);
+
+// Read-only model queries go to the read replica (when configured), except in
+// write requests and shortly after the same client wrote
+app.use('/api', readRouting.middleware);
+
+// Conditional GET (ETag / If-None-Match) keyed on the tables each router reads;
+// the item catalog is answered from its cache entries' tags instead
+app.use('/api/users', conditionalGet('users', 'guests', 'guest_items', 'items'), userRoutes);
+app.use('/api/guests', conditionalGet('guests', 'guest_items', 'items'), guestRoutes);
+app.use('/api/items', conditionalGet.cached, itemRoutes);
+app.use('/api/claims', conditionalGet('guest_items', 'items', 'guests'), guestItemRoutes);
+app.use('/api/admin', adminRoutes);
+
+// 404 handler
+app.use((req, res) => {
+  res.status(404).json({
+    success: false,
+    error: 'Route not found'
+  });
+});
+
+// Error handling middleware
+app.use((err, req, res, next) => {
+  logger.error('Unhandled error', { error: err, method: req.method, path: req.originalUrl });
+  res.status(500).json({
+    success: false,
+    error: 'Something went wrong!',
+    message: err.message
+  });
+});
+
+// Startup phases run after the port is bound (STARTUP_MODE=background, the
+// default) or before it (STARTUP_MODE=blocking); each phase is timed and logged
+const STARTUP_MODE = process.env.STARTUP_MODE === 'blocking' ? 'blocking' : 'background';
+
+const initialize = async () => {
+  // In cluster mode the primary migrates once for all workers
+  await startup.phase('migrations', clusterMode.isClusterWorker() ? clusterMode.waitForMigrations : runMigrations);
+  await startup.phase('pool_warmup', warmPool, { optional: true });
+  await startup.phase('replica_check', readRouting.start, { optional: true });
+  await startup.phase('cache_warmup', () => Item.warmCache(), { optional: true });
+  // Once per instance: in cluster mode only worker 0 refreshes the dashboards
+  // and compacts the table write versions
+  if (clusterMode.isLeaderWorker()) {
+    dashboardRefresher.start();
+    tableVersionCompactor.start();
+  }
+  startup.markReady();
+};
+
+let server = null;
+let shuttingDown = false;
+
+const listen = () => new Promise((resolve) => {
+  server = app.listen(PORT, () => {
+    logger.info('Server is running', {
+      port: PORT,
+      api: `http://localhost:${PORT}/api`,
+      startup_mode: STARTUP_MODE,
+      listen_ms: Math.round(process.uptime() * 1000),
+      routes: ['/api/users', '/api/guests', '/api/items', '/api/claims', '/api/admin']
+    });
+    resolve();
+  });
+});
+
+// Initialize database and start server
+const startServer = async () => {
+  try {
+    if (STARTUP_MODE === 'blocking') {
+      await initialize();
+      await listen();
+    } else {
+      await listen();
+      await initialize();
+    }
+  } catch (error) {
+    startup.markFailed(error);
+    logger.error('Failed to start server', error);
+    process.exit(1);
+  }
+};
+
+// Graceful shutdown: stop accepting connections, let in-flight requests finish
+// (up to SHUTDOWN_TIMEOUT_MS), end SSE streams, then release the pool
+const shutdown = async (signal) => {
+  if (shuttingDown) {
+    return;
+  }
+  shuttingDown = true;
+  startup.markDraining();
+  logger.info('Shutting down, draining in-flight requests', { signal });
+
+  dashboardRefresher.stop();
+  tableVersionCompactor.stop();
+  readRouting.stop();
+  claimEvents.close();
+
+  const forceClose = setTimeout(() => {
+    logger.warn('Drain timeout reached, closing remaining connections');
+    if (server) {
+      server.closeAllConnections();
+    }
+  }, clusterMode.shutdownTimeoutMs);
+  forceClose.unref();
+
+  try {
+    if (server) {
+      const closed = new Promise(resolve => server.close(resolve));
+      server.closeIdleConnections();
+      await closed;
+    }
+    clearTimeout(forceClose);
+    await Promise.all([pool.end(), replicaPool && replicaPool.end()]);
+    logger.info('Shutdown complete');
+    process.exit(0);
+  } catch (error) {
+    logger.error('Error during shutdown', error);
+    process.exit(1);
+  }
+};
+
+// Serve requests in this process (a single process, or one cluster worker)
+const start = () => {
+  process.on('SIGTERM', () => shutdown('SIGTERM'));
+  process.on('SIGINT', () => shutdown('SIGINT'));
+  startServer();
+};
+
+module.exports = app;
+module.exports.start = start;
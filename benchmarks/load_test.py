@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""Load and latency benchmark for the AZBS API.
+
+Seeds the database behind a running server with users, guests, items and
+claims (through the API's own bulk endpoints), then drives the real routes
+with concurrent clients and reports throughput and p50/p95/p99 latency per
+scenario:
+
+  browse_items     GET /api/items, /api/items/unclaimed, /api/items/claimed
+  claim_storm      many guests claiming and releasing one hot item at once
+                   (POST /api/claims, DELETE /api/claims/:guest/:number/:item)
+  guest_list       GET /api/guests, following next_cursor through every page
+  dashboard_fanout GET /api/users/:email/dashboard across all seeded users
+
+Results are written as JSON to benchmarks/results/ (named after the git commit)
+so runs can be compared between commits with --compare.
+
+Usage:
+  npm start                                  # in another terminal
+  python3 benchmarks/load_test.py
+  python3 benchmarks/load_test.py --users 50 --guests-per-user 40 --items 500 \\
+      --concurrency 32 --duration 20
+  python3 benchmarks/load_test.py --compare benchmarks/results/<older>.json
+
+Only the Python standard library is required. Seeded rows are prefixed with a
+per-run tag so repeated runs don't collide; pass --reset to TRUNCATE all tables
+first via psql and DATABASE_URL (local databases only!).
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.client import HTTPConnection, HTTPSConnection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, 'results')
+SCENARIOS = ['browse_items', 'claim_storm', 'guest_list', 'dashboard_fanout']
+
+
+# ---------------------------------------------------------------------------
+# HTTP client
+# ---------------------------------------------------------------------------
+
+class Client:
+    """One keep-alive connection; each benchmark thread owns its own."""
+
+    def __init__(self, base_url, timeout=30):
+        parsed = urllib.parse.urlparse(base_url)
+        connection_class = HTTPSConnection if parsed.scheme == 'https' else HTTPConnection
+        self.connection = connection_class(parsed.hostname, parsed.port, timeout=timeout)
+        self.prefix = parsed.path.rstrip('/')
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        headers = {'Accept-Encoding': 'gzip'}
+        if body is not None:
+            if not isinstance(body, (bytes, str)):
+                body = json.dumps(body)
+            headers['Content-Type'] = content_type
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            if response.getheader('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+            return response.status, data
+        except (OSError, ConnectionError):
+            self.connection.close()
+            raise
+
+    def json(self, method, path, body=None, content_type='application/json'):
+        status, data = self.request(method, path, body, content_type)
+        return status, json.loads(data) if data else None
+
+
+def quote(value):
+    return urllib.parse.quote(str(value), safe='')
+
+
+# ---------------------------------------------------------------------------
+# Seeding
+# ---------------------------------------------------------------------------
+
+def reset_database():
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        sys.exit('--reset needs DATABASE_URL in the environment')
+    subprocess.run(
+        ['psql', database_url, '-v', 'ON_ERROR_STOP=1', '-c',
+         'TRUNCATE guest_items, guests, items, users CASCADE'],
+        check=True
+    )
+
+
+def ndjson(rows):
+    return '\n'.join(json.dumps(row) for row in rows) + '\n'
+
+
+def seed(client, args, tag):
+    """Create users, guests, items and claims; returns the generated keys."""
+    started = time.perf_counter()
+
+    users = ['%s-user-%d@bench.local' % (tag, i) for i in range(args.users)]
+    for index, email in enumerate(users):
+        status, body = client.json('POST', '/api/users', {
+            'email': email, 'name': 'Bench User %d' % index, 'password': 'bench', 'role': 'host'
+        })
+        if status != 201:
+            sys.exit('Failed to create user %s: %s %s' % (email, status, body))
+
+    guests = [
+        {'name': '%s-guest-%d-%d' % (tag, u, g), 'number': '%03d%04d' % (u, g),
+         'user_email': email, 'going': g % 5 != 0}
+        for u, email in enumerate(users) for g in range(args.guests_per_user)
+    ]
+    status, body = client.json('POST', '/api/guests/import', ndjson(guests), 'application/x-ndjson')
+    if status != 200:
+        sys.exit('Guest import failed: %s %s' % (status, body))
+
+    hot_item = '%s-hot-item' % tag
+    items = [{'item_name': hot_item, 'item_link': None, 'item_count': args.hot_item_count}]
+    items += [
+        {'item_name': '%s-item-%d' % (tag, i), 'item_link': 'https://example.com/%d' % i,
+         'item_count': random.randint(1, 5)}
+        for i in range(args.items)
+    ]
+    status, body = client.json('POST', '/api/items/import', ndjson(items), 'application/x-ndjson')
+    if status != 200:
+        sys.exit('Item import failed: %s %s' % (status, body))
+
+    # Spread claims over guests in batches; insufficient quantity is expected
+    item_names = [item['item_name'] for item in items[1:]]
+    remaining = args.claims
+    for guest in guests:
+        if remaining <= 0 or not item_names:
+            break
+        batch = random.sample(item_names, min(len(item_names), 3, remaining))
+        remaining -= len(batch)
+        client.json('POST', '/api/claims/batch', {
+            'guest_name': guest['name'], 'guest_number': guest['number'],
+            'items': [{'item_name': name, 'quantity': 1} for name in batch]
+        })
+
+    # The dashboard is a materialized view refreshed in the background
+    deadline = time.time() + args.dashboard_wait
+    while users and time.time() < deadline:
+        status, _ = client.json('GET', '/api/users/%s/dashboard' % quote(users[-1]))
+        if status == 200:
+            break
+        time.sleep(1)
+    else:
+        if users:
+            print('  warning: dashboards not refreshed yet, dashboard_fanout may see 404s')
+
+    print('  seeded %d users, %d guests, %d items in %.1fs' % (
+        len(users), len(guests), len(items), time.perf_counter() - started))
+    return {'users': users, 'guests': guests, 'items': item_names, 'hot_item': hot_item}
+
+
+# ---------------------------------------------------------------------------
+# Scenarios: each returns a list of (label, method, path, body) to issue per
+# iteration, plus the statuses that count as success
+# ---------------------------------------------------------------------------
+
+def browse_items_requests(data, thread_index, iteration):
+    return [
+        ('GET /api/items', 'GET', '/api/items?limit=50', None),
+        ('GET /api/items/unclaimed', 'GET', '/api/items/unclaimed', None),
+        ('GET /api/items/claimed', 'GET', '/api/items/claimed', None),
+    ]
+
+
+def claim_storm_requests(data, thread_index, iteration):
+    # Claim and release the same hot item so its row stays contended for the
+    # whole run instead of selling out in the first second
+    guest = data['guests'][(thread_index * 7919 + iteration) % len(data['guests'])]
+    return [
+        ('POST /api/claims', 'POST', '/api/claims', {
+            'guest_name': guest['name'], 'guest_number': guest['number'],
+            'item_name': data['hot_item'], 'quantity': 1
+        }),
+        ('DELETE /api/claims/:guest/:number/:item', 'DELETE', '/api/claims/%s/%s/%s' % (
+            quote(guest['name']), quote(guest['number']), quote(data['hot_item'])), None),
+    ]
+
+
+def dashboard_fanout_requests(data, thread_index, iteration):
+    email = data['users'][(thread_index + iteration) % len(data['users'])]
+    return [('GET /api/users/:email/dashboard', 'GET', '/api/users/%s/dashboard' % quote(email), None)]
+
+
+SCENARIO_BUILDERS = {
+    'browse_items': browse_items_requests,
+    'claim_storm': claim_storm_requests,
+    'dashboard_fanout': dashboard_fanout_requests,
+}
+
+# 400 = hot item exhausted, 404 = claim already released by another thread;
+# both are correct answers under contention rather than failures
+ACCEPTED_STATUSES = {
+    'claim_storm': {200, 201, 400, 404},
+}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(p / 100.0 * len(sorted_values)))
+    return round(sorted_values[index], 3)
+
+
+def summarize(timings, statuses, errors, elapsed):
+    ordered = sorted(timings)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / elapsed, 1) if elapsed else 0,
+        'mean_ms': round(sum(ordered) / len(ordered), 3) if ordered else None,
+        'p50_ms': percentile(ordered, 50),
+        'p95_ms': percentile(ordered, 95),
+        'p99_ms': percentile(ordered, 99),
+        'max_ms': round(ordered[-1], 3) if ordered else None,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, label, elapsed_ms, status, ok):
+        with self.lock:
+            route = self.routes.setdefault(label, {'timings': [], 'statuses': {}, 'errors': 0})
+            route['timings'].append(elapsed_ms)
+            route['statuses'][status] = route['statuses'].get(status, 0) + 1
+            if not ok:
+                route['errors'] += 1
+
+
+def timed(client, recorder, accepted, label, method, path, body):
+    start = time.perf_counter()
+    try:
+        status, data = client.request(method, path, body)
+    except (OSError, ConnectionError):
+        status, data = 0, None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    ok = status in accepted if accepted else 200 <= status < 300
+    recorder.record(label, elapsed_ms, status, ok)
+    return status, data
+
+
+def guest_list_worker(client, recorder, data, deadline):
+    # Walk every page of the guest list, like an admin screen scrolling through it
+    while time.time() < deadline:
+        path = '/api/guests?limit=100'
+        while time.time() < deadline:
+            status, raw = timed(client, recorder, None, 'GET /api/guests (page)', 'GET', path, None)
+            if status != 200:
+                break
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                break
+            if not body.get('next_cursor'):
+                break
+            path = '/api/guests?limit=100&after=%s' % quote(body['next_cursor'])
+
+
+def run_scenario(name, args, data):
+    recorder = Recorder()
+    accepted = ACCEPTED_STATUSES.get(name)
+    deadline_holder = {}
+
+    def worker(thread_index):
+        client = Client(args.url)
+        deadline = deadline_holder['deadline']
+        if name == 'guest_list':
+            guest_list_worker(client, recorder, data, deadline)
+            return
+        build = SCENARIO_BUILDERS[name]
+        iteration = 0
+        while time.time() < deadline:
+            for label, method, path, body in build(data, thread_index, iteration):
+                timed(client, recorder, accepted, label, method, path, body)
+            iteration += 1
+
+    # Warm-up pass so connection setup and cold caches aren't measured
+    warm_client = Client(args.url)
+    if name in SCENARIO_BUILDERS:
+        for label, method, path, body in SCENARIO_BUILDERS[name](data, 0, 0):
+            if method == 'GET':
+                warm_client.request(method, path, body)
+
+    started = time.perf_counter()
+    deadline_holder['deadline'] = time.time() + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    all_timings, all_statuses, all_errors = [], {}, 0
+    routes = {}
+    for label, route in recorder.routes.items():
+        routes[label] = summarize(route['timings'], route['statuses'], route['errors'], elapsed)
+        all_timings += route['timings']
+        all_errors += route['errors']
+        for code, count in route['statuses'].items():
+            all_statuses[code] = all_statuses.get(code, 0) + count
+
+    result = summarize(all_timings, all_statuses, all_errors, elapsed)
+    result['duration_s'] = round(elapsed, 2)
+    result['concurrency'] = args.concurrency
+    result['routes'] = routes
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_table(results):
+    header = '%-18s %9s %8s %9s %9s %9s %9s' % ('scenario', 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms')
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        print('%-18s %9d %8d %9.1f %9s %9s %9s' % (
+            name, result['requests'], result['errors'], result['throughput_rps'],
+            result['p50_ms'], result['p95_ms'], result['p99_ms']))
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print('\nCompared with %s (commit %s):' % (os.path.basename(baseline_path), baseline.get('commit')))
+    for name, result in results.items():
+        old = baseline.get('scenarios', {}).get(name)
+        if not old:
+            continue
+        parts = []
+        for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if old.get(key) and result.get(key) is not None:
+                change = (result[key] - old[key]) / old[key] * 100
+                parts.append('%s %+.1f%%' % (key, change))
+        print('  %-18s %s' % (name, ', '.join(parts)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load and latency benchmark for the AZBS API')
+    parser.add_argument('--url', default=os.environ.get('BENCH_URL', 'http://localhost:3000'))
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--guests-per-user', type=int, default=25)
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--claims', type=int, default=300)
+    parser.add_argument('--hot-item-count', type=int, default=100,
+                        help='quantity available on the claim_storm item')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='comma-separated subset of: %s' % ', '.join(SCENARIOS))
+    parser.add_argument('--dashboard-wait', type=float, default=30,
+                        help='seconds to wait for the dashboard view to include seeded users')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for generated data')
+    parser.add_argument('--reset', action='store_true', help='TRUNCATE all tables first (psql + DATABASE_URL)')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error('unknown scenario(s): %s' % ', '.join(unknown))
+
+    random.seed(args.seed)
+    client = Client(args.url)
+    status, _ = client.json('GET', '/ready')
+    if status != 200:
+        sys.exit('Server at %s is not ready (GET /ready returned %s)' % (args.url, status))
+
+    if args.reset:
+        print('Resetting database...')
+        reset_database()
+
+    tag = 'bench%d' % int(time.time())
+    print('Seeding (%s)...' % tag)
+    data = seed(client, args, tag)
+
+    results = {}
+    for name in scenarios:
+        print('Running %s for %ss at concurrency %d...' % (name, args.duration, args.concurrency))
+        results[name] = run_scenario(name, args, data)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'url': args.url,
+        'config': {
+            'users': args.users, 'guests_per_user': args.guests_per_user, 'items': args.items,
+            'claims': args.claims, 'hot_item_count': args.hot_item_count,
+            'concurrency': args.concurrency, 'duration_s': args.duration, 'seed': args.seed,
+        },
+        'scenarios': results,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, '%s-%s.json' % (
+            datetime.now().strftime('%Y%m%d-%H%M%S'), commit))
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print_table(results)
+    print('\nResults written to %s' % output)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
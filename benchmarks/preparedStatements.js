@@ -0,0 +1,99 @@
+// Compare latency of the hot model lookups sent as plain text queries versus
+// named prepared statements.
+//
+// Usage: npm run bench:prepared
+//   BENCH_ITERATIONS  queries per statement and mode (default 2000)
+//
+// Uses DATABASE_URL like the server. Runs on a single connection so both modes
+// see the same network path; lookup keys are taken from existing rows where
+// available (a missing key still exercises parse/plan/execute).
+
+const pool = require('../config/database');
+const { statements } = require('../models/statements');
+
+const ITERATIONS = parseInt(process.env.BENCH_ITERATIONS, 10) || 2000;
+const WARMUP = Math.min(100, ITERATIONS);
+
+const percentile = (sorted, p) =>
+  sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+
+const summarize = (timings) => {
+  const sorted = [...timings].sort((a, b) => a - b);
+  const total = sorted.reduce((sum, t) => sum + t, 0);
+  return {
+    mean_ms: +(total / sorted.length).toFixed(3),
+    p50_ms: +percentile(sorted, 50).toFixed(3),
+    p95_ms: +percentile(sorted, 95).toFixed(3),
+    p99_ms: +percentile(sorted, 99).toFixed(3)
+  };
+};
+
+const run = async (client, config) => {
+  for (let i = 0; i < WARMUP; i++) {
+    await client.query(config);
+  }
+  const timings = [];
+  for (let i = 0; i < ITERATIONS; i++) {
+    const start = process.hrtime.bigint();
+    await client.query(config);
+    timings.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  return summarize(timings);
+};
+
+const sampleParams = async (client) => {
+  const user = await client.query('SELECT email FROM users LIMIT 1');
+  const guest = await client.query('SELECT name, number FROM guests LIMIT 1');
+  const item = await client.query('SELECT item_name FROM items LIMIT 1');
+
+  const email = user.rows[0] ? user.rows[0].email : 'bench@example.com';
+  const guestKey = guest.rows[0] ? [guest.rows[0].name, guest.rows[0].number] : ['Bench Guest', '000'];
+  const itemName = item.rows[0] ? item.rows[0].item_name : 'Bench Item';
+
+  return {
+    users_find_by_email: [email],
+    users_find_credentials: [email],
+    guests_find_by_key: guestKey,
+    items_find_by_name: [itemName],
+    items_get_availability: [itemName],
+    guest_items_find_by_guest: guestKey,
+    guest_items_find_by_item: [itemName]
+  };
+};
+
+const main = async () => {
+  const client = await pool.connect();
+  const results = {};
+
+  try {
+    const params = await sampleParams(client);
+
+    for (const [name, text] of Object.entries(statements)) {
+      const values = params[name];
+      const unprepared = await run(client, { text, values });
+      const preparedResult = await run(client, { name: `bench_${name}`, text, values });
+      results[name] = {
+        unprepared,
+        prepared: preparedResult,
+        mean_speedup: +(unprepared.mean_ms / preparedResult.mean_ms).toFixed(2)
+      };
+    }
+  } finally {
+    client.release();
+    await pool.end();
+  }
+
+  console.table(Object.fromEntries(Object.entries(results).map(([name, r]) => [name, {
+    'unprepared p50': r.unprepared.p50_ms,
+    'prepared p50': r.prepared.p50_ms,
+    'unprepared p95': r.unprepared.p95_ms,
+    'prepared p95': r.prepared.p95_ms,
+    'speedup (mean)': r.mean_speedup
+  }])));
+  console.log(JSON.stringify({ iterations: ITERATIONS, results }, null, 2));
+};
+
+main().catch((error) => {
+  console.error('Benchmark failed:', error);
+  process.exit(1);
+});
@@ -1,27 +1,106 @@
 const { Pool } = require('pg');
 require('dotenv').config();
+const logger = require('../utils/logger');
+const { instrumentPool } = require('../utils/queryStats');
 
 // Validate required environment variable
 if (!process.env.DATABASE_URL) {
-  console.error('ERROR: DATABASE_URL environment variable is not set!');
-  console.error('Please create a .env file with your database connection string.');
+  logger.error('DATABASE_URL environment variable is not set! Please create a .env file with your database connection string.');
   process.exit(1);
 }
 
-const pool = new Pool({
-  connectionString: process.env.DATABASE_URL,
-  ssl: {
+const envInt = (name, fallback) => {
+  const value = parseInt(process.env[name], 10);
+  return Number.isNaN(value) ? fallback : value;
+};
+
+// In cluster mode DB_POOL_MAX is the connection budget for the whole instance
+// and is split evenly across the workers (CLUSTER_WORKER_COUNT is set by the
+// primary in utils/cluster.js when it forks them). One connection of each
+// process's share is kept for the claim event LISTEN connection
+// (utils/claimEvents.js), which is opened outside the pool
+const workerCount = envInt('CLUSTER_WORKER_COUNT', 1);
+const LISTEN_CONNECTIONS = 1;
+const poolMax = Math.max(1, Math.floor(envInt('DB_POOL_MAX', 10) / Math.max(1, workerCount)) - LISTEN_CONNECTIONS);
+
+const poolOptions = (connectionString, max) => ({
+  connectionString,
+  ssl: process.env.DB_SSL === 'false' ? false : {
     rejectUnauthorized: false
-  }
+  },
+  max,
+  min: Math.min(envInt('DB_POOL_MIN', 0), max),
+  idleTimeoutMillis: envInt('DB_IDLE_TIMEOUT_MS', 30000),
+  connectionTimeoutMillis: envInt('DB_CONNECTION_TIMEOUT_MS', 10000),
+  statement_timeout: envInt('DB_STATEMENT_TIMEOUT_MS', 15000),
+  application_name: process.env.DB_APPLICATION_NAME || 'azbs_backend'
 });
 
+const pool = new Pool(poolOptions(process.env.DATABASE_URL, poolMax));
+
+// Optional read replica for read-only model methods (routing and lag checks
+// live in utils/readRouting.js). DB_REPLICA_POOL_MAX is split like DB_POOL_MAX
+const replicaPool = process.env.DATABASE_REPLICA_URL
+  ? new Pool(poolOptions(
+    process.env.DATABASE_REPLICA_URL,
+    Math.max(1, Math.floor(envInt('DB_REPLICA_POOL_MAX', envInt('DB_POOL_MAX', 10)) / Math.max(1, workerCount)))
+  ))
+  : null;
+
+// Per-method query timings and slow query log (GET /api/admin/query-stats)
+instrumentPool(pool);
+if (replicaPool) {
+  instrumentPool(replicaPool);
+  replicaPool.on('error', (err) => {
+    logger.error('Unexpected error on idle replica client', err);
+  });
+}
+
 pool.on('connect', () => {
-  console.log('Connected to PostgreSQL database');
+  logger.debug('Connected to PostgreSQL database', { pool_total: pool.totalCount });
 });
 
+// An idle client lost its connection (e.g. the database restarted). The pool
+// has already discarded it and will open a fresh one on the next checkout.
 pool.on('error', (err) => {
-  console.error('Unexpected error on idle client', err);
-  process.exit(-1);
+  logger.error('Unexpected error on idle client', err);
 });
 
+// Pool saturation counters for /health
+const statsFor = target => ({
+  total: target.totalCount,
+  idle: target.idleCount,
+  waiting: target.waitingCount,
+  max: target.options.max
+});
+
+const getPoolStats = () => statsFor(pool);
+
+// Same counters for the replica pool (null without DATABASE_REPLICA_URL)
+const getReplicaPoolStats = () => (replicaPool ? statsFor(replicaPool) : null);
+
+// Open `count` connections up front (capped at the pool size) so the first
+// requests after a cold start don't each pay for a TLS handshake and login
+const warmPool = async (count = envInt('DB_POOL_WARM', 2)) => {
+  const target = Math.min(count, pool.options.max);
+  const clients = [];
+  try {
+    for (let i = 0; i < target; i++) {
+      clients.push(pool.connect());
+    }
+    const connected = await Promise.all(clients);
+    await Promise.all(connected.map(client => client.query('SELECT 1')));
+    return connected.length;
+  } finally {
+    const settled = await Promise.allSettled(clients);
+    settled
+      .filter(result => result.status === 'fulfilled')
+      .forEach(result => result.value.release());
+  }
+};
+
 module.exports = pool;
+module.exports.getPoolStats = getPoolStats;
+module.exports.warmPool = warmPool;
+module.exports.replicaPool = replicaPool;
+module.exports.getReplicaPoolStats = getReplicaPoolStats;
@@ -0,0 +1,218 @@
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const pool = require('./database');
+const logger = require('../utils/logger');
+
+// Versioned schema migrations.
+//
+// Each file in migrations/ named NNN_description.sql is one migration, applied
+// in version order inside its own transaction and recorded in schema_migrations
+// with a checksum of its contents. Applied migrations must not be edited: a
+// checksum mismatch stops startup instead of silently diverging schemas.
+//
+// Startup cost when the database is already at head is a single SELECT. Only
+// when something is pending does the runner take a session advisory lock, so
+// instances booting at the same time apply each migration exactly once and the
+// rest wait, re-check and find nothing to do. In cluster mode the primary runs
+// this file once (as `node config/migrate.js`) and the workers wait for it.
+//
+// Destructive one-off changes live in migrations/optional/ and only run when
+// asked for; they are not recorded in schema_migrations.
+//
+//   npm run migrate                        apply pending migrations and exit
+//   npm run migrate:drop-legacy-columns    run migrations/optional/drop_legacy_columns.sql
+
+const MIGRATIONS_DIR = path.join(__dirname, '..', 'migrations');
+const MIGRATION_FILE = /^(\d+)_([\w-]+)\.sql$/;
+const ADVISORY_LOCK_KEY = 7302;
+
+const checksum = (sql) => crypto
+  .createHash('sha256')
+  .update(sql.replace(/\r\n/g, '\n'))
+  .digest('hex');
+
+// Read migrations/ into [{ version, name, sql, checksum }] ordered by version
+const loadMigrations = () => {
+  const migrations = fs.readdirSync(MIGRATIONS_DIR)
+    .map(file => MIGRATION_FILE.exec(file))
+    .filter(Boolean)
+    .map(([file, version, name]) => {
+      const sql = fs.readFileSync(path.join(MIGRATIONS_DIR, file), 'utf8');
+      return { version: parseInt(version, 10), name, file, sql, checksum: checksum(sql) };
+    })
+    .sort((a, b) => a.version - b.version);
+
+  migrations.forEach((migration, index) => {
+    if (index > 0 && migrations[index - 1].version === migration.version) {
+      throw new Error(`Duplicate migration version ${migration.version}: ${migrations[index - 1].file}, ${migration.file}`);
+    }
+  });
+  return migrations;
+};
+
+// Applied migrations keyed by version; empty before the first run
+const fetchApplied = async (client) => {
+  try {
+    const result = await client.query(
+      'SELECT version, name, checksum, applied_at, execution_ms FROM schema_migrations ORDER BY version'
+    );
+    return new Map(result.rows.map(row => [row.version, row]));
+  } catch (error) {
+    if (error.code === '42P01') {
+      return new Map();
+    }
+    throw error;
+  }
+};
+
+// Compare files against the applied rows; throws on an edited migration
+const pendingMigrations = (migrations, applied) => {
+  migrations.forEach((migration) => {
+    const row = applied.get(migration.version);
+    if (row && row.checksum !== migration.checksum) {
+      const error = new Error(
+        `Migration ${migration.file} has changed since it was applied (checksum mismatch). ` +
+        'Add a new migration instead of editing an applied one.'
+      );
+      error.code = 'MIGRATION_CHECKSUM_MISMATCH';
+      throw error;
+    }
+  });
+  return migrations.filter(migration => !applied.has(migration.version));
+};
+
+const applyMigration = async (client, migration) => {
+  const start = Date.now();
+  await client.query('BEGIN');
+  try {
+    // DDL on a large table must not be cut off by the pool's statement timeout
+    await client.query('SET LOCAL statement_timeout = 0');
+    await client.query(migration.sql);
+    const executionMs = Date.now() - start;
+    await client.query(
+      `INSERT INTO schema_migrations (version, name, checksum, execution_ms)
+       VALUES ($1, $2, $3, $4)`,
+      [migration.version, migration.name, migration.checksum, executionMs]
+    );
+    await client.query('COMMIT');
+    logger.info('Migration applied', { version: migration.version, name: migration.name, duration_ms: executionMs });
+  } catch (error) {
+    await client.query('ROLLBACK');
+    error.message = `Migration ${migration.file} failed: ${error.message}`;
+    throw error;
+  }
+};
+
+// Run fn(client) while holding the migration advisory lock. The wait for the
+// lock (another instance migrating) must not hit the pool's statement timeout
+const withMigrationLock = async (fn) => {
+  const client = await pool.connect();
+  try {
+    await client.query('SET statement_timeout = 0');
+    await client.query('SELECT pg_advisory_lock($1)', [ADVISORY_LOCK_KEY]);
+    try {
+      return await fn(client);
+    } finally {
+      await client.query('SELECT pg_advisory_unlock($1)', [ADVISORY_LOCK_KEY]);
+    }
+  } finally {
+    try {
+      await client.query('RESET statement_timeout');
+      client.release();
+    } catch (error) {
+      // Don't return a broken connection to the pool
+      client.release(error);
+    }
+  }
+};
+
+// Bring the database up to the latest migration
+const runMigrations = async () => {
+  const migrations = loadMigrations();
+
+  // Fast path: one query when every migration is already applied
+  const applied = await fetchApplied(pool);
+  if (pendingMigrations(migrations, applied).length === 0) {
+    logger.info('Database schema is up to date', { version: migrations.length ? migrations[migrations.length - 1].version : 0 });
+    return { applied: [] };
+  }
+
+  return withMigrationLock(async (client) => {
+    await client.query(`
+      CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        execution_ms INTEGER
+      );
+    `);
+
+    // Another instance may have migrated while we waited for the lock
+    const current = await fetchApplied(client);
+    const known = new Set(migrations.map(migration => migration.version));
+    const unknown = [...current.keys()].filter(version => !known.has(version));
+    if (unknown.length > 0) {
+      logger.warn('Database has migrations not present in this build', { versions: unknown });
+    }
+
+    const pending = pendingMigrations(migrations, current);
+    for (const migration of pending) {
+      await applyMigration(client, migration);
+    }
+    logger.info('Database migrations complete', { applied: pending.length });
+    return { applied: pending.map(migration => migration.version) };
+  });
+};
+
+// Run a one-off SQL file (e.g. migrations/optional/*.sql) in one transaction
+// under the migration lock
+const runScript = async (file) => {
+  const sql = fs.readFileSync(path.resolve(file), 'utf8');
+
+  return withMigrationLock(async (client) => {
+    const start = Date.now();
+    await client.query('BEGIN');
+    try {
+      await client.query(sql);
+      await client.query('COMMIT');
+    } catch (error) {
+      await client.query('ROLLBACK');
+      error.message = `Script ${file} failed: ${error.message}`;
+      throw error;
+    }
+    logger.info('Script applied', { file, duration_ms: Date.now() - start });
+  });
+};
+
+// Applied and pending migrations, for GET /api/admin/migrations
+const getMigrationStatus = async () => {
+  const migrations = loadMigrations();
+  const applied = await fetchApplied(pool);
+
+  return migrations.map((migration) => {
+    const row = applied.get(migration.version);
+    return {
+      version: migration.version,
+      name: migration.name,
+      status: !row ? 'pending' : row.checksum === migration.checksum ? 'applied' : 'modified',
+      applied_at: row ? row.applied_at : null,
+      execution_ms: row ? row.execution_ms : null
+    };
+  });
+};
+
+module.exports = { runMigrations, runScript, getMigrationStatus, loadMigrations };
+
+if (require.main === module) {
+  const scriptIndex = process.argv.indexOf('--script');
+  const task = scriptIndex === -1 ? runMigrations() : runScript(process.argv[scriptIndex + 1]);
+  task
+    .then(() => pool.end())
+    .catch((error) => {
+      logger.error('Migration failed', error);
+      process.exitCode = 1;
+      return pool.end();
+    });
+}
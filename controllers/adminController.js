@@ -1,49 +1,8 @@
 const pool = require('../config/database');
-
-// Update database schema - Add number column to users table
-const updateUserSchema = async (req, res) => {
-  const client = await pool.connect();
-  
-  try {
-    console.log('Starting database schema update...');
-    
-    // Add number column to users table
-    await client.query(`
-      ALTER TABLE users 
-      ADD COLUMN IF NOT EXISTS number VARCHAR(50);
-    `);
-    
-    // Verify the column was added
-    const result = await client.query(`
-      SELECT column_name, data_type, character_maximum_length
-      FROM information_schema.columns
-      WHERE table_name = 'users'
-      ORDER BY ordinal_position;
-    `);
-    
-    console.log('Users table updated successfully');
-    
-    res.json({
-      success: true,
-      message: 'Users table updated successfully - number column added',
-      schema: result.rows.map(col => ({
-        column: col.column_name,
-        type: col.data_type,
-        max_length: col.character_maximum_length
-      }))
-    });
-    
-  } catch (error) {
-    console.error('Error updating schema:', error);
-    res.status(500).json({
-      success: false,
-      error: 'Failed to update database schema',
-      details: error.message
-    });
-  } finally {
-    client.release();
-  }
-};
+const logger = require('../utils/logger');
+const Item = require('../models/Item');
+const { getMigrationStatus } = require('../config/migrate');
+const queryStats = require('../utils/queryStats');
 
 // Health check for database connection
 const checkDatabase = async (req, res) => {
@@ -57,7 +16,7 @@ const checkDatabase = async (req, res) => {
       version: result.rows[0].version.split(' ')[0] + ' ' + result.rows[0].version.split(' ')[1]
     });
   } catch (error) {
-    console.error('Database connection error:', error);
+    logger.error('Database connection error', error);
     res.status(500).json({
       success: false,
       error: 'Database connection failed',
@@ -66,6 +25,14 @@ const checkDatabase = async (req, res) => {
   }
 };
 
+// Get per-method query timings over the rolling window (slowest total time first)
+const getQueryStats = async (req, res) => {
+  res.json({
+    success: true,
+    ...queryStats.snapshot()
+  });
+};
+
 // Get current database schema for users table
 const getUserSchema = async (req, res) => {
   try {
@@ -87,7 +54,7 @@ const getUserSchema = async (req, res) => {
       }))
     });
   } catch (error) {
-    console.error('Error fetching schema:', error);
+    logger.error('Error fetching schema', error);
     res.status(500).json({
       success: false,
       error: 'Failed to fetch schema',
@@ -96,283 +63,39 @@ const getUserSchema = async (req, res) => {
   }
 };
 
-// Migrate to new schema (remove claimed_item from guests, restructure items, add guest_items table)
-const migrateToNewSchema = async (req, res) => {
-  const client = await pool.connect();
-  
-  try {
-    console.log('Starting database schema migration...');
-    await client.query('BEGIN');
-    
-    // Step 1: Create guest_items junction table if it doesn't exist
-    console.log('1. Creating guest_items junction table...');
-    await client.query(`
-      CREATE TABLE IF NOT EXISTS guest_items (
-        guest_name VARCHAR(255) NOT NULL,
-        guest_number VARCHAR(50) NOT NULL,
-        item_name VARCHAR(255) NOT NULL,
-        quantity_claimed INTEGER DEFAULT 1,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        PRIMARY KEY (guest_name, guest_number, item_name),
-        FOREIGN KEY (guest_name, guest_number) REFERENCES guests(name, number) ON DELETE CASCADE,
-        FOREIGN KEY (item_name) REFERENCES items(item_name) ON DELETE CASCADE
-      );
-    `);
-    
-    // Step 2: Add claimed_count to items if it doesn't exist
-    console.log('2. Adding claimed_count column to items table...');
-    await client.query(`
-      ALTER TABLE items 
-      ADD COLUMN IF NOT EXISTS claimed_count INTEGER DEFAULT 0;
-    `);
-    
-    // Step 3: Drop old columns from items table
-    console.log('3. Removing old columns from items table...');
-    await client.query(`
-      ALTER TABLE items 
-      DROP COLUMN IF EXISTS claimed CASCADE,
-      DROP COLUMN IF EXISTS guest_name CASCADE,
-      DROP COLUMN IF EXISTS guest_number CASCADE;
-    `);
-    
-    // Step 4: Remove claimed_item from guests table
-    console.log('4. Removing claimed_item column from guests table...');
-    await client.query(`
-      ALTER TABLE guests 
-      DROP COLUMN IF EXISTS claimed_item CASCADE;
-    `);
-    
-    // Step 5: Create indexes
-    console.log('5. Creating indexes...');
-    await client.query(`
-      CREATE INDEX IF NOT EXISTS idx_guest_items_guest ON guest_items(guest_name, guest_number);
-    `);
-    await client.query(`
-      CREATE INDEX IF NOT EXISTS idx_guest_items_item ON guest_items(item_name);
-    `);
-    
-    await client.query('COMMIT');
-    
-    // Get updated schemas
-    const guestsSchema = await client.query(`
-      SELECT column_name, data_type 
-      FROM information_schema.columns 
-      WHERE table_name = 'guests'
-      ORDER BY ordinal_position;
-    `);
-    
-    const itemsSchema = await client.query(`
-      SELECT column_name, data_type 
-      FROM information_schema.columns 
-      WHERE table_name = 'items'
-      ORDER BY ordinal_position;
-    `);
-    
-    const guestItemsSchema = await client.query(`
-      SELECT column_name, data_type 
-      FROM information_schema.columns 
-      WHERE table_name = 'guest_items'
-      ORDER BY ordinal_position;
-    `);
-    
-    console.log('Migration completed successfully');
-    
-    res.json({
-      success: true,
-      message: 'Database schema migrated successfully',
-      changes: {
-        guests: 'Removed claimed_item column',
-        items: 'Removed claimed, guest_name, guest_number; Added claimed_count',
-        guest_items: 'Created new junction table'
-      },
-      schemas: {
-        guests: guestsSchema.rows,
-        items: itemsSchema.rows,
-        guest_items: guestItemsSchema.rows
-      }
-    });
-    
-  } catch (error) {
-    await client.query('ROLLBACK');
-    console.error('Migration failed:', error);
-    res.status(500).json({
-      success: false,
-      error: 'Failed to migrate database schema',
-      details: error.message
-    });
-  } finally {
-    client.release();
-  }
-};
-
-// Add going column to guests table
-const addGuestGoingColumn = async (req, res) => {
-  const client = await pool.connect();
-  
-  try {
-    console.log('Adding going column to guests table...');
-    
-    await client.query(`
-      ALTER TABLE guests 
-      ADD COLUMN IF NOT EXISTS going BOOLEAN DEFAULT FALSE;
-    `);
-    
-    // Verify the column was added
-    const result = await client.query(`
-      SELECT column_name, data_type 
-      FROM information_schema.columns 
-      WHERE table_name = 'guests'
-      ORDER BY ordinal_position;
-    `);
-    
-    console.log('Going column added successfully');
-    
-    res.json({
-      success: true,
-      message: 'Guests table updated successfully - going column added (default: false)',
-      schema: result.rows
-    });
-    
-  } catch (error) {
-    console.error('Error adding going column:', error);
-    res.status(500).json({
-      success: false,
-      error: 'Failed to add going column',
-      details: error.message
-    });
-  } finally {
-    client.release();
-  }
-};
-
-// Update going column default to false and set all existing guests to false
-const updateGuestGoingDefault = async (req, res) => {
-  const client = await pool.connect();
-  
-  try {
-    console.log('Updating going column default to false...');
-    
-    // Change column default to false
-    await client.query(`
-      ALTER TABLE guests 
-      ALTER COLUMN going SET DEFAULT FALSE;
-    `);
-    
-    // Update all existing guests to going = false
-    const updateResult = await client.query(`
-      UPDATE guests 
-      SET going = FALSE 
-      WHERE going = TRUE;
-    `);
-    
-    console.log(`Updated ${updateResult.rowCount} guests to going = false`);
-    
-    res.json({
-      success: true,
-      message: `Going column default changed to false. Updated ${updateResult.rowCount} existing guests.`,
-      updated_count: updateResult.rowCount
-    });
-    
-  } catch (error) {
-    console.error('Error updating going column default:', error);
-    res.status(500).json({
-      success: false,
-      error: 'Failed to update going column default',
-      details: error.message
-    });
-  } finally {
-    client.release();
-  }
+// Get in-process cache statistics (hit/miss counters)
+const getCacheStats = async (req, res) => {
+  res.json({
+    success: true,
+    caches: [Item.cacheStats()],
+    coalescing: [Item.coalescingStats()]
+  });
 };
 
-// Remove item_photo column from items table
-const removeItemPhotoColumn = async (req, res) => {
-  const client = await pool.connect();
-  
+// Get applied / pending schema migrations
+const getMigrations = async (req, res) => {
   try {
-    console.log('Removing item_photo column from items table...');
-    
-    await client.query(`
-      ALTER TABLE items 
-      DROP COLUMN IF EXISTS item_photo;
-    `);
-    
-    // Verify the column was removed
-    const result = await client.query(`
-      SELECT column_name, data_type 
-      FROM information_schema.columns 
-      WHERE table_name = 'items'
-      ORDER BY ordinal_position;
-    `);
-    
-    console.log('item_photo column removed successfully');
-    
+    const migrations = await getMigrationStatus();
     res.json({
       success: true,
-      message: 'Items table updated successfully - item_photo column removed',
-      schema: result.rows
+      pending: migrations.filter(migration => migration.status === 'pending').length,
+      migrations
     });
-    
-  } catch (error) {
-    console.error('Error removing item_photo column:', error);
-    res.status(500).json({
-      success: false,
-      error: 'Failed to remove item_photo column',
-      details: error.message
-    });
-  } finally {
-    client.release();
-  }
-};
-
-// Update going column default to true and set all existing guests to true
-const setGoingDefaultTrue = async (req, res) => {
-  const client = await pool.connect();
-  
-  try {
-    console.log('Updating going column default to true...');
-    
-    // Change column default to true
-    await client.query(`
-      ALTER TABLE guests 
-      ALTER COLUMN going SET DEFAULT TRUE;
-    `);
-    
-    // Update all existing guests to going = true (optional, only if requested)
-    const updateResult = await client.query(`
-      UPDATE guests 
-      SET going = TRUE 
-      WHERE going = FALSE;
-    `);
-    
-    console.log(`Updated ${updateResult.rowCount} guests to going = true`);
-    
-    res.json({
-      success: true,
-      message: `Going column default changed to true. Updated ${updateResult.rowCount} existing guests.`,
-      updated_count: updateResult.rowCount
-    });
-    
   } catch (error) {
-    console.error('Error updating going column default:', error);
+    logger.error('Error reading migration status', error);
     res.status(500).json({
       success: false,
-      error: 'Failed to update going column default',
+      error: 'Failed to read migration status',
       details: error.message
     });
-  } finally {
-    client.release();
   }
 };
 
 module.exports = {
-  updateUserSchema,
   checkDatabase,
+  getQueryStats,
   getUserSchema,
-  migrateToNewSchema,
-  addGuestGoingColumn,
-  updateGuestGoingDefault,
-  removeItemPhotoColumn,
-  setGoingDefaultTrue
+  getCacheStats,
+  getMigrations
 };
 
@@ -1,16 +1,39 @@
 const Guest = require('../models/Guest');
+const User = require('../models/User');
+const { detectImportFormat, isBodyConsumed } = require('../utils/bulkImport');
+const { parseListOptions } = require('../utils/pagination');
+const { streamJsonArray } = require('../utils/responseStream');
+const logger = require('../utils/logger');
+
+// Guest search (autocomplete) limits
+const SEARCH_DEFAULT_LIMIT = 10;
+const SEARCH_MAX_LIMIT = 50;
+const SEARCH_MAX_QUERY_LENGTH = 100;
 
 // Get all guests
 const getAllGuests = async (req, res) => {
   try {
-    const guests = await Guest.findAll();
+    // ?stream=true returns the full list incrementally instead of one page
+    if (req.query.stream === 'true') {
+      return await streamJsonArray(res, Guest.streamAll());
+    }
+    
+    const listOptions = parseListOptions(req.query, Guest.LIST_FIELDS, Guest.KEY_COLUMNS);
+    const { rows: guests, nextCursor } = await Guest.findAll(listOptions);
     res.json({
       success: true,
       count: guests.length,
+      next_cursor: nextCursor,
       data: guests
     });
   } catch (error) {
-    console.error('Error getting guests:', error);
+    logger.error('Error getting guests', error);
+    if (error.code === 'INVALID_LIST_OPTIONS') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guests'
@@ -36,7 +59,7 @@ const getGuest = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error getting guest:', error);
+    logger.error('Error getting guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guest'
@@ -62,7 +85,7 @@ const getGuestWithItems = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error getting guest with items:', error);
+    logger.error('Error getting guest with items', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guest with items'
@@ -82,7 +105,7 @@ const getGuestsByUser = async (req, res) => {
       data: guests
     });
   } catch (error) {
-    console.error('Error getting guests by user:', error);
+    logger.error('Error getting guests by user', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guests'
@@ -90,6 +113,65 @@ const getGuestsByUser = async (req, res) => {
   }
 };
 
+// Search guests by name or phone number (?q=, optional limit, mode=prefix|fuzzy, user_email)
+const searchGuests = async (req, res) => {
+  try {
+    const query = typeof req.query.q === 'string' ? req.query.q.trim() : '';
+    
+    if (!query) {
+      return res.status(400).json({
+        success: false,
+        error: 'Search query q is required'
+      });
+    }
+    
+    if (query.length > SEARCH_MAX_QUERY_LENGTH) {
+      return res.status(400).json({
+        success: false,
+        error: `Search query must be at most ${SEARCH_MAX_QUERY_LENGTH} characters`
+      });
+    }
+    
+    const mode = req.query.mode || 'fuzzy';
+    if (mode !== 'prefix' && mode !== 'fuzzy') {
+      return res.status(400).json({
+        success: false,
+        error: 'mode must be prefix or fuzzy'
+      });
+    }
+    
+    let limit = SEARCH_DEFAULT_LIMIT;
+    if (req.query.limit !== undefined) {
+      limit = parseInt(req.query.limit, 10);
+      if (!Number.isInteger(limit) || limit < 1) {
+        return res.status(400).json({
+          success: false,
+          error: 'limit must be a positive integer'
+        });
+      }
+      limit = Math.min(limit, SEARCH_MAX_LIMIT);
+    }
+    
+    const guests = await Guest.search(query, {
+      limit,
+      mode,
+      userEmail: req.query.user_email || null
+    });
+    
+    res.json({
+      success: true,
+      count: guests.length,
+      data: guests
+    });
+  } catch (error) {
+    logger.error('Error searching guests', error);
+    res.status(500).json({
+      success: false,
+      error: 'Server error while searching guests'
+    });
+  }
+};
+
 // Create guest
 const createGuest = async (req, res) => {
   try {
@@ -109,7 +191,7 @@ const createGuest = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error creating guest:', error);
+    logger.error('Error creating guest', error);
     if (error.code === '23505') {
       return res.status(409).json({
         success: false,
@@ -129,6 +211,65 @@ const createGuest = async (req, res) => {
   }
 };
 
+// Bulk import guests from a CSV or NDJSON request body
+const importGuests = async (req, res) => {
+  try {
+    const format = detectImportFormat(req);
+    
+    if (!format) {
+      return res.status(415).json({
+        success: false,
+        error: 'Send the guest list as text/csv or application/x-ndjson (or pass ?format=csv|ndjson)'
+      });
+    }
+
+    // A JSON or form Content-Type lets the body parsers read the upload first
+    if (isBodyConsumed(req)) {
+      return res.status(415).json({
+        success: false,
+        error: 'Send the guest list with Content-Type text/csv or application/x-ndjson, not JSON or form data'
+      });
+    }
+    
+    const defaultUserEmail = req.query.user_email || null;
+    
+    if (defaultUserEmail && !(await User.findByEmail(defaultUserEmail))) {
+      return res.status(400).json({
+        success: false,
+        error: 'User email does not exist'
+      });
+    }
+    
+    const summary = await Guest.bulkImport(req, { format, defaultUserEmail });
+    
+    res.json({
+      success: true,
+      data: summary,
+      message: `Imported ${summary.inserted} new and updated ${summary.updated} existing guest(s); ${summary.rejected} row(s) rejected`
+    });
+  } catch (error) {
+    logger.error('Error importing guests', error);
+    if (error.code === 'INVALID_IMPORT') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
+    // Bad rows are rejected individually; a data exception here means the upload itself is unreadable
+    if (error.code && error.code.startsWith('22')) {
+      return res.status(400).json({
+        success: false,
+        error: 'Malformed import data',
+        details: error.message
+      });
+    }
+    res.status(500).json({
+      success: false,
+      error: 'Server error while importing guests'
+    });
+  }
+};
+
 // Update guest
 const updateGuest = async (req, res) => {
   try {
@@ -149,7 +290,7 @@ const updateGuest = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error updating guest:', error);
+    logger.error('Error updating guest', error);
     if (error.code === '23503') {
       return res.status(400).json({
         success: false,
@@ -182,7 +323,7 @@ const deleteGuest = async (req, res) => {
       message: 'Guest deleted successfully'
     });
   } catch (error) {
-    console.error('Error deleting guest:', error);
+    logger.error('Error deleting guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting guest'
@@ -195,7 +336,9 @@ module.exports = {
   getGuest,
   getGuestWithItems,
   getGuestsByUser,
+  searchGuests,
   createGuest,
+  importGuests,
   updateGuest,
   deleteGuest
 };
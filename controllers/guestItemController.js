@@ -1,16 +1,32 @@
 const GuestItem = require('../models/GuestItem');
+const { parseListOptions } = require('../utils/pagination');
+const { streamJsonArray } = require('../utils/responseStream');
+const logger = require('../utils/logger');
 
 // Get all claims
 const getAllClaims = async (req, res) => {
   try {
-    const claims = await GuestItem.findAll();
+    // ?stream=true returns the full list incrementally instead of one page
+    if (req.query.stream === 'true') {
+      return await streamJsonArray(res, GuestItem.streamAll());
+    }
+    
+    const listOptions = parseListOptions(req.query, GuestItem.LIST_FIELDS, GuestItem.KEY_COLUMNS);
+    const { rows: claims, nextCursor } = await GuestItem.findAll(listOptions);
     res.json({
       success: true,
       count: claims.length,
+      next_cursor: nextCursor,
       data: claims
     });
   } catch (error) {
-    console.error('Error getting claims:', error);
+    logger.error('Error getting claims', error);
+    if (error.code === 'INVALID_LIST_OPTIONS') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while fetching claims'
@@ -30,7 +46,7 @@ const getClaimsByGuest = async (req, res) => {
       data: claims
     });
   } catch (error) {
-    console.error('Error getting claims by guest:', error);
+    logger.error('Error getting claims by guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guest claims'
@@ -50,7 +66,7 @@ const getClaimsByItem = async (req, res) => {
       data: claims
     });
   } catch (error) {
-    console.error('Error getting claims by item:', error);
+    logger.error('Error getting claims by item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching item claims'
@@ -70,20 +86,43 @@ const createClaim = async (req, res) => {
       });
     }
     
+    const requestedQty = quantity === undefined ? 1 : Number(quantity);
+    
+    if (!Number.isInteger(requestedQty) || requestedQty < 1) {
+      return res.status(400).json({
+        success: false,
+        error: 'Quantity must be a positive integer'
+      });
+    }
+    
     const claim = await GuestItem.claim(
       guest_name, 
       guest_number, 
       item_name, 
-      quantity || 1
+      requestedQty
     );
     
     res.status(201).json({
       success: true,
       data: claim,
+      remaining: claim.remaining,
       message: 'Item claimed successfully'
     });
   } catch (error) {
-    console.error('Error creating claim:', error);
+    logger.error('Error creating claim', error);
+    if (error.message === 'Item not found') {
+      return res.status(404).json({
+        success: false,
+        error: 'Item not found'
+      });
+    }
+    if (error.message === 'Not enough items available') {
+      return res.status(400).json({
+        success: false,
+        error: `Not enough items available. Only ${error.available} remaining.`,
+        remaining: error.available
+      });
+    }
     if (error.code === '23503') {
       return res.status(400).json({
         success: false,
@@ -97,37 +136,111 @@ const createClaim = async (req, res) => {
   }
 };
 
+// Maximum number of items accepted by a single batch claim request
+const MAX_BATCH_CLAIMS = 100;
+
+// Claim several items for a guest in one request
+const createClaimsBatch = async (req, res) => {
+  try {
+    const { guest_name, guest_number, items } = req.body;
+    
+    if (!guest_name || !guest_number) {
+      return res.status(400).json({
+        success: false,
+        error: 'Guest name and guest number are required'
+      });
+    }
+    
+    if (!Array.isArray(items) || items.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: 'items must be a non-empty array of { item_name, quantity }'
+      });
+    }
+    
+    if (items.length > MAX_BATCH_CLAIMS) {
+      return res.status(400).json({
+        success: false,
+        error: `A batch may contain at most ${MAX_BATCH_CLAIMS} items`
+      });
+    }
+    
+    const claims = items.map(item => ({
+      item_name: item && item.item_name,
+      quantity: item && item.quantity !== undefined ? Number(item.quantity) : 1
+    }));
+    
+    const invalid = claims.findIndex(claim =>
+      !claim.item_name || !Number.isInteger(claim.quantity) || claim.quantity < 1
+    );
+    if (invalid !== -1) {
+      return res.status(400).json({
+        success: false,
+        error: `items[${invalid}] must have an item_name and a positive integer quantity`
+      });
+    }
+    
+    const results = await GuestItem.claimBatch(guest_name, guest_number, claims);
+    const claimedCount = results.filter(result => result.status === 'claimed').length;
+    
+    res.status(claimedCount > 0 ? 201 : 200).json({
+      success: true,
+      count: results.length,
+      claimed: claimedCount,
+      data: results,
+      message: `Claimed ${claimedCount} of ${results.length} item(s)`
+    });
+  } catch (error) {
+    logger.error('Error creating batch claim', error);
+    if (error.code === '23503') {
+      return res.status(400).json({
+        success: false,
+        error: 'Guest does not exist'
+      });
+    }
+    res.status(500).json({
+      success: false,
+      error: 'Server error while creating claims'
+    });
+  }
+};
+
 // Update a claim (change quantity)
 const updateClaim = async (req, res) => {
   try {
     const { guestName, guestNumber, itemName } = req.params;
-    const { quantity } = req.body;
+    const quantity = Number(req.body.quantity);
     
-    if (!quantity || quantity < 1) {
+    if (!Number.isInteger(quantity) || quantity < 1) {
       return res.status(400).json({
         success: false,
         error: 'Valid quantity is required'
       });
     }
     
-    // For now, we'll unclaim and reclaim with new quantity
-    // This maintains the claimed_count properly
-    await GuestItem.unclaim(guestName, guestNumber, itemName);
-    const claim = await GuestItem.claim(guestName, guestNumber, itemName, quantity);
+    const claim = await GuestItem.updateQuantity(guestName, guestNumber, itemName, quantity);
     
     res.json({
       success: true,
       data: claim,
+      remaining: claim.remaining,
       message: 'Claim quantity updated successfully'
     });
   } catch (error) {
-    console.error('Error updating claim:', error);
+    logger.error('Error updating claim', error);
     if (error.message === 'Claim not found') {
       return res.status(404).json({
         success: false,
         error: 'Claim not found'
       });
     }
+    if (error.message === 'Not enough items available') {
+      return res.status(400).json({
+        success: false,
+        error: `Not enough items available. Only ${error.available} remaining.`,
+        remaining: error.available
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while updating claim'
@@ -145,10 +258,11 @@ const deleteClaim = async (req, res) => {
     res.json({
       success: true,
       data: claim,
+      remaining: claim.remaining,
       message: 'Item unclaimed successfully'
     });
   } catch (error) {
-    console.error('Error deleting claim:', error);
+    logger.error('Error deleting claim', error);
     if (error.message === 'Claim not found') {
       return res.status(404).json({
         success: false,
@@ -175,7 +289,7 @@ const deleteClaimsByGuest = async (req, res) => {
       message: `Deleted ${claims.length} claim(s) for guest`
     });
   } catch (error) {
-    console.error('Error deleting claims by guest:', error);
+    logger.error('Error deleting claims by guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting guest claims'
@@ -196,7 +310,7 @@ const deleteClaimsByItem = async (req, res) => {
       message: `Deleted ${claims.length} claim(s) for item`
     });
   } catch (error) {
-    console.error('Error deleting claims by item:', error);
+    logger.error('Error deleting claims by item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting item claims'
@@ -209,6 +323,7 @@ module.exports = {
   getClaimsByGuest,
   getClaimsByItem,
   createClaim,
+  createClaimsBatch,
   updateClaim,
   deleteClaim,
   deleteClaimsByGuest,
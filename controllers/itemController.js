@@ -1,17 +1,36 @@
 const Item = require('../models/Item');
 const GuestItem = require('../models/GuestItem');
+const { parseListOptions } = require('../utils/pagination');
+const claimEvents = require('../utils/claimEvents');
+const { detectImportFormat, isBodyConsumed } = require('../utils/bulkImport');
+const { streamJsonArray, streamNdjson, streamCsv } = require('../utils/responseStream');
+const logger = require('../utils/logger');
+
+// Interval for SSE keep-alive comments (keeps proxies from closing idle streams)
+const STREAM_HEARTBEAT_MS = 25000;
+
+// Formats accepted by GET /api/items/export?format=
+const EXPORT_FORMATS = ['csv', 'ndjson', 'json'];
 
 // Get all items
 const getAllItems = async (req, res) => {
   try {
-    const items = await Item.findAll();
+    const listOptions = parseListOptions(req.query, Item.LIST_FIELDS, Item.KEY_COLUMNS);
+    const { rows: items, nextCursor } = await Item.findAll(listOptions);
     res.json({
       success: true,
       count: items.length,
+      next_cursor: nextCursor,
       data: items
     });
   } catch (error) {
-    console.error('Error getting items:', error);
+    logger.error('Error getting items', error);
+    if (error.code === 'INVALID_LIST_OPTIONS') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while fetching items'
@@ -37,7 +56,7 @@ const getItem = async (req, res) => {
       data: item
     });
   } catch (error) {
-    console.error('Error getting item:', error);
+    logger.error('Error getting item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching item'
@@ -63,7 +82,7 @@ const getItemWithGuests = async (req, res) => {
       data: item
     });
   } catch (error) {
-    console.error('Error getting item with guests:', error);
+    logger.error('Error getting item with guests', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching item'
@@ -83,7 +102,7 @@ const getItemsByGuest = async (req, res) => {
       data: items
     });
   } catch (error) {
-    console.error('Error getting items by guest:', error);
+    logger.error('Error getting items by guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching items'
@@ -101,7 +120,7 @@ const getClaimedItems = async (req, res) => {
       data: items
     });
   } catch (error) {
-    console.error('Error getting claimed items:', error);
+    logger.error('Error getting claimed items', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching claimed items'
@@ -119,7 +138,7 @@ const getUnclaimedItems = async (req, res) => {
       data: items
     });
   } catch (error) {
-    console.error('Error getting unclaimed items:', error);
+    logger.error('Error getting unclaimed items', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching unclaimed items'
@@ -127,6 +146,73 @@ const getUnclaimedItems = async (req, res) => {
   }
 };
 
+// Get items that can still be claimed (?sort=newest|name|available, paginated)
+const getAvailableItems = async (req, res) => {
+  try {
+    const sort = req.query.sort || 'newest';
+    if (!Object.prototype.hasOwnProperty.call(Item.AVAILABLE_SORTS, sort)) {
+      return res.status(400).json({
+        success: false,
+        error: `sort must be one of: ${Object.keys(Item.AVAILABLE_SORTS).join(', ')}`
+      });
+    }
+    
+    // 'newest' pages on created_at; the other sorts' cursors are checked by the query
+    const listOptions = parseListOptions(
+      req.query,
+      Item.LIST_FIELDS,
+      Item.AVAILABLE_SORTS[sort] ? null : Item.KEY_COLUMNS
+    );
+    const { rows: items, nextCursor } = await Item.findAvailable(listOptions, sort);
+    res.json({
+      success: true,
+      count: items.length,
+      next_cursor: nextCursor,
+      data: items
+    });
+  } catch (error) {
+    logger.error('Error getting available items', error);
+    // A cursor from a different sort order fails to cast in the keyset comparison
+    if (error.code === 'INVALID_LIST_OPTIONS' || (error.code && error.code.startsWith('22'))) {
+      return res.status(400).json({
+        success: false,
+        error: error.code === 'INVALID_LIST_OPTIONS' ? error.message : 'Invalid cursor'
+      });
+    }
+    res.status(500).json({
+      success: false,
+      error: 'Server error while fetching available items'
+    });
+  }
+};
+
+// Stream claim/unclaim updates as Server-Sent Events
+const streamItems = (req, res) => {
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+  });
+  res.write('retry: 5000\n\n');
+  
+  const unsubscribe = claimEvents.subscribe((event) => {
+    res.write(`event: ${event.op}\ndata: ${JSON.stringify(event)}\n\n`);
+  }, () => {
+    // Server shutting down; the client reconnects to another instance/worker
+    res.end();
+  });
+  
+  const heartbeat = setInterval(() => {
+    res.write(': ping\n\n');
+  }, STREAM_HEARTBEAT_MS);
+  
+  req.on('close', () => {
+    clearInterval(heartbeat);
+    unsubscribe();
+  });
+};
+
 // Create item
 const createItem = async (req, res) => {
   try {
@@ -150,7 +236,7 @@ const createItem = async (req, res) => {
       data: item
     });
   } catch (error) {
-    console.error('Error creating item:', error);
+    logger.error('Error creating item', error);
     if (error.code === '23505') {
       return res.status(409).json({
         success: false,
@@ -164,6 +250,87 @@ const createItem = async (req, res) => {
   }
 };
 
+// Bulk upsert items from a CSV or NDJSON request body
+const importItems = async (req, res) => {
+  try {
+    const format = detectImportFormat(req);
+    
+    if (!format) {
+      return res.status(415).json({
+        success: false,
+        error: 'Send the item catalog as text/csv or application/x-ndjson (or pass ?format=csv|ndjson)'
+      });
+    }
+
+    // A JSON or form Content-Type lets the body parsers read the upload first
+    if (isBodyConsumed(req)) {
+      return res.status(415).json({
+        success: false,
+        error: 'Send the item catalog with Content-Type text/csv or application/x-ndjson, not JSON or form data'
+      });
+    }
+    
+    const summary = await Item.bulkUpsert(req, { format });
+    
+    res.json({
+      success: true,
+      data: summary,
+      message: `Imported ${summary.inserted} new and updated ${summary.updated} existing item(s); ${summary.rejected} row(s) rejected`
+    });
+  } catch (error) {
+    logger.error('Error importing items', error);
+    if (error.code === 'INVALID_IMPORT') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
+    // Bad rows are rejected individually; a data exception here means the upload itself is unreadable
+    if (error.code && error.code.startsWith('22')) {
+      return res.status(400).json({
+        success: false,
+        error: 'Malformed import data',
+        details: error.message
+      });
+    }
+    res.status(500).json({
+      success: false,
+      error: 'Server error while importing items'
+    });
+  }
+};
+
+// Export all items with claimed_count and claimants (?format=csv|ndjson|json)
+const exportItems = async (req, res) => {
+  try {
+    const format = (req.query.format || 'csv').toLowerCase();
+    if (!EXPORT_FORMATS.includes(format)) {
+      return res.status(400).json({
+        success: false,
+        error: `Unknown export format '${format}' (use ${EXPORT_FORMATS.join(', ')})`
+      });
+    }
+
+    const batches = Item.streamExport();
+    
+    if (format === 'ndjson') {
+      return await streamNdjson(res, batches);
+    }
+    if (format === 'json') {
+      return await streamJsonArray(res, batches);
+    }
+    
+    res.setHeader('Content-Disposition', 'attachment; filename="items.csv"');
+    await streamCsv(res, batches, ['item_name', 'item_link', 'item_count', 'claimed_count', 'claimed_by']);
+  } catch (error) {
+    logger.error('Error exporting items', error);
+    res.status(500).json({
+      success: false,
+      error: 'Server error while exporting items'
+    });
+  }
+};
+
 // Update item
 const updateItem = async (req, res) => {
   try {
@@ -187,7 +354,7 @@ const updateItem = async (req, res) => {
       data: item
     });
   } catch (error) {
-    console.error('Error updating item:', error);
+    logger.error('Error updating item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while updating item'
@@ -208,35 +375,39 @@ const claimItem = async (req, res) => {
       });
     }
     
-    // Check if item exists
-    const item = await Item.findByName(itemName);
-    if (!item) {
-      return res.status(404).json({
-        success: false,
-        error: 'Item not found'
-      });
-    }
-    
-    // Check availability
-    const availability = await Item.getAvailability(itemName);
-    const requestedQty = quantity || 1;
+    const requestedQty = quantity === undefined ? 1 : Number(quantity);
     
-    if (availability.available < requestedQty) {
+    if (!Number.isInteger(requestedQty) || requestedQty < 1) {
       return res.status(400).json({
         success: false,
-        error: `Not enough items available. Only ${availability.available} remaining.`
+        error: 'Quantity must be a positive integer'
       });
     }
     
+    // Availability is checked atomically inside the claim statement
     const claim = await GuestItem.claim(guest_name, guest_number, itemName, requestedQty);
     
     res.json({
       success: true,
       data: claim,
+      remaining: claim.remaining,
       message: 'Item claimed successfully'
     });
   } catch (error) {
-    console.error('Error claiming item:', error);
+    logger.error('Error claiming item', error);
+    if (error.message === 'Item not found') {
+      return res.status(404).json({
+        success: false,
+        error: 'Item not found'
+      });
+    }
+    if (error.message === 'Not enough items available') {
+      return res.status(400).json({
+        success: false,
+        error: `Not enough items available. Only ${error.available} remaining.`,
+        remaining: error.available
+      });
+    }
     if (error.code === '23503') {
       return res.status(400).json({
         success: false,
@@ -268,10 +439,11 @@ const unclaimItem = async (req, res) => {
     res.json({
       success: true,
       data: claim,
+      remaining: claim.remaining,
       message: 'Item unclaimed successfully'
     });
   } catch (error) {
-    console.error('Error unclaiming item:', error);
+    logger.error('Error unclaiming item', error);
     if (error.message === 'Claim not found') {
       return res.status(404).json({
         success: false,
@@ -304,7 +476,7 @@ const deleteItem = async (req, res) => {
       message: 'Item deleted successfully'
     });
   } catch (error) {
-    console.error('Error deleting item:', error);
+    logger.error('Error deleting item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting item'
@@ -319,7 +491,11 @@ module.exports = {
   getItemsByGuest,
   getClaimedItems,
   getUnclaimedItems,
+  getAvailableItems,
+  streamItems,
   createItem,
+  importItems,
+  exportItems,
   updateItem,
   claimItem,
   unclaimItem,
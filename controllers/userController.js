@@ -1,16 +1,27 @@
 const User = require('../models/User');
+const Dashboard = require('../models/Dashboard');
+const { parseListOptions } = require('../utils/pagination');
+const logger = require('../utils/logger');
 
 // Get all users
 const getAllUsers = async (req, res) => {
   try {
-    const users = await User.findAll();
+    const listOptions = parseListOptions(req.query, User.LIST_FIELDS, User.KEY_COLUMNS);
+    const { rows: users, nextCursor } = await User.findAll(listOptions);
     res.json({
       success: true,
       count: users.length,
+      next_cursor: nextCursor,
       data: users
     });
   } catch (error) {
-    console.error('Error getting users:', error);
+    logger.error('Error getting users', error);
+    if (error.code === 'INVALID_LIST_OPTIONS') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while fetching users'
@@ -36,7 +47,7 @@ const getUser = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error getting user:', error);
+    logger.error('Error getting user', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching user'
@@ -62,7 +73,7 @@ const getUserWithGuests = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error getting user with guests:', error);
+    logger.error('Error getting user with guests', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching user with guests'
@@ -70,6 +81,32 @@ const getUserWithGuests = async (req, res) => {
   }
 };
 
+// Get host dashboard (guest/RSVP counts, claim totals and per-guest claims)
+const getUserDashboard = async (req, res) => {
+  try {
+    const { email } = req.params;
+    const dashboard = await Dashboard.findByUser(email);
+    
+    if (!dashboard) {
+      return res.status(404).json({
+        success: false,
+        error: 'User not found'
+      });
+    }
+    
+    res.json({
+      success: true,
+      data: dashboard
+    });
+  } catch (error) {
+    logger.error('Error getting user dashboard', error);
+    res.status(500).json({
+      success: false,
+      error: 'Server error while fetching dashboard'
+    });
+  }
+};
+
 // Create user
 const createUser = async (req, res) => {
   try {
@@ -81,6 +118,13 @@ const createUser = async (req, res) => {
         error: 'Email, name, and password are required'
       });
     }
+
+    if (typeof password !== 'string') {
+      return res.status(400).json({
+        success: false,
+        error: 'Password must be a string'
+      });
+    }
     
     const user = await User.create({ email, name, number, password, role });
     
@@ -89,7 +133,14 @@ const createUser = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error creating user:', error);
+    logger.error('Error creating user', error);
+    if (error.code === 'QUEUE_FULL') {
+      res.set('Retry-After', '1');
+      return res.status(503).json({
+        success: false,
+        error: 'Server busy, please retry'
+      });
+    }
     if (error.code === '23505') {
       return res.status(409).json({
         success: false,
@@ -103,11 +154,66 @@ const createUser = async (req, res) => {
   }
 };
 
+// Log in with email and password
+const loginUser = async (req, res) => {
+  try {
+    const { email, password } = req.body;
+
+    if (!email || !password) {
+      return res.status(400).json({
+        success: false,
+        error: 'Email and password are required'
+      });
+    }
+
+    if (typeof password !== 'string') {
+      return res.status(400).json({
+        success: false,
+        error: 'Password must be a string'
+      });
+    }
+
+    const user = await User.verifyCredentials(email, password);
+
+    if (!user) {
+      return res.status(401).json({
+        success: false,
+        error: 'Invalid email or password'
+      });
+    }
+
+    res.json({
+      success: true,
+      data: user
+    });
+  } catch (error) {
+    logger.error('Error logging in user', error);
+    if (error.code === 'QUEUE_FULL') {
+      res.set('Retry-After', '1');
+      return res.status(503).json({
+        success: false,
+        error: 'Server busy, please retry'
+      });
+    }
+    res.status(500).json({
+      success: false,
+      error: 'Server error while logging in'
+    });
+  }
+};
+
 // Update user
 const updateUser = async (req, res) => {
   try {
     const { email } = req.params;
     const { name, number, password, role } = req.body;
+
+    if (password != null && (typeof password !== 'string' || password.length === 0)) {
+      return res.status(400).json({
+        success: false,
+        error: 'Password must be a non-empty string'
+      });
+    }
     
     const user = await User.update(email, { name, number, password, role });
     
@@ -123,7 +229,14 @@ const updateUser = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error updating user:', error);
+    logger.error('Error updating user', error);
+    if (error.code === 'QUEUE_FULL') {
+      res.set('Retry-After', '1');
+      return res.status(503).json({
+        success: false,
+        error: 'Server busy, please retry'
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while updating user'
@@ -150,7 +263,7 @@ const deleteUser = async (req, res) => {
       message: 'User deleted successfully'
     });
   } catch (error) {
-    console.error('Error deleting user:', error);
+    logger.error('Error deleting user', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting user'
@@ -162,7 +275,9 @@ module.exports = {
   getAllUsers,
   getUser,
   getUserWithGuests,
+  getUserDashboard,
   createUser,
+  loginUser,
   updateUser,
   deleteUser
 };
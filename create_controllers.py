@@ -4,21 +4,41 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 os.makedirs(os.path.join(BASE_DIR, 'controllers'), exist_ok=True)
 
+
+# Files already in the tree are kept as they are; only missing ones are scaffolded
+def write_file(path, content):
+    name = os.path.relpath(path, BASE_DIR)
+    if os.path.exists(path):
+        print(f'- {name} already exists, left unchanged')
+        return
+    with open(path, 'w') as f:
+        f.write(content)
+    print(f'✓ {name} created')
+
 # Create controllers/userController.js
-with open(os.path.join(BASE_DIR, 'controllers', 'userController.js'), 'w') as f:
-    f.write("""const User = require('../models/User');
+write_file(os.path.join(BASE_DIR, 'controllers', 'userController.js'), """const User = require('../models/User');
+const { parseListOptions } = require('../utils/pagination');
+const logger = require('../utils/logger');
 
 // Get all users
 const getAllUsers = async (req, res) => {
   try {
-    const users = await User.findAll();
+    const listOptions = parseListOptions(req.query, User.LIST_FIELDS, User.KEY_COLUMNS);
+    const { rows: users, nextCursor } = await User.findAll(listOptions);
     res.json({
       success: true,
       count: users.length,
+      next_cursor: nextCursor,
       data: users
     });
   } catch (error) {
-    console.error('Error getting users:', error);
+    logger.error('Error getting users', error);
+    if (error.code === 'INVALID_LIST_OPTIONS') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while fetching users'
@@ -44,7 +64,7 @@ const getUser = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error getting user:', error);
+    logger.error('Error getting user', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching user'
@@ -70,7 +90,7 @@ const getUserWithGuests = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error getting user with guests:', error);
+    logger.error('Error getting user with guests', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching user with guests'
@@ -97,7 +117,7 @@ const createUser = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error creating user:', error);
+    logger.error('Error creating user', error);
     if (error.code === '23505') {
       return res.status(409).json({
         success: false,
@@ -131,7 +151,7 @@ const updateUser = async (req, res) => {
       data: user
     });
   } catch (error) {
-    console.error('Error updating user:', error);
+    logger.error('Error updating user', error);
     res.status(500).json({
       success: false,
       error: 'Server error while updating user'
@@ -158,7 +178,7 @@ const deleteUser = async (req, res) => {
       message: 'User deleted successfully'
     });
   } catch (error) {
-    console.error('Error deleting user:', error);
+    logger.error('Error deleting user', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting user'
@@ -175,23 +195,31 @@ module.exports = {
   deleteUser
 };
 """)
-print('✓ controllers/userController.js created')
 
 # Create controllers/guestController.js  
-with open(os.path.join(BASE_DIR, 'controllers', 'guestController.js'), 'w') as f:
-    f.write("""const Guest = require('../models/Guest');
+write_file(os.path.join(BASE_DIR, 'controllers', 'guestController.js'), """const Guest = require('../models/Guest');
+const { parseListOptions } = require('../utils/pagination');
+const logger = require('../utils/logger');
 
 // Get all guests
 const getAllGuests = async (req, res) => {
   try {
-    const guests = await Guest.findAll();
+    const listOptions = parseListOptions(req.query, Guest.LIST_FIELDS, Guest.KEY_COLUMNS);
+    const { rows: guests, nextCursor } = await Guest.findAll(listOptions);
     res.json({
       success: true,
       count: guests.length,
+      next_cursor: nextCursor,
       data: guests
     });
   } catch (error) {
-    console.error('Error getting guests:', error);
+    logger.error('Error getting guests', error);
+    if (error.code === 'INVALID_LIST_OPTIONS') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guests'
@@ -217,7 +245,7 @@ const getGuest = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error getting guest:', error);
+    logger.error('Error getting guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guest'
@@ -243,7 +271,7 @@ const getGuestWithItems = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error getting guest with items:', error);
+    logger.error('Error getting guest with items', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guest with items'
@@ -263,7 +291,7 @@ const getGuestsByUser = async (req, res) => {
       data: guests
     });
   } catch (error) {
-    console.error('Error getting guests by user:', error);
+    logger.error('Error getting guests by user', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching guests'
@@ -290,7 +318,7 @@ const createGuest = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error creating guest:', error);
+    logger.error('Error creating guest', error);
     if (error.code === '23505') {
       return res.status(409).json({
         success: false,
@@ -330,7 +358,7 @@ const updateGuest = async (req, res) => {
       data: guest
     });
   } catch (error) {
-    console.error('Error updating guest:', error);
+    logger.error('Error updating guest', error);
     if (error.code === '23503') {
       return res.status(400).json({
         success: false,
@@ -363,7 +391,7 @@ const deleteGuest = async (req, res) => {
       message: 'Guest deleted successfully'
     });
   } catch (error) {
-    console.error('Error deleting guest:', error);
+    logger.error('Error deleting guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting guest'
@@ -381,7 +409,6 @@ module.exports = {
   deleteGuest
 };
 """)
-print('✓ controllers/guestController.js created')
 
-print('\nUser and Guest controllers created successfully!')
+print('\nUser and Guest controllers done.')
 
@@ -4,17 +4,41 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 os.makedirs(os.path.join(BASE_DIR, 'models'), exist_ok=True)
 
+
+# Files already in the tree are kept as they are; only missing ones are scaffolded
+def write_file(path, content):
+    name = os.path.relpath(path, BASE_DIR)
+    if os.path.exists(path):
+        print(f'- {name} already exists, left unchanged')
+        return
+    with open(path, 'w') as f:
+        f.write(content)
+    print(f'✓ {name} created')
+
 # Create models/User.js
-with open(os.path.join(BASE_DIR, 'models', 'User.js'), 'w') as f:
-    f.write("""const pool = require('../config/database');
+write_file(os.path.join(BASE_DIR, 'models', 'User.js'), """const pool = require('../config/database');
+const { normalizeListOptions, selectColumns, keysetClause, toPage } = require('../utils/pagination');
 
 class User {
-  // Get all users
-  static async findAll() {
+  // Primary key columns used as the keyset pagination tiebreaker
+  static KEY_COLUMNS = ['email'];
+
+  // Columns that may be requested with ?fields=
+  static LIST_FIELDS = ['email', 'name', 'number', 'role', 'created_at', 'updated_at'];
+
+  // Get a page of users (keyset paginated on created_at + primary key)
+  static async findAll(options = {}) {
+    const listOptions = normalizeListOptions(options);
+    const { where, orderBy, limit, params } = keysetClause(listOptions, User.KEY_COLUMNS);
     const result = await pool.query(
-      'SELECT * FROM users ORDER BY created_at DESC'
+      `SELECT ${selectColumns(listOptions.fields, User.KEY_COLUMNS)}
+       FROM users
+       ${where ? `WHERE ${where}` : ''}
+       ${orderBy}
+       ${limit}`,
+      params
     );
-    return result.rows;
+    return toPage(result.rows, listOptions, User.KEY_COLUMNS);
   }
 
   // Get user by email
@@ -86,19 +110,31 @@ class User {
 
 module.exports = User;
 """)
-print('✓ models/User.js created')
 
 # Create models/Guest.js
-with open(os.path.join(BASE_DIR, 'models', 'Guest.js'), 'w') as f:
-    f.write("""const pool = require('../config/database');
+write_file(os.path.join(BASE_DIR, 'models', 'Guest.js'), """const pool = require('../config/database');
+const { normalizeListOptions, selectColumns, keysetClause, toPage } = require('../utils/pagination');
 
 class Guest {
-  // Get all guests
-  static async findAll() {
+  // Primary key columns used as the keyset pagination tiebreaker
+  static KEY_COLUMNS = ['name', 'number'];
+
+  // Columns that may be requested with ?fields=
+  static LIST_FIELDS = ['name', 'number', 'user_email', 'going', 'created_at', 'updated_at'];
+
+  // Get a page of guests (keyset paginated on created_at + primary key)
+  static async findAll(options = {}) {
+    const listOptions = normalizeListOptions(options);
+    const { where, orderBy, limit, params } = keysetClause(listOptions, Guest.KEY_COLUMNS);
     const result = await pool.query(
-      'SELECT * FROM guests ORDER BY created_at DESC'
+      `SELECT ${selectColumns(listOptions.fields, Guest.KEY_COLUMNS)}
+       FROM guests
+       ${where ? `WHERE ${where}` : ''}
+       ${orderBy}
+       ${limit}`,
+      params
     );
-    return result.rows;
+    return toPage(result.rows, listOptions, Guest.KEY_COLUMNS);
   }
 
   // Get guest by composite key
@@ -180,19 +216,31 @@ class Guest {
 
 module.exports = Guest;
 """)
-print('✓ models/Guest.js created')
 
 # Create models/Item.js
-with open(os.path.join(BASE_DIR, 'models', 'Item.js'), 'w') as f:
-    f.write("""const pool = require('../config/database');
+write_file(os.path.join(BASE_DIR, 'models', 'Item.js'), """const pool = require('../config/database');
+const { normalizeListOptions, selectColumns, keysetClause, toPage } = require('../utils/pagination');
 
 class Item {
-  // Get all items
-  static async findAll() {
+  // Primary key columns used as the keyset pagination tiebreaker
+  static KEY_COLUMNS = ['item_name'];
+
+  // Columns that may be requested with ?fields=
+  static LIST_FIELDS = ['item_name', 'item_link', 'item_count', 'claimed_count', 'available', 'created_at', 'updated_at'];
+
+  // Get a page of items (keyset paginated on created_at + primary key)
+  static async findAll(options = {}) {
+    const listOptions = normalizeListOptions(options);
+    const { where, orderBy, limit, params } = keysetClause(listOptions, Item.KEY_COLUMNS);
     const result = await pool.query(
-      'SELECT * FROM items ORDER BY created_at DESC'
+      `SELECT ${selectColumns(listOptions.fields, Item.KEY_COLUMNS)}
+       FROM items
+       ${where ? `WHERE ${where}` : ''}
+       ${orderBy}
+       ${limit}`,
+      params
     );
-    return result.rows;
+    return toPage(result.rows, listOptions, Item.KEY_COLUMNS);
   }
 
   // Get item by name
@@ -302,7 +350,6 @@ class Item {
 
 module.exports = Item;
 """)
-print('✓ models/Item.js created')
 
-print('\nAll model files created successfully!')
+print('\nModel files done.')
 
@@ -3,21 +3,41 @@ import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+
+# Files already in the tree are kept as they are; only missing ones are scaffolded
+def write_file(path, content):
+    name = os.path.relpath(path, BASE_DIR)
+    if os.path.exists(path):
+        print(f'- {name} already exists, left unchanged')
+        return
+    with open(path, 'w') as f:
+        f.write(content)
+    print(f'✓ {name} created')
+
 # Create controllers/itemController.js
-with open(os.path.join(BASE_DIR, 'controllers', 'itemController.js'), 'w') as f:
-    f.write("""const Item = require('../models/Item');
+write_file(os.path.join(BASE_DIR, 'controllers', 'itemController.js'), """const Item = require('../models/Item');
+const { parseListOptions } = require('../utils/pagination');
+const logger = require('../utils/logger');
 
 // Get all items
 const getAllItems = async (req, res) => {
   try {
-    const items = await Item.findAll();
+    const listOptions = parseListOptions(req.query, Item.LIST_FIELDS, Item.KEY_COLUMNS);
+    const { rows: items, nextCursor } = await Item.findAll(listOptions);
     res.json({
       success: true,
       count: items.length,
+      next_cursor: nextCursor,
       data: items
     });
   } catch (error) {
-    console.error('Error getting items:', error);
+    logger.error('Error getting items', error);
+    if (error.code === 'INVALID_LIST_OPTIONS') {
+      return res.status(400).json({
+        success: false,
+        error: error.message
+      });
+    }
     res.status(500).json({
       success: false,
       error: 'Server error while fetching items'
@@ -43,7 +63,7 @@ const getItem = async (req, res) => {
       data: item
     });
   } catch (error) {
-    console.error('Error getting item:', error);
+    logger.error('Error getting item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching item'
@@ -63,7 +83,7 @@ const getItemsByGuest = async (req, res) => {
       data: items
     });
   } catch (error) {
-    console.error('Error getting items by guest:', error);
+    logger.error('Error getting items by guest', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching items'
@@ -81,7 +101,7 @@ const getClaimedItems = async (req, res) => {
       data: items
     });
   } catch (error) {
-    console.error('Error getting claimed items:', error);
+    logger.error('Error getting claimed items', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching claimed items'
@@ -99,7 +119,7 @@ const getUnclaimedItems = async (req, res) => {
       data: items
     });
   } catch (error) {
-    console.error('Error getting unclaimed items:', error);
+    logger.error('Error getting unclaimed items', error);
     res.status(500).json({
       success: false,
       error: 'Server error while fetching unclaimed items'
@@ -134,7 +154,7 @@ const createItem = async (req, res) => {
       data: item
     });
   } catch (error) {
-    console.error('Error creating item:', error);
+    logger.error('Error creating item', error);
     if (error.code === '23505') {
       return res.status(409).json({
         success: false,
@@ -181,7 +201,7 @@ const updateItem = async (req, res) => {
       data: item
     });
   } catch (error) {
-    console.error('Error updating item:', error);
+    logger.error('Error updating item', error);
     if (error.code === '23503') {
       return res.status(400).json({
         success: false,
@@ -223,7 +243,7 @@ const claimItem = async (req, res) => {
       message: 'Item claimed successfully'
     });
   } catch (error) {
-    console.error('Error claiming item:', error);
+    logger.error('Error claiming item', error);
     if (error.code === '23503') {
       return res.status(400).json({
         success: false,
@@ -257,7 +277,7 @@ const unclaimItem = async (req, res) => {
       message: 'Item unclaimed successfully'
     });
   } catch (error) {
-    console.error('Error unclaiming item:', error);
+    logger.error('Error unclaiming item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while unclaiming item'
@@ -284,7 +304,7 @@ const deleteItem = async (req, res) => {
       message: 'Item deleted successfully'
     });
   } catch (error) {
-    console.error('Error deleting item:', error);
+    logger.error('Error deleting item', error);
     res.status(500).json({
       success: false,
       error: 'Server error while deleting item'
@@ -305,14 +325,12 @@ module.exports = {
   deleteItem
 };
 """)
-print('✓ controllers/itemController.js created')
 
 # Create routes directory and files
 os.makedirs(os.path.join(BASE_DIR, 'routes'), exist_ok=True)
 
 # Create routes/userRoutes.js
-with open(os.path.join(BASE_DIR, 'routes', 'userRoutes.js'), 'w') as f:
-    f.write("""const express = require('express');
+write_file(os.path.join(BASE_DIR, 'routes', 'userRoutes.js'), """const express = require('express');
 const router = express.Router();
 const {
   getAllUsers,
@@ -333,11 +351,9 @@ router.delete('/:email', deleteUser);
 
 module.exports = router;
 """)
-print('✓ routes/userRoutes.js created')
 
 # Create routes/guestRoutes.js
-with open(os.path.join(BASE_DIR, 'routes', 'guestRoutes.js'), 'w') as f:
-    f.write("""const express = require('express');
+write_file(os.path.join(BASE_DIR, 'routes', 'guestRoutes.js'), """const express = require('express');
 const router = express.Router();
 const {
   getAllGuests,
@@ -360,11 +376,9 @@ router.delete('/:name/:number', deleteGuest);
 
 module.exports = router;
 """)
-print('✓ routes/guestRoutes.js created')
 
 # Create routes/itemRoutes.js
-with open(os.path.join(BASE_DIR, 'routes', 'itemRoutes.js'), 'w') as f:
-    f.write("""const express = require('express');
+write_file(os.path.join(BASE_DIR, 'routes', 'itemRoutes.js'), """const express = require('express');
 const router = express.Router();
 const {
   getAllItems,
@@ -393,15 +407,14 @@ router.delete('/:itemName', deleteItem);
 
 module.exports = router;
 """)
-print('✓ routes/itemRoutes.js created')
 
 # Create server.js
-with open(os.path.join(BASE_DIR, 'server.js'), 'w') as f:
-    f.write("""const express = require('express');
+write_file(os.path.join(BASE_DIR, 'server.js'), """const express = require('express');
 const cors = require('cors');
 const bodyParser = require('body-parser');
 require('dotenv').config();
 
+const logger = require('./utils/logger');
 const { createTables } = require('./config/initDb');
 const userRoutes = require('./routes/userRoutes');
 const guestRoutes = require('./routes/guestRoutes');
@@ -415,11 +428,8 @@ app.use(cors());
 app.use(bodyParser.json());
 app.use(bodyParser.urlencoded({ extended: true }));
 
-// Request logging middleware
-app.use((req, res, next) => {
-  console.log(`${new Date().toISOString()} - ${req.method} ${req.path}`);
-  next();
-});
+// Request logging middleware (buffered JSON lines, 2xx/3xx responses sampled)
+app.use(logger.requestLogger);
 
 // Routes
 app.get('/', (req, res) => {
@@ -448,7 +458,7 @@ app.use((req, res) => {
 
 // Error handling middleware
 app.use((err, req, res, next) => {
-  console.error('Error:', err.stack);
+  logger.error('Unhandled error', { error: err, method: req.method, path: req.originalUrl });
   res.status(500).json({
     success: false,
     error: 'Something went wrong!',
@@ -459,19 +469,18 @@ app.use((err, req, res, next) => {
 // Initialize database and start server
 const startServer = async () => {
   try {
-    console.log('Initializing database...');
+    logger.info('Initializing database...');
     await createTables();
     
     app.listen(PORT, () => {
-      console.log(`\\n🚀 Server is running on port ${PORT}`);
-      console.log(`📡 API endpoint: http://localhost:${PORT}/api`);
-      console.log(`\\nAvailable routes:`);
-      console.log(`  Users:  http://localhost:${PORT}/api/users`);
-      console.log(`  Guests: http://localhost:${PORT}/api/guests`);
-      console.log(`  Items:  http://localhost:${PORT}/api/items\\n`);
+      logger.info('Server is running', {
+        port: PORT,
+        api: `http://localhost:${PORT}/api`,
+        routes: ['/api/users', '/api/guests', '/api/items']
+      });
     });
   } catch (error) {
-    console.error('Failed to start server:', error);
+    logger.error('Failed to start server', error);
     process.exit(1);
   }
 };
@@ -480,7 +489,6 @@ startServer();
 
 module.exports = app;
 """)
-print('✓ server.js created')
 
-print('\nAll remaining files created successfully!')
+print('\nRemaining files done.')
 
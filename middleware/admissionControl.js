@@ -0,0 +1,226 @@
+const logger = require('../utils/logger');
+const { getPoolStats } = require('../config/database');
+
+// Admission control for /api: sheds load before it queues on the pg pool.
+//
+// Every API request is checked, in order, against:
+//   1. a per-client token bucket (ADMISSION_RATE_LIMIT requests/s, bursts of
+//      ADMISSION_RATE_BURST) - answered with 429;
+//   2. the number of queries waiting for a pool connection and the number of
+//      API requests in flight - answered with 503 once past the thresholds;
+//   3. a concurrency limit for expensive route groups (full-list streams,
+//      exports, imports, search, dashboards) - answered with 503. A
+//      `?stream=true` list or an export holds a pool connection for as long as
+//      the client takes to read it, so those groups get small limits.
+// Claims are the writes that matter most during a traffic spike, so each
+// request class gets a different share of the thresholds: list/detail reads
+// are shed first, other writes next, and claim/unclaim writes last.
+// Admin endpoints and event streams (long-lived, they hold no connection) are
+// never shed for load.
+//
+//   ADMISSION_MAX_IN_FLIGHT     in-flight API requests before reads are shed (default 100, 0 disables)
+//   ADMISSION_MAX_POOL_WAITING  queued pool checkouts before reads are shed (default 2x pool size, 0 disables)
+//   ADMISSION_RATE_LIMIT        requests per second per client IP (default 50, 0 disables)
+//   ADMISSION_RATE_BURST        token bucket size (default 2x the rate)
+// The rate limit is per IP, and guests behind one NAT (a venue's Wi-Fi, a
+// mobile carrier) share an IP, so the default leaves room for a room full of
+// phones opening the registry at once; lower it only for per-user traffic.
+//   ADMISSION_ROUTE_LIMITS      per-group concurrency, e.g. "stream=4,export=2,import=2,search=20,dashboard=20"
+//   ADMISSION_RETRY_AFTER_S     Retry-After sent with 503s (default 2)
+
+const envNumber = (name, fallback) => {
+  const value = parseFloat(process.env[name]);
+  return Number.isNaN(value) ? fallback : value;
+};
+
+const MAX_IN_FLIGHT = envNumber('ADMISSION_MAX_IN_FLIGHT', 100);
+const MAX_POOL_WAITING = envNumber('ADMISSION_MAX_POOL_WAITING', getPoolStats().max * 2);
+const RATE_LIMIT = envNumber('ADMISSION_RATE_LIMIT', 50);
+const RATE_BURST = envNumber('ADMISSION_RATE_BURST', RATE_LIMIT * 2);
+const RETRY_AFTER_S = envNumber('ADMISSION_RETRY_AFTER_S', 2);
+
+// Multiplier applied to the in-flight and pool-waiting thresholds per class
+const CLASS_HEADROOM = {
+  read: 1,
+  write: 1.5,
+  claim: 2
+};
+
+// Expensive route groups, matched against the path below /api (and the query
+// string where given); the first matching group applies
+const ROUTE_GROUPS = [
+  { name: 'stream', method: 'GET', pattern: /^\/(guests|claims)\/?$/, query: { stream: 'true' }, limit: 4 },
+  { name: 'export', method: 'GET', pattern: /^\/items\/export\/?$/, limit: 2 },
+  { name: 'import', method: 'POST', pattern: /^\/(items|guests)\/import\/?$/, limit: 2 },
+  { name: 'search', method: 'GET', pattern: /^\/guests\/search\/?$/, limit: 20 },
+  { name: 'dashboard', method: 'GET', pattern: /^\/users\/[^/]+\/dashboard\/?$/, limit: 20 }
+];
+
+// ADMISSION_ROUTE_LIMITS overrides the default group limits
+(process.env.ADMISSION_ROUTE_LIMITS || '')
+  .split(',')
+  .map(entry => entry.split('=').map(part => part.trim()))
+  .forEach(([name, value]) => {
+    const group = ROUTE_GROUPS.find(entry => entry.name === name);
+    const limit = parseInt(value, 10);
+    if (group && !Number.isNaN(limit)) {
+      group.limit = limit;
+    } else if (name) {
+      logger.warn('Ignoring unknown ADMISSION_ROUTE_LIMITS entry', { entry: `${name}=${value}` });
+    }
+  });
+
+// Idle client buckets are dropped once they would have refilled completely
+const BUCKET_SWEEP_MS = 60000;
+
+let inFlight = 0;
+const groupInFlight = new Map(ROUTE_GROUPS.map(group => [group.name, 0]));
+const buckets = new Map();
+// `${reason} ${class}` -> count
+const rejections = new Map();
+
+const classify = (req) => {
+  if (req.method === 'GET' || req.method === 'HEAD' || req.method === 'OPTIONS') {
+    return 'read';
+  }
+  if (/^\/items\/[^/]+\/(claim|unclaim)\/?$/.test(req.path) || /^\/claims(\/|$)/.test(req.path)) {
+    return 'claim';
+  }
+  return 'write';
+};
+
+const matchesGroup = (group, req) => group.method === req.method
+  && group.pattern.test(req.path)
+  && Object.entries(group.query || {}).every(([key, value]) => req.query[key] === value);
+
+const isExempt = req => /^\/admin(\/|$)/.test(req.path);
+
+// Matched by path only: an Accept header is client-controlled and would let any
+// request skip the concurrency limits
+const isEventStream = req => /^\/items\/stream\/?$/.test(req.path);
+
+// Take one token from the client's bucket; returns seconds to wait when empty
+const takeToken = (key, now) => {
+  let bucket = buckets.get(key);
+  if (!bucket) {
+    bucket = { tokens: RATE_BURST, updatedAt: now };
+    buckets.set(key, bucket);
+  }
+  bucket.tokens = Math.min(RATE_BURST, bucket.tokens + ((now - bucket.updatedAt) / 1000) * RATE_LIMIT);
+  bucket.updatedAt = now;
+  if (bucket.tokens >= 1) {
+    bucket.tokens -= 1;
+    return 0;
+  }
+  return Math.ceil((1 - bucket.tokens) / RATE_LIMIT);
+};
+
+const sweepBuckets = () => {
+  const fullAfterMs = (RATE_BURST / RATE_LIMIT) * 1000;
+  const now = Date.now();
+  buckets.forEach((bucket, key) => {
+    if (now - bucket.updatedAt >= fullAfterMs) {
+      buckets.delete(key);
+    }
+  });
+};
+
+if (RATE_LIMIT > 0) {
+  setInterval(sweepBuckets, BUCKET_SWEEP_MS).unref();
+}
+
+const reject = (req, res, { status, reason, requestClass, retryAfter, error }) => {
+  const key = `${reason} ${requestClass}`;
+  rejections.set(key, (rejections.get(key) || 0) + 1);
+  logger.debug('Request shed', { reason, class: requestClass, method: req.method, path: req.originalUrl });
+  res.set('Retry-After', String(Math.max(1, retryAfter)));
+  res.status(status).json({
+    success: false,
+    error
+  });
+};
+
+const admissionControl = (req, res, next) => {
+  if (isExempt(req)) {
+    return next();
+  }
+
+  const requestClass = classify(req);
+  const headroom = CLASS_HEADROOM[requestClass];
+
+  if (RATE_LIMIT > 0) {
+    const waitS = takeToken(req.ip, Date.now());
+    if (waitS > 0) {
+      return reject(req, res, {
+        status: 429,
+        reason: 'rate_limit',
+        requestClass,
+        retryAfter: waitS,
+        error: 'Too many requests, please slow down'
+      });
+    }
+  }
+
+  // Streams hold no pool connection between events, so only the rate limit applies
+  if (isEventStream(req)) {
+    return next();
+  }
+
+  const overloaded = reason => reject(req, res, {
+    status: 503,
+    reason,
+    requestClass,
+    retryAfter: RETRY_AFTER_S,
+    error: 'Server is busy, please retry shortly'
+  });
+
+  if (MAX_POOL_WAITING > 0 && getPoolStats().waiting >= MAX_POOL_WAITING * headroom) {
+    return overloaded('pool_waiting');
+  }
+  if (MAX_IN_FLIGHT > 0 && inFlight >= MAX_IN_FLIGHT * headroom) {
+    return overloaded('in_flight');
+  }
+
+  const group = ROUTE_GROUPS.find(entry => matchesGroup(entry, req));
+  if (group && group.limit > 0 && groupInFlight.get(group.name) >= group.limit) {
+    return overloaded(`route_${group.name}`);
+  }
+
+  inFlight++;
+  if (group) {
+    groupInFlight.set(group.name, groupInFlight.get(group.name) + 1);
+  }
+
+  let done = false;
+  const finish = () => {
+    if (done) {
+      return;
+    }
+    done = true;
+    inFlight--;
+    if (group) {
+      groupInFlight.set(group.name, groupInFlight.get(group.name) - 1);
+    }
+  };
+  res.on('finish', finish);
+  res.on('close', finish);
+  next();
+};
+
+// Current load and shed counts (for /metrics)
+const stats = () => ({
+  in_flight: inFlight,
+  route_groups: ROUTE_GROUPS.map(group => ({
+    name: group.name,
+    in_flight: groupInFlight.get(group.name),
+    limit: group.limit
+  })),
+  tracked_clients: buckets.size,
+  rejected: [...rejections.entries()].map(([key, count]) => {
+    const [reason, requestClass] = key.split(' ');
+    return { reason, class: requestClass, count };
+  })
+});
+
+module.exports = admissionControl;
+module.exports.stats = stats;
@@ -0,0 +1,96 @@
+const crypto = require('crypto');
+const TableVersion = require('../models/TableVersion');
+const requestContext = require('../utils/requestContext');
+
+// Conditional GET support for list and detail endpoints.
+//
+// The ETag is derived from the committed write versions of the tables a route
+// reads plus the request URL, so it can be computed with one cheap lookup
+// (routed to the read replica like the handler's own reads). When the
+// client's If-None-Match still matches, the route handler (and its SELECT) is
+// skipped and a bodyless 304 is returned.
+//
+// The versions are read before the handler runs, so the body always includes
+// at least the writes they count. A version ETag is only issued when the
+// handler read nothing that can be older than those versions: the item cache,
+// a coalesced query, a materialized view, or the replica when the versions
+// came from the primary (see utils/requestContext.js). Otherwise the response
+// gets Express's ETag, a hash of the body actually sent, which still answers
+// If-None-Match with 304 but only after the handler has run.
+const conditionalGet = (...tables) => async (req, res, next) => {
+  if (req.method !== 'GET' && req.method !== 'HEAD') {
+    return next();
+  }
+
+  // Event streams are never cacheable
+  if ((req.headers.accept || '').includes('text/event-stream')) {
+    return next();
+  }
+
+  const context = requestContext.current();
+  let versions;
+  try {
+    versions = await TableVersion.findVersions(tables);
+  } catch (error) {
+    // Fall back to an unconditional response if versions are unavailable
+    return next();
+  }
+  // Versions read from the replica make replica data as good as the primary's
+  const replicaVersions = Boolean(context) && context.staleSources.delete('replica');
+
+  const token = versions.map(row => `${row.table_name}:${row.version}`).join(',');
+  const hash = crypto
+    .createHash('sha1')
+    .update(`${token}|${req.originalUrl}`)
+    .digest('base64url');
+  const versionTag = `W/"${hash}"`;
+
+  res.setHeader('Cache-Control', 'no-cache');
+  res.setHeader('ETag', versionTag);
+  if (req.fresh) {
+    return res.status(304).end();
+  }
+  res.removeHeader('ETag');
+
+  const json = res.json;
+  res.json = function (body) {
+    const stale = context
+      ? [...context.staleSources].filter(source => !(replicaVersions && source === 'replica'))
+      : ['unknown'];
+    if (stale.length === 0 && res.statusCode >= 200 && res.statusCode < 300) {
+      res.setHeader('ETag', versionTag);
+    }
+    return json.call(this, body);
+  };
+
+  next();
+};
+
+// Conditional GET for routers whose reads are served from the in-process item
+// cache: no version lookup up front, so a cache hit costs no database round
+// trip. A response built from cache entries is tagged with their content tags
+// (see utils/cache.js), and Express answers a matching If-None-Match with 304;
+// anything else gets Express's usual body-hash ETag.
+const cached = (req, res, next) => {
+  if (req.method !== 'GET' && req.method !== 'HEAD') {
+    return next();
+  }
+
+  res.setHeader('Cache-Control', 'no-cache');
+  const context = requestContext.current();
+  const json = res.json;
+  res.json = function (body) {
+    if (context && context.cacheTags.length > 0 && res.statusCode >= 200 && res.statusCode < 300) {
+      const tag = context.cacheTags.length === 1
+        ? context.cacheTags[0]
+        : crypto.createHash('sha1').update(context.cacheTags.join(',')).digest('base64url');
+      res.setHeader('ETag', `W/"${tag}"`);
+    }
+    return json.call(this, body);
+  };
+
+  next();
+};
+
+module.exports = conditionalGet;
+module.exports.cached = cached;
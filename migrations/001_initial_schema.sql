@@ -0,0 +1,54 @@
+-- Migration: Initial schema
+-- Description: Users, guests, items and the guest_items junction table.
+--              Written to be a no-op on databases created by the old startup
+--              createTables() and the /api/admin schema endpoints.
+
+CREATE TABLE IF NOT EXISTS users (
+  email VARCHAR(255) PRIMARY KEY,
+  name VARCHAR(255) NOT NULL,
+  number VARCHAR(50),
+  password VARCHAR(255) NOT NULL,
+  role VARCHAR(100),
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS guests (
+  name VARCHAR(255) NOT NULL,
+  number VARCHAR(50) NOT NULL,
+  user_email VARCHAR(255) REFERENCES users(email) ON DELETE CASCADE,
+  going BOOLEAN DEFAULT TRUE,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (name, number)
+);
+
+CREATE TABLE IF NOT EXISTS items (
+  item_name VARCHAR(255) PRIMARY KEY,
+  item_link TEXT,
+  item_count INTEGER DEFAULT 0,
+  claimed_count INTEGER DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS guest_items (
+  guest_name VARCHAR(255) NOT NULL,
+  guest_number VARCHAR(50) NOT NULL,
+  item_name VARCHAR(255) NOT NULL,
+  quantity_claimed INTEGER DEFAULT 1,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (guest_name, guest_number, item_name),
+  FOREIGN KEY (guest_name, guest_number) REFERENCES guests(name, number) ON DELETE CASCADE,
+  FOREIGN KEY (item_name) REFERENCES items(item_name) ON DELETE CASCADE
+);
+
+-- Columns added over time by the /api/admin endpoints
+ALTER TABLE users ADD COLUMN IF NOT EXISTS number VARCHAR(50);
+ALTER TABLE guests ADD COLUMN IF NOT EXISTS going BOOLEAN DEFAULT TRUE;
+ALTER TABLE guests ALTER COLUMN going SET DEFAULT TRUE;
+ALTER TABLE items ADD COLUMN IF NOT EXISTS claimed_count INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_guests_user_email ON guests(user_email);
+CREATE INDEX IF NOT EXISTS idx_guest_items_guest ON guest_items(guest_name, guest_number);
+CREATE INDEX IF NOT EXISTS idx_guest_items_item ON guest_items(item_name);
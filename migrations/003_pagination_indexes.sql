@@ -0,0 +1,9 @@
+-- Migration: Keyset pagination indexes
+-- Description: Composite indexes matching the list endpoints' sort order
+--              (created_at DESC + primary key).
+
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at DESC, email DESC);
+CREATE INDEX IF NOT EXISTS idx_guests_created_at ON guests(created_at DESC, name DESC, number DESC);
+CREATE INDEX IF NOT EXISTS idx_items_created_at ON items(created_at DESC, item_name DESC);
+CREATE INDEX IF NOT EXISTS idx_guest_items_created_at
+  ON guest_items(created_at DESC, guest_name DESC, guest_number DESC, item_name DESC);
@@ -0,0 +1,39 @@
+-- Migration: Table write versions
+-- Description: Per-table counters bumped by statement-level triggers, used for
+--              ETag / conditional GET support and dashboard refresh checks.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+  table_name VARCHAR(63) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO table_versions (table_name)
+VALUES ('users'), ('guests'), ('items'), ('guest_items')
+ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_version ON users;
+CREATE TRIGGER trg_users_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_guests_version ON guests;
+CREATE TRIGGER trg_guests_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON guests
+FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_items_version ON items;
+CREATE TRIGGER trg_items_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON items
+FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_guest_items_version ON guest_items;
+CREATE TRIGGER trg_guest_items_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON guest_items
+FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
@@ -0,0 +1,23 @@
+-- Migration: Item claim notifications
+-- Description: NOTIFY item_claims whenever an item's claimed_count changes
+--              (consumed by utils/claimEvents.js for GET /api/items/stream).
+
+CREATE OR REPLACE FUNCTION notify_item_claim() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('item_claims', json_build_object(
+    'op', CASE WHEN NEW.claimed_count > OLD.claimed_count THEN 'claim' ELSE 'unclaim' END,
+    'item_name', NEW.item_name,
+    'item_count', NEW.item_count,
+    'claimed_count', NEW.claimed_count,
+    'available', COALESCE(NEW.item_count, 0) - COALESCE(NEW.claimed_count, 0)
+  )::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_items_claim_notify ON items;
+CREATE TRIGGER trg_items_claim_notify
+AFTER UPDATE OF claimed_count ON items
+FOR EACH ROW
+WHEN (OLD.claimed_count IS DISTINCT FROM NEW.claimed_count)
+EXECUTE FUNCTION notify_item_claim();
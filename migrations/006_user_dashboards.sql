@@ -0,0 +1,44 @@
+-- Migration: User dashboards
+-- Description: Denormalized host dashboard, one row per user (refreshed
+--              concurrently by utils/dashboardRefresher.js).
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS user_dashboards AS
+SELECT u.email AS user_email,
+       u.name AS user_name,
+       COUNT(g.name)::int AS guest_count,
+       COUNT(g.name) FILTER (WHERE g.going)::int AS going_count,
+       COUNT(g.name) FILTER (WHERE NOT g.going)::int AS not_going_count,
+       COALESCE(SUM(gc.quantity_claimed), 0)::int AS guest_quantity_claimed,
+       (SELECT COALESCE(SUM(item_count), 0)::int FROM items) AS item_total_quantity,
+       (SELECT COALESCE(SUM(claimed_count), 0)::int FROM items) AS item_claimed_quantity,
+       COALESCE(
+         json_agg(
+           json_build_object(
+             'name', g.name,
+             'number', g.number,
+             'going', g.going,
+             'quantity_claimed', COALESCE(gc.quantity_claimed, 0),
+             'claimed_items', COALESCE(gc.claimed_items, '[]'::json)
+           ) ORDER BY g.created_at DESC
+         ) FILTER (WHERE g.name IS NOT NULL),
+         '[]'::json
+       ) AS guests,
+       NOW() AS refreshed_at
+FROM users u
+LEFT JOIN guests g ON g.user_email = u.email
+LEFT JOIN LATERAL (
+  SELECT SUM(gi.quantity_claimed)::int AS quantity_claimed,
+         json_agg(
+           json_build_object(
+             'item_name', gi.item_name,
+             'quantity_claimed', gi.quantity_claimed,
+             'claimed_at', gi.created_at
+           ) ORDER BY gi.created_at DESC
+         ) AS claimed_items
+  FROM guest_items gi
+  WHERE gi.guest_name = g.name AND gi.guest_number = g.number
+) gc ON true
+GROUP BY u.email, u.name;
+
+-- Unique index required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_dashboards_email ON user_dashboards(user_email);
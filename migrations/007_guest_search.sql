@@ -0,0 +1,22 @@
+-- Migration: Guest search indexes
+-- Description: Case-insensitive prefix and fuzzy (trigram) matching on guest
+--              name, and prefix/substring matching on the digits of the phone
+--              number, for GET /api/guests/search.
+--
+-- The "C"-collated btree indexes serve prefix LIKE scans in index order, so
+-- autocomplete stops after `limit` rows; the GIN trigram indexes serve
+-- substring LIKE and word-similarity (<%) matches.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_guests_name_prefix
+  ON guests ((lower(name) COLLATE "C"), number);
+
+CREATE INDEX IF NOT EXISTS idx_guests_name_trgm
+  ON guests USING gin (lower(name) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_guests_number_prefix
+  ON guests ((regexp_replace(number, '[^0-9]', '', 'g') COLLATE "C"));
+
+CREATE INDEX IF NOT EXISTS idx_guests_number_trgm
+  ON guests USING gin (regexp_replace(number, '[^0-9]', '', 'g') gin_trgm_ops);
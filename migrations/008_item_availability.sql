@@ -0,0 +1,39 @@
+-- Migration: Item availability
+-- Description: Stored generated `available` column (remaining quantity) and
+--              partial indexes for the availability queries:
+--              GET /api/items/available (one index per sort order, covering
+--              every column but item_link), /api/items/claimed and
+--              /api/items/unclaimed.
+--
+-- item_link is left out of the INCLUDE lists: it is unbounded TEXT and a long
+-- link would exceed the btree row size limit and make the write fail.
+
+ALTER TABLE items ADD COLUMN IF NOT EXISTS available INTEGER
+  GENERATED ALWAYS AS (COALESCE(item_count, 0) - COALESCE(claimed_count, 0)) STORED;
+
+-- sort=newest (default): same order as the other list endpoints
+CREATE INDEX IF NOT EXISTS idx_items_available_created
+  ON items (created_at DESC, item_name DESC)
+  INCLUDE (item_count, claimed_count, available, updated_at)
+  WHERE available > 0;
+
+-- sort=name
+CREATE INDEX IF NOT EXISTS idx_items_available_name
+  ON items (item_name)
+  INCLUDE (item_count, claimed_count, available, created_at, updated_at)
+  WHERE available > 0;
+
+-- sort=available (most remaining first)
+CREATE INDEX IF NOT EXISTS idx_items_available_most
+  ON items (available DESC, item_name)
+  INCLUDE (item_count, claimed_count, created_at, updated_at)
+  WHERE available > 0;
+
+-- Item.findClaimed / Item.findUnclaimed
+CREATE INDEX IF NOT EXISTS idx_items_claimed
+  ON items (created_at DESC)
+  WHERE claimed_count > 0;
+
+CREATE INDEX IF NOT EXISTS idx_items_unclaimed
+  ON items (created_at DESC)
+  WHERE claimed_count = 0;
@@ -0,0 +1,119 @@
+-- Migration: Lock-free table write versions
+-- Description: Replaces the table_versions counter rows from 004 with one
+--              sequence per table. Every write used to UPDATE its table's
+--              single counter row, so all claims queued on that row lock, a
+--              COPY import held it until commit, and claim/unclaim could
+--              deadlock on it. nextval() takes no row lock and never waits.
+--
+-- Versions only move when a statement actually changed rows: the statement
+-- triggers compare the transition tables, so UPDATEs/DELETEs that matched
+-- nothing, or rewrote rows unchanged, are ignored. TRUNCATE always counts.
+--
+-- A sequence bump is visible before the writing transaction commits, so
+-- read_table_versions() also reports whether another session still holds a
+-- write lock on each table. A version is only a safe cache key while
+-- `settled` is true (see middleware/conditionalGet.js).
+
+CREATE SEQUENCE IF NOT EXISTS table_version_users_seq;
+CREATE SEQUENCE IF NOT EXISTS table_version_guests_seq;
+CREATE SEQUENCE IF NOT EXISTS table_version_items_seq;
+CREATE SEQUENCE IF NOT EXISTS table_version_guest_items_seq;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+  -- Each branch only mentions the transition tables its trigger defines
+  IF TG_OP = 'INSERT' THEN
+    PERFORM 1 FROM new_rows LIMIT 1;
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM 1 FROM old_rows LIMIT 1;
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM 1 FROM (
+      SELECT n::text FROM new_rows n
+      EXCEPT
+      SELECT o::text FROM old_rows o
+    ) changed
+    LIMIT 1;
+  END IF;
+
+  IF TG_OP = 'TRUNCATE' OR FOUND THEN
+    PERFORM nextval(format('table_version_%s_seq', TG_TABLE_NAME)::regclass);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables are only allowed on single-event triggers, so each table
+-- gets one trigger per event
+DO $$
+DECLARE
+  tbl TEXT;
+BEGIN
+  FOREACH tbl IN ARRAY ARRAY['users', 'guests', 'items', 'guest_items'] LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || tbl || '_version', tbl);
+
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || tbl || '_version_insert', tbl);
+    EXECUTE format(
+      'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+      'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+      'trg_' || tbl || '_version_insert', tbl
+    );
+
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || tbl || '_version_update', tbl);
+    EXECUTE format(
+      'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+      'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+      'trg_' || tbl || '_version_update', tbl
+    );
+
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || tbl || '_version_delete', tbl);
+    EXECUTE format(
+      'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+      'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+      'trg_' || tbl || '_version_delete', tbl
+    );
+
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_' || tbl || '_version_truncate', tbl);
+    EXECUTE format(
+      'CREATE TRIGGER %I AFTER TRUNCATE ON %I '
+      'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+      'trg_' || tbl || '_version_truncate', tbl
+    );
+  END LOOP;
+END;
+$$;
+
+DROP TABLE IF EXISTS table_versions;
+
+-- Current version of each table, and whether any other session holds a write
+-- lock on it (i.e. a write counted in the version may not be committed yet).
+-- The sequences are read before pg_locks is checked, so a write included in a
+-- reported version has either committed or is still visible as a lock holder.
+CREATE OR REPLACE FUNCTION read_table_versions(table_names TEXT[])
+RETURNS TABLE (table_name TEXT, version BIGINT, settled BOOLEAN) AS $$
+DECLARE
+  versions BIGINT[];
+BEGIN
+  SELECT array_agg(COALESCE(s.last_value, 0) ORDER BY t.ord)
+  INTO versions
+  FROM unnest(table_names) WITH ORDINALITY AS t(name, ord)
+  LEFT JOIN pg_sequences s
+    ON s.schemaname = current_schema()
+   AND s.sequencename = format('table_version_%s_seq', t.name);
+
+  RETURN QUERY
+  SELECT t.name,
+         versions[t.ord::int],
+         NOT EXISTS (
+           SELECT 1
+           FROM pg_locks l
+           WHERE l.locktype = 'relation'
+             AND l.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+             AND l.relation = to_regclass(t.name)
+             AND l.pid <> pg_backend_pid()
+             AND l.granted
+             AND l.mode IN ('RowExclusiveLock', 'ShareRowExclusiveLock', 'ExclusiveLock', 'AccessExclusiveLock')
+         )
+  FROM unnest(table_names) WITH ORDINALITY AS t(name, ord)
+  ORDER BY t.name;
+END;
+$$ LANGUAGE plpgsql;
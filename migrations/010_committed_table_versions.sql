@@ -0,0 +1,74 @@
+-- Migration: Committed table write versions
+-- Description: Replaces the per-table sequences from 009. A sequence bump is
+--              visible before the writing transaction commits, so reading
+--              them safely meant scanning pg_locks for pending writers on
+--              every conditional GET.
+--
+-- Every write statement that changes rows now INSERTs a delta row, and a
+-- table's version is the SUM of its deltas. Inserts take no shared row lock,
+-- so writers never wait on each other, and a delta only becomes visible when
+-- its transaction commits, so the version always describes committed data and
+-- grows with every commit, whatever order transactions commit in.
+-- compact_table_versions() (run periodically by one process per instance)
+-- folds each table's deltas into a single row without changing the sums.
+
+CREATE TABLE IF NOT EXISTS table_version_deltas (
+  table_name TEXT NOT NULL,
+  delta BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_table_version_deltas_table ON table_version_deltas(table_name);
+
+-- Continue from the sequence values so versions never go backwards
+INSERT INTO table_version_deltas (table_name, delta)
+SELECT t.name, COALESCE(s.last_value, 0)
+FROM unnest(ARRAY['users', 'guests', 'items', 'guest_items']) AS t(name)
+LEFT JOIN pg_sequences s
+  ON s.schemaname = current_schema()
+ AND s.sequencename = format('table_version_%s_seq', t.name)
+WHERE NOT EXISTS (SELECT 1 FROM table_version_deltas);
+
+-- Same change detection as 009; only the bump itself is different
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+  -- Each branch only mentions the transition tables its trigger defines
+  IF TG_OP = 'INSERT' THEN
+    PERFORM 1 FROM new_rows LIMIT 1;
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM 1 FROM old_rows LIMIT 1;
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM 1 FROM (
+      SELECT n::text FROM new_rows n
+      EXCEPT
+      SELECT o::text FROM old_rows o
+    ) changed
+    LIMIT 1;
+  END IF;
+
+  IF TG_OP = 'TRUNCATE' OR FOUND THEN
+    INSERT INTO table_version_deltas (table_name, delta) VALUES (TG_TABLE_NAME, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS read_table_versions(TEXT[]);
+
+DROP SEQUENCE IF EXISTS table_version_users_seq;
+DROP SEQUENCE IF EXISTS table_version_guests_seq;
+DROP SEQUENCE IF EXISTS table_version_items_seq;
+DROP SEQUENCE IF EXISTS table_version_guest_items_seq;
+
+-- Fold the deltas into one row per table. Deltas committed while this runs
+-- are not in its snapshot and are left alone; a second concurrent run waits
+-- for the first and then finds nothing left to fold
+CREATE OR REPLACE FUNCTION compact_table_versions() RETURNS void AS $$
+  WITH folded AS (
+    DELETE FROM table_version_deltas
+    RETURNING table_name, delta
+  )
+  INSERT INTO table_version_deltas (table_name, delta)
+  SELECT table_name, SUM(delta)
+  FROM folded
+  GROUP BY table_name;
+$$ LANGUAGE sql;
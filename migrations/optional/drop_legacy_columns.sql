@@ -0,0 +1,15 @@
+-- Optional: Drop legacy columns
+-- Description: Columns from the pre-guest_items schema and the old item photo.
+--              Nothing reads them any more, but dropping them destroys their
+--              data, so this is not applied automatically. Back up the
+--              database first, then run:
+--
+--                npm run migrate:drop-legacy-columns
+
+ALTER TABLE guests DROP COLUMN IF EXISTS claimed_item CASCADE;
+
+ALTER TABLE items
+  DROP COLUMN IF EXISTS claimed CASCADE,
+  DROP COLUMN IF EXISTS guest_name CASCADE,
+  DROP COLUMN IF EXISTS guest_number CASCADE,
+  DROP COLUMN IF EXISTS item_photo;
@@ -0,0 +1,49 @@
+const pool = require('../config/database');
+const { readPool } = require('../utils/readRouting');
+const { markPossiblyStale } = require('../utils/requestContext');
+const { labelMethods } = require('../utils/queryStats');
+
+// Advisory lock key so only one instance refreshes the view at a time
+const REFRESH_LOCK_KEY = 7301;
+
+class Dashboard {
+  // Get the precomputed host dashboard for a user. The view lags the tables
+  // until the next refresh, so the response can't be tagged with their versions
+  static async findByUser(email) {
+    markPossiblyStale('materialized_view');
+    const result = await readPool.query(
+      'SELECT * FROM user_dashboards WHERE user_email = $1',
+      [email]
+    );
+    return result.rows[0];
+  }
+
+  // Refresh the user_dashboards materialized view without blocking readers.
+  // Returns false if another instance is already refreshing it
+  static async refresh() {
+    const client = await pool.connect();
+
+    try {
+      await client.query('BEGIN');
+      const lock = await client.query(
+        'SELECT pg_try_advisory_xact_lock($1) AS acquired',
+        [REFRESH_LOCK_KEY]
+      );
+      if (!lock.rows[0].acquired) {
+        await client.query('ROLLBACK');
+        return false;
+      }
+      await client.query('SET LOCAL statement_timeout = 0');
+      await client.query('REFRESH MATERIALIZED VIEW CONCURRENTLY user_dashboards');
+      await client.query('COMMIT');
+      return true;
+    } catch (error) {
+      await client.query('ROLLBACK');
+      throw error;
+    } finally {
+      client.release();
+    }
+  }
+}
+
+module.exports = labelMethods(Dashboard);
@@ -1,32 +1,130 @@
 const pool = require('../config/database');
+const { prepared } = require('./statements');
+const { normalizeListOptions, selectColumns, keysetClause, toPage } = require('../utils/pagination');
+const { cursorBatches } = require('../utils/queryCursor');
+const { copyUpload } = require('../utils/bulkImport');
+const { readPool } = require('../utils/readRouting');
+const { labelMethods } = require('../utils/queryStats');
+
+// Accepted spellings of the going flag in imports
+const TRUE_VALUES = `('true', 't', 'yes', 'y', '1')`;
+const FALSE_VALUES = `('false', 'f', 'no', 'n', '0')`;
+
+// Number of rejected rows echoed back in an import summary
+const MAX_REPORTED_ERRORS = 50;
 
 class Guest {
-  // Get all guests
-  static async findAll() {
-    const result = await pool.query(
-      'SELECT * FROM guests ORDER BY created_at DESC'
+  // Primary key columns used as the keyset pagination tiebreaker
+  static KEY_COLUMNS = ['name', 'number'];
+
+  // Columns that may be requested with ?fields=
+  static LIST_FIELDS = ['name', 'number', 'user_email', 'going', 'created_at', 'updated_at'];
+
+  // Get a page of guests (keyset paginated on created_at + primary key)
+  static async findAll(options = {}) {
+    const listOptions = normalizeListOptions(options);
+    const { where, orderBy, limit, params } = keysetClause(listOptions, Guest.KEY_COLUMNS);
+    const result = await readPool.query(
+      `SELECT ${selectColumns(listOptions.fields, Guest.KEY_COLUMNS)}
+       FROM guests
+       ${where ? `WHERE ${where}` : ''}
+       ${orderBy}
+       ${limit}`,
+      params
+    );
+    return toPage(result.rows, listOptions, Guest.KEY_COLUMNS);
+  }
+
+  // Iterate over every guest in batches (server-side cursor, for streaming responses)
+  static streamAll(batchSize) {
+    return cursorBatches(
+      'SELECT * FROM guests ORDER BY created_at DESC, name DESC, number DESC',
+      [],
+      batchSize
     );
-    return result.rows;
   }
 
   // Get guest by composite key
   static async findByKey(name, number) {
-    const result = await pool.query(
-      'SELECT * FROM guests WHERE name = $1 AND number = $2',
-      [name, number]
+    const result = await readPool.query(
+      prepared('guests_find_by_key', [name, number])
     );
     return result.rows[0];
   }
 
   // Get all guests for a user
   static async findByUser(userEmail) {
-    const result = await pool.query(
+    const result = await readPool.query(
       'SELECT * FROM guests WHERE user_email = $1 ORDER BY created_at DESC',
       [userEmail]
     );
     return result.rows;
   }
 
+  // Search guests by name or phone number for autocomplete.
+  // Queries made only of phone characters match the digits of the number
+  // (prefix first, then substring); anything else matches the name
+  // case-insensitively. mode 'prefix' returns only names starting with the
+  // query, in name order; 'fuzzy' adds trigram word-similarity matches,
+  // ranked prefix hits first. Backed by the indexes in migrations/007_guest_search.sql
+  static async search(query, { limit = 10, mode = 'fuzzy', userEmail = null } = {}) {
+    const escapeLike = value => value.replace(/[\\%_]/g, '\\$&');
+    const params = [];
+    const userFilter = () => {
+      if (!userEmail) {
+        return '';
+      }
+      params.push(userEmail);
+      return `AND user_email = $${params.length}`;
+    };
+
+    let sql;
+    if (Guest.isPhoneQuery(query)) {
+      const digits = escapeLike(query.replace(/\D/g, ''));
+      params.push(`${digits}%`);
+      // Substring matches need at least one trigram (3 digits)
+      let substring = '';
+      if (mode !== 'prefix' && digits.length >= 3) {
+        params.push(`%${digits}%`);
+        substring = `OR regexp_replace(number, '[^0-9]', '', 'g') LIKE $2`;
+      }
+      sql = `
+        SELECT name, number, user_email, going, created_at, updated_at
+        FROM guests
+        WHERE (regexp_replace(number, '[^0-9]', '', 'g') COLLATE "C" LIKE $1 ${substring})
+          ${userFilter()}
+        ORDER BY (regexp_replace(number, '[^0-9]', '', 'g') COLLATE "C" LIKE $1) DESC, name, number`;
+    } else if (mode === 'prefix' || query.length < 3) {
+      // Too short for trigrams: an ordered prefix scan of idx_guests_name_prefix
+      params.push(`${escapeLike(query.toLowerCase())}%`);
+      sql = `
+        SELECT name, number, user_email, going, created_at, updated_at
+        FROM guests
+        WHERE lower(name) COLLATE "C" LIKE $1
+          ${userFilter()}
+        ORDER BY lower(name) COLLATE "C", number`;
+    } else {
+      const term = query.toLowerCase();
+      params.push(term, `${escapeLike(term)}%`);
+      sql = `
+        SELECT name, number, user_email, going, created_at, updated_at,
+               word_similarity($1, lower(name)) AS score
+        FROM guests
+        WHERE (lower(name) LIKE $2 OR $1 <% lower(name))
+          ${userFilter()}
+        ORDER BY (lower(name) LIKE $2) DESC, score DESC, name, number`;
+    }
+
+    params.push(limit);
+    const result = await readPool.query(`${sql}\n        LIMIT $${params.length}`, params);
+    return result.rows;
+  }
+
+  // True when a search query looks like (part of) a phone number
+  static isPhoneQuery(query) {
+    return /^[\d\s+().-]+$/.test(query) && /\d/.test(query);
+  }
+
   // Create new guest
   static async create(guestData) {
     const { name, number, user_email, going } = guestData;
@@ -63,9 +161,130 @@ class Guest {
     return result.rows[0];
   }
 
+  // Bulk import guests from a CSV or NDJSON stream.
+  // Rows are COPYed into a temporary staging table, validated, de-duplicated
+  // (last row wins) and merged into guests in the same transaction: existing
+  // guests are updated (blank fields keep their current value), new guests are
+  // inserted with defaultUserEmail when no user_email is given.
+  static async bulkImport(source, { format, defaultUserEmail = null }) {
+    const client = await pool.connect();
+
+    try {
+      await client.query('BEGIN');
+      await client.query('SET LOCAL statement_timeout = 0');
+
+      await client.query(`
+        CREATE TEMP TABLE guest_import (
+          row_number BIGINT GENERATED ALWAYS AS IDENTITY,
+          name TEXT,
+          number TEXT,
+          user_email TEXT,
+          going TEXT,
+          parse_error TEXT
+        ) ON COMMIT DROP
+      `);
+
+      await copyUpload(client, source, {
+        format,
+        table: 'guest_import',
+        stagingColumns: ['name', 'number', 'user_email', 'going'],
+        requiredColumns: ['name', 'number']
+      });
+
+      await client.query(`
+        CREATE TEMP TABLE guest_import_checked ON COMMIT DROP AS
+        SELECT s.row_number,
+               NULLIF(trim(s.name), '') AS name,
+               NULLIF(trim(s.number), '') AS number,
+               NULLIF(trim(s.user_email), '') AS user_email,
+               CASE
+                 WHEN lower(trim(s.going)) IN ${TRUE_VALUES} THEN TRUE
+                 WHEN lower(trim(s.going)) IN ${FALSE_VALUES} THEN FALSE
+               END AS going,
+               CASE
+                 WHEN s.parse_error IS NOT NULL THEN s.parse_error
+                 WHEN NULLIF(trim(s.name), '') IS NULL OR NULLIF(trim(s.number), '') IS NULL
+                   THEN 'name and number are required'
+                 WHEN length(trim(s.name)) > 255 THEN 'name is longer than 255 characters'
+                 WHEN length(trim(s.number)) > 50 THEN 'number is longer than 50 characters'
+                 WHEN NULLIF(trim(s.going), '') IS NOT NULL
+                   AND lower(trim(s.going)) NOT IN ${TRUE_VALUES}
+                   AND lower(trim(s.going)) NOT IN ${FALSE_VALUES}
+                   THEN 'invalid going value'
+                 WHEN NULLIF(trim(s.user_email), '') IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM users u WHERE u.email = trim(s.user_email))
+                   THEN 'user_email does not exist'
+               END AS error
+        FROM guest_import s
+      `);
+
+      await client.query(`
+        CREATE TEMP TABLE guest_import_valid ON COMMIT DROP AS
+        SELECT DISTINCT ON (name, number) name, number, user_email, going
+        FROM guest_import_checked
+        WHERE error IS NULL
+        ORDER BY name, number, row_number DESC
+      `);
+
+      const updated = await client.query(`
+        UPDATE guests g
+        SET user_email = COALESCE(v.user_email, g.user_email),
+            going = COALESCE(v.going, g.going),
+            updated_at = CURRENT_TIMESTAMP
+        FROM guest_import_valid v
+        WHERE g.name = v.name AND g.number = v.number
+      `);
+
+      const inserted = await client.query(
+        `INSERT INTO guests (name, number, user_email, going)
+         SELECT v.name, v.number, COALESCE(v.user_email, $1), COALESCE(v.going, TRUE)
+         FROM guest_import_valid v
+         WHERE NOT EXISTS (
+           SELECT 1 FROM guests g WHERE g.name = v.name AND g.number = v.number
+         )
+         ON CONFLICT (name, number) DO NOTHING`,
+        [defaultUserEmail]
+      );
+
+      const summary = await client.query(
+        `SELECT COUNT(*)::int AS total,
+                COUNT(*) FILTER (WHERE error IS NOT NULL)::int AS rejected,
+                (COUNT(*) FILTER (WHERE error IS NULL)
+                  - (SELECT COUNT(*) FROM guest_import_valid))::int AS duplicates,
+                COALESCE((
+                  SELECT json_agg(json_build_object('row', row_number, 'error', error) ORDER BY row_number)
+                  FROM (
+                    SELECT row_number, error FROM guest_import_checked
+                    WHERE error IS NOT NULL
+                    ORDER BY row_number
+                    LIMIT $1
+                  ) e
+                ), '[]'::json) AS errors
+         FROM guest_import_checked`,
+        [MAX_REPORTED_ERRORS]
+      );
+
+      await client.query('COMMIT');
+
+      return {
+        total: summary.rows[0].total,
+        inserted: inserted.rowCount,
+        updated: updated.rowCount,
+        rejected: summary.rows[0].rejected,
+        duplicates: summary.rows[0].duplicates,
+        errors: summary.rows[0].errors
+      };
+    } catch (error) {
+      await client.query('ROLLBACK');
+      throw error;
+    } finally {
+      client.release();
+    }
+  }
+
   // Get guest with their claimed items
   static async findWithItems(name, number) {
-    const result = await pool.query(
+    const result = await readPool.query(
       `SELECT g.*, 
               json_agg(
                 json_build_object(
@@ -87,4 +306,4 @@ class Guest {
   }
 }
 
-module.exports = Guest;
+module.exports = labelMethods(Guest);
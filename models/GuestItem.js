@@ -1,141 +1,272 @@
 const pool = require('../config/database');
+const { prepared } = require('./statements');
+const Item = require('./Item');
+const { normalizeListOptions, selectColumns, keysetClause, toPage } = require('../utils/pagination');
+const { cursorBatches } = require('../utils/queryCursor');
+const { readPool } = require('../utils/readRouting');
+const { labelMethods } = require('../utils/queryStats');
 
 class GuestItem {
+  // Primary key columns used as the keyset pagination tiebreaker
+  static KEY_COLUMNS = ['guest_name', 'guest_number', 'item_name'];
+
+  // Columns that may be requested with ?fields=
+  static LIST_FIELDS = ['guest_name', 'guest_number', 'item_name', 'quantity_claimed', 'created_at', 'item_link'];
+
   // Get all claimed items for a guest
   static async findByGuest(guestName, guestNumber) {
-    const result = await pool.query(
-      `SELECT gi.*, i.item_link, i.item_count
-       FROM guest_items gi
-       JOIN items i ON gi.item_name = i.item_name
-       WHERE gi.guest_name = $1 AND gi.guest_number = $2
-       ORDER BY gi.created_at DESC`,
-      [guestName, guestNumber]
+    const result = await readPool.query(
+      prepared('guest_items_find_by_guest', [guestName, guestNumber])
     );
     return result.rows;
   }
 
   // Get all guests who claimed a specific item
   static async findByItem(itemName) {
-    const result = await pool.query(
-      `SELECT gi.*, g.user_email, g.going
-       FROM guest_items gi
-       JOIN guests g ON gi.guest_name = g.name AND gi.guest_number = g.number
-       WHERE gi.item_name = $1
-       ORDER BY gi.created_at DESC`,
-      [itemName]
+    const result = await readPool.query(
+      prepared('guest_items_find_by_item', [itemName])
     );
     return result.rows;
   }
 
-  // Claim an item (or update quantity if already claimed)
+  // Claim an item (or add to the quantity if already claimed)
+  // Upsert and guarded claimed_count bump run as one statement, so a claim can
+  // never push claimed_count past item_count even under concurrent requests
   static async claim(guestName, guestNumber, itemName, quantity = 1) {
-    const client = await pool.connect();
-    
-    try {
-      await client.query('BEGIN');
-      
-      // Check if guest already claimed this item
-      const existing = await client.query(
-        `SELECT * FROM guest_items 
-         WHERE guest_name = $1 AND guest_number = $2 AND item_name = $3`,
-        [guestName, guestNumber, itemName]
-      );
-      
-      let result;
-      if (existing.rows.length > 0) {
-        // Update quantity
-        result = await client.query(
-          `UPDATE guest_items 
-           SET quantity_claimed = quantity_claimed + $1
-           WHERE guest_name = $2 AND guest_number = $3 AND item_name = $4
-           RETURNING *`,
-          [quantity, guestName, guestNumber, itemName]
-        );
-      } else {
-        // Insert new claim
-        result = await client.query(
-          `INSERT INTO guest_items (guest_name, guest_number, item_name, quantity_claimed)
-           VALUES ($1, $2, $3, $4)
-           RETURNING *`,
-          [guestName, guestNumber, itemName, quantity]
-        );
-      }
-      
-      // Update item's claimed_count
-      await client.query(
-        `UPDATE items 
-         SET claimed_count = claimed_count + $1
-         WHERE item_name = $2`,
-        [quantity, itemName]
-      );
-      
-      await client.query('COMMIT');
-      return result.rows[0];
-      
-    } catch (error) {
-      await client.query('ROLLBACK');
+    const result = await pool.query(
+      `WITH bumped AS (
+         UPDATE items
+         SET claimed_count = COALESCE(claimed_count, 0) + $4::int
+         WHERE item_name = $3
+           AND COALESCE(claimed_count, 0) + $4::int <= COALESCE(item_count, 0)
+         RETURNING item_name, item_count, claimed_count
+       ),
+       claimed AS (
+         INSERT INTO guest_items (guest_name, guest_number, item_name, quantity_claimed)
+         SELECT $1::varchar, $2::varchar, item_name, $4::int FROM bumped
+         ON CONFLICT (guest_name, guest_number, item_name)
+         DO UPDATE SET quantity_claimed = guest_items.quantity_claimed + EXCLUDED.quantity_claimed
+         RETURNING *
+       )
+       SELECT c.guest_name, c.guest_number, c.item_name, c.quantity_claimed, c.created_at,
+              i.item_name IS NOT NULL AS item_exists,
+              COALESCE(b.item_count, i.item_count, 0) AS item_count,
+              COALESCE(b.claimed_count, i.claimed_count, 0) AS claimed_count
+       FROM (SELECT $3::varchar AS item_name) req
+       LEFT JOIN items i ON i.item_name = req.item_name
+       LEFT JOIN bumped b ON true
+       LEFT JOIN claimed c ON true`,
+      [guestName, guestNumber, itemName, quantity]
+    );
+
+    const { item_exists, item_count, claimed_count, ...claim } = result.rows[0];
+
+    if (!item_exists) {
+      throw new Error('Item not found');
+    }
+
+    const remaining = item_count - claimed_count;
+
+    if (!claim.item_name) {
+      const error = new Error('Not enough items available');
+      error.available = remaining;
       throw error;
-    } finally {
-      client.release();
     }
+
+    Item.invalidateCache();
+    return { ...claim, item_count, claimed_count, remaining };
+  }
+
+  // Claim several items for one guest in a single set-based statement
+  // Item rows are locked in name order first, so overlapping batches can't deadlock.
+  // claims is an array of { item_name, quantity }; duplicate item names are summed.
+  // Each item is claimed only if its full quantity is still available; returns one
+  // outcome per requested item with status 'claimed', 'insufficient' or 'not_found'
+  static async claimBatch(guestName, guestNumber, claims) {
+    const result = await pool.query(
+      `WITH requested AS (
+         SELECT item_name, SUM(quantity)::int AS quantity, MIN(ord) AS ord
+         FROM unnest($3::varchar[], $4::int[]) WITH ORDINALITY AS r(item_name, quantity, ord)
+         GROUP BY item_name
+       ),
+       locked_items AS (
+         SELECT i.item_name
+         FROM items i
+         JOIN requested req ON req.item_name = i.item_name
+         ORDER BY i.item_name
+         FOR UPDATE OF i
+       ),
+       bumped AS (
+         UPDATE items i
+         SET claimed_count = COALESCE(i.claimed_count, 0) + req.quantity
+         FROM requested req
+         JOIN locked_items l ON l.item_name = req.item_name
+         WHERE i.item_name = req.item_name
+           AND COALESCE(i.claimed_count, 0) + req.quantity <= COALESCE(i.item_count, 0)
+         RETURNING i.item_name, i.item_count, i.claimed_count, req.quantity
+       ),
+       claimed AS (
+         INSERT INTO guest_items (guest_name, guest_number, item_name, quantity_claimed)
+         SELECT $1::varchar, $2::varchar, item_name, quantity FROM bumped
+         ON CONFLICT (guest_name, guest_number, item_name)
+         DO UPDATE SET quantity_claimed = guest_items.quantity_claimed + EXCLUDED.quantity_claimed
+         RETURNING item_name, quantity_claimed
+       )
+       SELECT req.item_name,
+              req.quantity,
+              CASE
+                WHEN i.item_name IS NULL THEN 'not_found'
+                WHEN b.item_name IS NULL THEN 'insufficient'
+                ELSE 'claimed'
+              END AS status,
+              c.quantity_claimed,
+              COALESCE(b.item_count, i.item_count, 0)
+                - COALESCE(b.claimed_count, i.claimed_count, 0) AS remaining
+       FROM requested req
+       LEFT JOIN items i ON i.item_name = req.item_name
+       LEFT JOIN bumped b ON b.item_name = req.item_name
+       LEFT JOIN claimed c ON c.item_name = req.item_name
+       ORDER BY req.ord`,
+      [
+        guestName,
+        guestNumber,
+        claims.map(claim => claim.item_name),
+        claims.map(claim => claim.quantity)
+      ]
+    );
+
+    if (result.rows.some(row => row.status === 'claimed')) {
+      Item.invalidateCache();
+    }
+    return result.rows;
   }
 
-  // Unclaim an item (remove guest's claim)
+  // Unclaim an item (remove guest's claim and release its quantity)
   static async unclaim(guestName, guestNumber, itemName) {
-    const client = await pool.connect();
-    
-    try {
-      await client.query('BEGIN');
-      
-      // Get the quantity that was claimed
-      const claim = await client.query(
-        `SELECT quantity_claimed FROM guest_items 
-         WHERE guest_name = $1 AND guest_number = $2 AND item_name = $3`,
-        [guestName, guestNumber, itemName]
-      );
-      
-      if (claim.rows.length === 0) {
-        throw new Error('Claim not found');
-      }
-      
-      const quantity = claim.rows[0].quantity_claimed;
-      
-      // Delete the claim
-      const result = await client.query(
-        `DELETE FROM guest_items 
+    const result = await pool.query(
+      `WITH locked_item AS (
+         SELECT item_name FROM items WHERE item_name = $3 FOR UPDATE
+       ),
+       removed AS (
+         DELETE FROM guest_items gi
+         USING locked_item l
+         WHERE gi.guest_name = $1 AND gi.guest_number = $2 AND gi.item_name = l.item_name
+         RETURNING gi.*
+       ),
+       released AS (
+         UPDATE items i
+         SET claimed_count = GREATEST(COALESCE(i.claimed_count, 0) - r.quantity_claimed, 0)
+         FROM removed r
+         WHERE i.item_name = r.item_name
+         RETURNING i.item_count, i.claimed_count
+       )
+       SELECT r.*,
+              COALESCE(rel.item_count, 0) AS item_count,
+              COALESCE(rel.claimed_count, 0) AS claimed_count
+       FROM removed r
+       LEFT JOIN released rel ON true`,
+      [guestName, guestNumber, itemName]
+    );
+
+    if (result.rows.length === 0) {
+      throw new Error('Claim not found');
+    }
+
+    Item.invalidateCache();
+    const claim = result.rows[0];
+    return { ...claim, remaining: claim.item_count - claim.claimed_count };
+  }
+
+  // Change the quantity of an existing claim, adjusting claimed_count by the
+  // difference in the same statement (rejected if it would over-claim).
+  // Like claim() and unclaim(), this locks the item row before the claim row,
+  // so concurrent claim changes on one item queue instead of deadlocking
+  static async updateQuantity(guestName, guestNumber, itemName, quantity) {
+    const result = await pool.query(
+      `WITH locked_item AS (
+         SELECT item_name FROM items WHERE item_name = $3 FOR UPDATE
+       ),
+       current AS (
+         SELECT gi.quantity_claimed
+         FROM guest_items gi
+         JOIN locked_item l ON gi.item_name = l.item_name
+         WHERE gi.guest_name = $1 AND gi.guest_number = $2
+         FOR UPDATE OF gi
+       ),
+       bumped AS (
+         UPDATE items i
+         SET claimed_count = COALESCE(i.claimed_count, 0) + ($4::int - c.quantity_claimed)
+         FROM current c
+         WHERE i.item_name = $3
+           AND COALESCE(i.claimed_count, 0) + ($4::int - c.quantity_claimed) <= COALESCE(i.item_count, 0)
+         RETURNING i.item_count, i.claimed_count
+       ),
+       updated AS (
+         UPDATE guest_items
+         SET quantity_claimed = $4::int
          WHERE guest_name = $1 AND guest_number = $2 AND item_name = $3
-         RETURNING *`,
-        [guestName, guestNumber, itemName]
-      );
-      
-      // Update item's claimed_count
-      await client.query(
-        `UPDATE items 
-         SET claimed_count = claimed_count - $1
-         WHERE item_name = $2`,
-        [quantity, itemName]
-      );
-      
-      await client.query('COMMIT');
-      return result.rows[0];
-      
-    } catch (error) {
-      await client.query('ROLLBACK');
+           AND EXISTS (SELECT 1 FROM bumped)
+         RETURNING *
+       )
+       SELECT u.*,
+              EXISTS (SELECT 1 FROM current) AS claim_exists,
+              COALESCE(b.item_count, i.item_count, 0) AS item_count,
+              COALESCE(b.claimed_count, i.claimed_count, 0) AS claimed_count
+       FROM (SELECT $3::varchar AS item_name) req
+       LEFT JOIN items i ON i.item_name = req.item_name
+       LEFT JOIN bumped b ON true
+       LEFT JOIN updated u ON true`,
+      [guestName, guestNumber, itemName, quantity]
+    );
+
+    const { claim_exists, item_count, claimed_count, ...claim } = result.rows[0];
+
+    if (!claim_exists) {
+      throw new Error('Claim not found');
+    }
+
+    const remaining = item_count - claimed_count;
+
+    if (!claim.item_name) {
+      const error = new Error('Not enough items available');
+      error.available = remaining;
       throw error;
-    } finally {
-      client.release();
     }
+
+    Item.invalidateCache();
+    return { ...claim, item_count, claimed_count, remaining };
   }
 
-  // Get all claims
-  static async findAll() {
-    const result = await pool.query(
+  // Get a page of claims (keyset paginated on created_at + primary key)
+  static async findAll(options = {}) {
+    const listOptions = normalizeListOptions(options);
+    const claimFields = listOptions.fields
+      ? listOptions.fields.filter(field => field !== 'item_link')
+      : null;
+    const includeLink = !listOptions.fields || listOptions.fields.includes('item_link');
+    const { where, orderBy, limit, params } = keysetClause(listOptions, GuestItem.KEY_COLUMNS, 'gi');
+    const result = await readPool.query(
+      `SELECT ${selectColumns(claimFields, GuestItem.KEY_COLUMNS, 'gi')}${includeLink ? ', i.item_link' : ''}
+       FROM guest_items gi
+       JOIN items i ON gi.item_name = i.item_name
+       ${where ? `WHERE ${where}` : ''}
+       ${orderBy}
+       ${limit}`,
+      params
+    );
+    return toPage(result.rows, listOptions, GuestItem.KEY_COLUMNS);
+  }
+
+  // Iterate over every claim in batches (server-side cursor, for streaming responses)
+  static streamAll(batchSize) {
+    return cursorBatches(
       `SELECT gi.*, i.item_link
        FROM guest_items gi
        JOIN items i ON gi.item_name = i.item_name
-       ORDER BY gi.created_at DESC`
+       ORDER BY gi.created_at DESC, gi.guest_name DESC, gi.guest_number DESC, gi.item_name DESC`,
+      [],
+      batchSize
     );
-    return result.rows;
   }
 
   // Delete all claims for a guest
@@ -161,5 +292,5 @@ class GuestItem {
   }
 }
 
-module.exports = GuestItem;
+module.exports = labelMethods(GuestItem);
 
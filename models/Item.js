@@ -1,26 +1,96 @@
 const pool = require('../config/database');
+const { prepared } = require('./statements');
+const {
+  normalizeListOptions,
+  selectColumns,
+  keysetClause,
+  toPage,
+  orderedKeysetClause,
+  toOrderedPage
+} = require('../utils/pagination');
+const { LruCache } = require('../utils/cache');
+const { SingleFlight } = require('../utils/singleFlight');
+const { cursorBatches } = require('../utils/queryCursor');
+const { copyUpload } = require('../utils/bulkImport');
+const { readPool, target: readTarget } = require('../utils/readRouting');
+const { labelMethods } = require('../utils/queryStats');
+const clusterMode = require('../utils/cluster');
+
+// Number of rejected rows echoed back in an import summary
+const MAX_REPORTED_ERRORS = 50;
+
+// Read-through cache for catalog list queries; cleared on every item or claim write,
+// in every worker of this instance. ITEM_CACHE_TTL_MS bounds staleness across instances
+const catalogCache = new LruCache({
+  name: 'items',
+  maxEntries: parseInt(process.env.ITEM_CACHE_MAX_ENTRIES, 10) || 500,
+  ttlMs: process.env.ITEM_CACHE_TTL_MS !== undefined
+    ? parseInt(process.env.ITEM_CACHE_TTL_MS, 10)
+    : 30000
+});
+
+// Identical catalog reads issued concurrently (a registry link opened by many
+// guests at once) share one query; cleared with the cache on every write.
+// Cache keys and coalescing arguments include the read target, so a client
+// pinned to the primary after a write never gets a replica result
+const itemFlights = new SingleFlight({ name: 'items' });
+
+const clearCatalog = () => {
+  catalogCache.clear();
+  itemFlights.clear();
+};
+
+// Writes made by the other cluster workers of this instance clear this
+// worker's cache too; other instances still rely on ITEM_CACHE_TTL_MS
+const CACHE_INVALIDATE_TOPIC = 'items:invalidate';
+clusterMode.onBroadcast(CACHE_INVALIDATE_TOPIC, clearCatalog);
 
 class Item {
-  // Get all items
-  static async findAll() {
-    const result = await pool.query(
-      'SELECT * FROM items ORDER BY created_at DESC'
-    );
-    return result.rows;
+  // Primary key columns used as the keyset pagination tiebreaker
+  static KEY_COLUMNS = ['item_name'];
+
+  // Columns that may be requested with ?fields=
+  static LIST_FIELDS = ['item_name', 'item_link', 'item_count', 'claimed_count', 'available', 'created_at', 'updated_at'];
+
+  // Sort orders for findAvailable ('newest' uses the standard created_at keyset)
+  static AVAILABLE_SORTS = {
+    newest: null,
+    name: [{ column: 'item_name' }],
+    available: [{ column: 'available', desc: true }, { column: 'item_name' }]
+  };
+
+  // Get a page of items (keyset paginated on created_at + primary key)
+  static async findAll(options = {}) {
+    const listOptions = normalizeListOptions(options);
+    return catalogCache.wrap(`${readTarget()}:findAll:${JSON.stringify(listOptions)}`, () => (
+      itemFlights.run('findAll', [readTarget(), listOptions], async () => {
+        const { where, orderBy, limit, params } = keysetClause(listOptions, Item.KEY_COLUMNS);
+        const result = await readPool.query(
+          `SELECT ${selectColumns(listOptions.fields, Item.KEY_COLUMNS)}
+           FROM items
+           ${where ? `WHERE ${where}` : ''}
+           ${orderBy}
+           ${limit}`,
+          params
+        );
+        return toPage(result.rows, listOptions, Item.KEY_COLUMNS);
+      })
+    ));
   }
 
   // Get item by name
   static async findByName(itemName) {
-    const result = await pool.query(
-      'SELECT * FROM items WHERE item_name = $1',
-      [itemName]
-    );
-    return result.rows[0];
+    return itemFlights.run('findByName', [readTarget(), itemName], async () => {
+      const result = await readPool.query(
+        prepared('items_find_by_name', [itemName])
+      );
+      return result.rows[0];
+    });
   }
 
   // Get all items for a guest (through guest_items junction table)
   static async findByGuest(guestName, guestNumber) {
-    const result = await pool.query(
+    const result = await readPool.query(
       `SELECT i.*, gi.quantity_claimed, gi.created_at as claimed_at
        FROM items i
        JOIN guest_items gi ON i.item_name = gi.item_name
@@ -33,41 +103,80 @@ class Item {
 
   // Get all claimed items (items with claimed_count > 0)
   static async findClaimed() {
-    const result = await pool.query(
-      'SELECT * FROM items WHERE claimed_count > 0 ORDER BY created_at DESC'
-    );
-    return result.rows;
+    return catalogCache.wrap(`${readTarget()}:findClaimed`, () => (
+      itemFlights.run('findClaimed', [readTarget()], async () => {
+        const result = await readPool.query(
+          'SELECT * FROM items WHERE claimed_count > 0 ORDER BY created_at DESC'
+        );
+        return result.rows;
+      })
+    ));
   }
 
   // Get all unclaimed items (items with claimed_count = 0)
   static async findUnclaimed() {
-    const result = await pool.query(
-      'SELECT * FROM items WHERE claimed_count = 0 ORDER BY created_at DESC'
-    );
-    return result.rows;
+    return catalogCache.wrap(`${readTarget()}:findUnclaimed`, () => (
+      itemFlights.run('findUnclaimed', [readTarget()], async () => {
+        const result = await readPool.query(
+          'SELECT * FROM items WHERE claimed_count = 0 ORDER BY created_at DESC'
+        );
+        return result.rows;
+      })
+    ));
+  }
+
+  // Get a page of items with remaining quantity (available > 0), sorted by
+  // 'newest', 'name' or 'available'. Each sort walks its own partial index from
+  // migrations/008_item_availability.sql; leaving item_link out of ?fields=
+  // makes it an index-only scan
+  static async findAvailable(options = {}, sort = 'newest') {
+    const listOptions = normalizeListOptions(options);
+    return catalogCache.wrap(`${readTarget()}:findAvailable:${sort}:${JSON.stringify(listOptions)}`, () => (
+      itemFlights.run('findAvailable', [readTarget(), sort, listOptions], async () => {
+        const order = Item.AVAILABLE_SORTS[sort];
+        const keyColumns = order ? order.map(entry => entry.column) : Item.KEY_COLUMNS;
+        const { where, orderBy, limit, params } = order
+          ? orderedKeysetClause(listOptions, order)
+          : keysetClause(listOptions, Item.KEY_COLUMNS);
+        const result = await readPool.query(
+          `SELECT ${selectColumns(listOptions.fields, keyColumns)}
+           FROM items
+           WHERE available > 0
+           ${where ? `AND ${where}` : ''}
+           ${orderBy}
+           ${limit}`,
+          params
+        );
+        return order
+          ? toOrderedPage(result.rows, listOptions, order)
+          : toPage(result.rows, listOptions, Item.KEY_COLUMNS);
+      })
+    ));
   }
 
   // Get item with list of guests who claimed it
   static async findWithGuests(itemName) {
-    const result = await pool.query(
-      `SELECT i.*,
-              json_agg(
-                json_build_object(
-                  'guest_name', gi.guest_name,
-                  'guest_number', gi.guest_number,
-                  'quantity_claimed', gi.quantity_claimed,
-                  'claimed_at', gi.created_at,
-                  'going', g.going
-                )
-              ) FILTER (WHERE gi.guest_name IS NOT NULL) as claimed_by
-       FROM items i
-       LEFT JOIN guest_items gi ON i.item_name = gi.item_name
-       LEFT JOIN guests g ON gi.guest_name = g.name AND gi.guest_number = g.number
-       WHERE i.item_name = $1
-       GROUP BY i.item_name`,
-      [itemName]
-    );
-    return result.rows[0];
+    return itemFlights.run('findWithGuests', [readTarget(), itemName], async () => {
+      const result = await readPool.query(
+        `SELECT i.*,
+                json_agg(
+                  json_build_object(
+                    'guest_name', gi.guest_name,
+                    'guest_number', gi.guest_number,
+                    'quantity_claimed', gi.quantity_claimed,
+                    'claimed_at', gi.created_at,
+                    'going', g.going
+                  )
+                ) FILTER (WHERE gi.guest_name IS NOT NULL) as claimed_by
+         FROM items i
+         LEFT JOIN guest_items gi ON i.item_name = gi.item_name
+         LEFT JOIN guests g ON gi.guest_name = g.name AND gi.guest_number = g.number
+         WHERE i.item_name = $1
+         GROUP BY i.item_name`,
+        [itemName]
+      );
+      return result.rows[0];
+    });
   }
 
   // Create new item
@@ -79,6 +188,7 @@ class Item {
        RETURNING *`,
       [item_name, item_link, item_count || 0]
     );
+    Item.invalidateCache();
     return result.rows[0];
   }
 
@@ -94,6 +204,7 @@ class Item {
        RETURNING *`,
       [item_link, item_count, itemName]
     );
+    Item.invalidateCache();
     return result.rows[0];
   }
 
@@ -103,17 +214,199 @@ class Item {
       'DELETE FROM items WHERE item_name = $1 RETURNING *',
       [itemName]
     );
+    Item.invalidateCache();
     return result.rows[0];
   }
 
   // Get availability (how many still available to claim)
   static async getAvailability(itemName) {
-    const result = await pool.query(
-      'SELECT item_count, claimed_count, (item_count - claimed_count) as available FROM items WHERE item_name = $1',
-      [itemName]
+    const result = await readPool.query(
+      prepared('items_get_availability', [itemName])
     );
     return result.rows[0];
   }
+
+  // Bulk upsert items from a CSV or NDJSON stream.
+  // Rows are COPYed into a temporary staging table, validated, de-duplicated
+  // (last row wins) and merged with the same semantics as create/update:
+  // new items start with claimed_count 0, existing items keep their current
+  // item_link / item_count where the row leaves them blank. A row that would
+  // set item_count below the quantity already claimed is rejected.
+  static async bulkUpsert(source, { format }) {
+    const client = await pool.connect();
+
+    try {
+      await client.query('BEGIN');
+      await client.query('SET LOCAL statement_timeout = 0');
+
+      await client.query(`
+        CREATE TEMP TABLE item_import (
+          row_number BIGINT GENERATED ALWAYS AS IDENTITY,
+          item_name TEXT,
+          item_link TEXT,
+          item_count TEXT,
+          parse_error TEXT
+        ) ON COMMIT DROP
+      `);
+
+      await copyUpload(client, source, {
+        format,
+        table: 'item_import',
+        stagingColumns: ['item_name', 'item_link', 'item_count'],
+        requiredColumns: ['item_name'],
+        ignoredColumns: ['claimed_count', 'claimed_by']
+      });
+
+      await client.query(`
+        CREATE TEMP TABLE item_import_checked ON COMMIT DROP AS
+        SELECT s.row_number,
+               NULLIF(trim(s.item_name), '') AS item_name,
+               NULLIF(trim(s.item_link), '') AS item_link,
+               CASE WHEN trim(s.item_count) ~ '^[0-9]{1,9}$' THEN trim(s.item_count)::int END AS item_count,
+               CASE
+                 WHEN s.parse_error IS NOT NULL THEN s.parse_error
+                 WHEN NULLIF(trim(s.item_name), '') IS NULL THEN 'item_name is required'
+                 WHEN length(trim(s.item_name)) > 255 THEN 'item_name is longer than 255 characters'
+                 WHEN NULLIF(trim(s.item_count), '') IS NOT NULL
+                   AND trim(s.item_count) !~ '^[0-9]{1,9}$'
+                   THEN 'item_count must be a non-negative integer'
+               END AS error
+        FROM item_import s
+      `);
+
+      await client.query(`
+        CREATE TEMP TABLE item_import_valid ON COMMIT DROP AS
+        SELECT DISTINCT ON (item_name) row_number, item_name, item_link, item_count
+        FROM item_import_checked
+        WHERE error IS NULL
+        ORDER BY item_name, row_number DESC
+      `);
+
+      // Lock the existing items (in name order, like claimBatch) so their
+      // claimed_count can't grow between this check and the update
+      await client.query(`
+        SELECT COUNT(*) FROM (
+          SELECT 1
+          FROM items i
+          JOIN item_import_valid v ON v.item_name = i.item_name
+          ORDER BY i.item_name
+          FOR UPDATE OF i
+        ) locked
+      `);
+
+      await client.query(`
+        WITH refused AS (
+          DELETE FROM item_import_valid v
+          USING items i
+          WHERE i.item_name = v.item_name
+            AND v.item_count < COALESCE(i.claimed_count, 0)
+          RETURNING v.row_number, i.claimed_count
+        )
+        UPDATE item_import_checked c
+        SET error = format('item_count is below the %s already claimed', r.claimed_count)
+        FROM refused r
+        WHERE c.row_number = r.row_number
+      `);
+
+      const updated = await client.query(`
+        UPDATE items i
+        SET item_link = COALESCE(v.item_link, i.item_link),
+            item_count = COALESCE(v.item_count, i.item_count),
+            updated_at = CURRENT_TIMESTAMP
+        FROM item_import_valid v
+        WHERE i.item_name = v.item_name
+      `);
+
+      const inserted = await client.query(`
+        INSERT INTO items (item_name, item_link, item_count, claimed_count)
+        SELECT v.item_name, v.item_link, COALESCE(v.item_count, 0), 0
+        FROM item_import_valid v
+        WHERE NOT EXISTS (SELECT 1 FROM items i WHERE i.item_name = v.item_name)
+        ON CONFLICT (item_name) DO NOTHING
+      `);
+
+      const summary = await client.query(
+        `SELECT COUNT(*)::int AS total,
+                COUNT(*) FILTER (WHERE error IS NOT NULL)::int AS rejected,
+                (COUNT(*) FILTER (WHERE error IS NULL)
+                  - (SELECT COUNT(*) FROM item_import_valid))::int AS duplicates,
+                COALESCE((
+                  SELECT json_agg(json_build_object('row', row_number, 'error', error) ORDER BY row_number)
+                  FROM (
+                    SELECT row_number, error FROM item_import_checked
+                    WHERE error IS NOT NULL
+                    ORDER BY row_number
+                    LIMIT $1
+                  ) e
+                ), '[]'::json) AS errors
+         FROM item_import_checked`,
+        [MAX_REPORTED_ERRORS]
+      );
+
+      await client.query('COMMIT');
+      Item.invalidateCache();
+
+      return {
+        total: summary.rows[0].total,
+        inserted: inserted.rowCount,
+        updated: updated.rowCount,
+        rejected: summary.rows[0].rejected,
+        duplicates: summary.rows[0].duplicates,
+        errors: summary.rows[0].errors
+      };
+    } catch (error) {
+      await client.query('ROLLBACK');
+      throw error;
+    } finally {
+      client.release();
+    }
+  }
+
+  // Iterate over every item with its claimed_count and claimants, in batches
+  // (server-side cursor, for streaming exports)
+  static streamExport(batchSize) {
+    return cursorBatches(
+      `SELECT i.item_name, i.item_link, i.item_count, i.claimed_count,
+              COALESCE(c.claimed_by, '[]'::json) AS claimed_by
+       FROM items i
+       LEFT JOIN LATERAL (
+         SELECT json_agg(
+                  json_build_object(
+                    'guest_name', gi.guest_name,
+                    'guest_number', gi.guest_number,
+                    'quantity_claimed', gi.quantity_claimed
+                  ) ORDER BY gi.created_at
+                ) AS claimed_by
+         FROM guest_items gi
+         WHERE gi.item_name = i.item_name
+       ) c ON true
+       ORDER BY i.item_name`,
+      [],
+      batchSize
+    );
+  }
+
+  // Drop cached catalog reads here and in the other cluster workers (called
+  // after every item write and claim/unclaim)
+  static invalidateCache() {
+    clearCatalog();
+    clusterMode.broadcast(CACHE_INVALIDATE_TOPIC);
+  }
+
+  // Pre-load the default catalog queries (GET /api/items, /claimed, /unclaimed, /available)
+  static async warmCache() {
+    await Promise.all([Item.findAll(), Item.findClaimed(), Item.findUnclaimed(), Item.findAvailable()]);
+  }
+
+  // Hit/miss counters for the catalog cache
+  static cacheStats() {
+    return catalogCache.stats();
+  }
+
+  // Queries saved by coalescing identical concurrent reads
+  static coalescingStats() {
+    return itemFlights.stats();
+  }
 }
 
-module.exports = Item;
+module.exports = labelMethods(Item);
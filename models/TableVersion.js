@@ -0,0 +1,27 @@
+const pool = require('../config/database');
+const { readPool } = require('../utils/readRouting');
+const { labelMethods } = require('../utils/queryStats');
+
+class TableVersion {
+  // Get the committed write versions of the given tables (see
+  // migrations/010_committed_table_versions.sql). Reads follow the request's
+  // replica routing, like the data they describe
+  static async findVersions(tableNames) {
+    const result = await readPool.query(
+      `SELECT t.name AS table_name, COALESCE(SUM(d.delta), 0)::text AS version
+       FROM unnest($1::text[]) AS t(name)
+       LEFT JOIN table_version_deltas d ON d.table_name = t.name
+       GROUP BY t.name
+       ORDER BY t.name`,
+      [tableNames]
+    );
+    return result.rows;
+  }
+
+  // Fold the version deltas written since the last call into one row per table
+  static async compact() {
+    await pool.query('SELECT compact_table_versions()');
+  }
+}
+
+module.exports = labelMethods(TableVersion);
@@ -1,38 +1,66 @@
 const pool = require('../config/database');
+const { prepared } = require('./statements');
+const { normalizeListOptions, selectColumns, keysetClause, toPage } = require('../utils/pagination');
+const { hashPassword, verifyPassword, DUMMY_HASH } = require('../utils/password');
+const { readPool } = require('../utils/readRouting');
+const { labelMethods } = require('../utils/queryStats');
+
+// Password hashes never leave this model
+const withoutPassword = (row) => {
+  if (!row) {
+    return row;
+  }
+  const { password, ...user } = row;
+  return user;
+};
 
 class User {
-  // Get all users
-  static async findAll() {
-    const result = await pool.query(
-      'SELECT * FROM users ORDER BY created_at DESC'
+  // Primary key columns used as the keyset pagination tiebreaker
+  static KEY_COLUMNS = ['email'];
+
+  // Columns that may be requested with ?fields=
+  static LIST_FIELDS = ['email', 'name', 'number', 'role', 'created_at', 'updated_at'];
+
+  // Get a page of users (keyset paginated on created_at + primary key)
+  static async findAll(options = {}) {
+    const listOptions = normalizeListOptions(options);
+    const { where, orderBy, limit, params } = keysetClause(listOptions, User.KEY_COLUMNS);
+    const result = await readPool.query(
+      `SELECT ${selectColumns(listOptions.fields, User.KEY_COLUMNS)}
+       FROM users
+       ${where ? `WHERE ${where}` : ''}
+       ${orderBy}
+       ${limit}`,
+      params
     );
-    return result.rows;
+    return toPage(result.rows.map(withoutPassword), listOptions, User.KEY_COLUMNS);
   }
 
   // Get user by email
   static async findByEmail(email) {
-    const result = await pool.query(
-      'SELECT * FROM users WHERE email = $1',
-      [email]
+    const result = await readPool.query(
+      prepared('users_find_by_email', [email])
     );
     return result.rows[0];
   }
 
-  // Create new user
+  // Create new user (the password is stored as a scrypt hash)
   static async create(userData) {
     const { email, name, number, password, role } = userData;
+    const passwordHash = await hashPassword(password);
     const result = await pool.query(
       `INSERT INTO users (email, name, number, password, role) 
        VALUES ($1, $2, $3, $4, $5) 
        RETURNING *`,
-      [email, name, number, password, role]
+      [email, name, number, passwordHash, role]
     );
-    return result.rows[0];
+    return withoutPassword(result.rows[0]);
   }
 
   // Update user
   static async update(email, userData) {
     const { name, number, password, role } = userData;
+    const passwordHash = password ? await hashPassword(password) : null;
     const result = await pool.query(
       `UPDATE users 
        SET name = COALESCE($1, name), 
@@ -42,9 +70,29 @@ class User {
            updated_at = CURRENT_TIMESTAMP
        WHERE email = $5 
        RETURNING *`,
-      [name, number, password, role, email]
+      [name, number, passwordHash, role, email]
     );
-    return result.rows[0];
+    return withoutPassword(result.rows[0]);
+  }
+
+  // Check an email/password pair; returns the user (without the hash) or null.
+  // Legacy plaintext passwords are re-hashed after a successful check
+  static async verifyCredentials(email, password) {
+    // Read from the primary: the stored hash is compared and possibly upgraded
+    const result = await pool.query(prepared('users_find_credentials', [email]));
+    const user = result.rows[0];
+    // Still derive a key for unknown emails so response time doesn't reveal them
+    const { valid, needsRehash } = await verifyPassword(password, user ? user.password : DUMMY_HASH);
+    if (!user || !valid) {
+      return null;
+    }
+    if (needsRehash) {
+      await pool.query(
+        'UPDATE users SET password = $1 WHERE email = $2',
+        [await hashPassword(password), email]
+      );
+    }
+    return withoutPassword(user);
   }
 
   // Delete user
@@ -53,12 +101,12 @@ class User {
       'DELETE FROM users WHERE email = $1 RETURNING *',
       [email]
     );
-    return result.rows[0];
+    return withoutPassword(result.rows[0]);
   }
 
   // Get user with their guests
   static async findWithGuests(email) {
-    const result = await pool.query(
+    const result = await readPool.query(
       `SELECT u.*, 
               json_agg(
                 json_build_object(
@@ -73,8 +121,8 @@ class User {
        GROUP BY u.email`,
       [email]
     );
-    return result.rows[0];
+    return withoutPassword(result.rows[0]);
   }
 }
 
-module.exports = User;
+module.exports = labelMethods(User);
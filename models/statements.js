@@ -0,0 +1,60 @@
+// Registry of hot lookup queries issued as named prepared statements.
+//
+// node-postgres parses and plans a named statement once per connection and
+// reuses it on later calls, so these skip the parse/plan step on every request.
+// Columns are listed explicitly: a prepared `SELECT *` fails with "cached plan
+// must not change result type" after a column is added or dropped.
+
+const statements = {
+  users_find_by_email: `
+    SELECT email, name, number, role, created_at, updated_at
+    FROM users
+    WHERE email = $1`,
+
+  users_find_credentials: `
+    SELECT email, name, number, password, role, created_at, updated_at
+    FROM users
+    WHERE email = $1`,
+
+  guests_find_by_key: `
+    SELECT name, number, user_email, going, created_at, updated_at
+    FROM guests
+    WHERE name = $1 AND number = $2`,
+
+  items_find_by_name: `
+    SELECT item_name, item_link, item_count, claimed_count, available, created_at, updated_at
+    FROM items
+    WHERE item_name = $1`,
+
+  items_get_availability: `
+    SELECT item_count, claimed_count, available
+    FROM items
+    WHERE item_name = $1`,
+
+  guest_items_find_by_guest: `
+    SELECT gi.guest_name, gi.guest_number, gi.item_name, gi.quantity_claimed, gi.created_at,
+           i.item_link, i.item_count
+    FROM guest_items gi
+    JOIN items i ON gi.item_name = i.item_name
+    WHERE gi.guest_name = $1 AND gi.guest_number = $2
+    ORDER BY gi.created_at DESC`,
+
+  guest_items_find_by_item: `
+    SELECT gi.guest_name, gi.guest_number, gi.item_name, gi.quantity_claimed, gi.created_at,
+           g.user_email, g.going
+    FROM guest_items gi
+    JOIN guests g ON gi.guest_name = g.name AND gi.guest_number = g.number
+    WHERE gi.item_name = $1
+    ORDER BY gi.created_at DESC`
+};
+
+// Build a pg query config for a registered statement
+const prepared = (name, values) => {
+  const text = statements[name];
+  if (!text) {
+    throw new Error(`Unknown prepared statement: ${name}`);
+  }
+  return { name, text, values };
+};
+
+module.exports = { statements, prepared };
@@ -1,25 +1,19 @@
 const express = require('express');
 const router = express.Router();
 const {
-  updateUserSchema,
   checkDatabase,
+  getQueryStats,
   getUserSchema,
-  migrateToNewSchema,
-  addGuestGoingColumn,
-  updateGuestGoingDefault,
-  removeItemPhotoColumn,
-  setGoingDefaultTrue
+  getCacheStats,
+  getMigrations
 } = require('../controllers/adminController');
 
-// Admin routes for database management
-router.post('/update-user-schema', updateUserSchema);
-router.post('/migrate-schema', migrateToNewSchema);
-router.post('/add-guest-going', addGuestGoingColumn);
-router.post('/update-going-default', updateGuestGoingDefault);
-router.post('/set-going-default-true', setGoingDefaultTrue);
-router.post('/remove-item-photo', removeItemPhotoColumn);
+// Admin routes for database diagnostics (schema changes are migrations)
 router.get('/check-database', checkDatabase);
+router.get('/query-stats', getQueryStats);
 router.get('/user-schema', getUserSchema);
+router.get('/cache-stats', getCacheStats);
+router.get('/migrations', getMigrations);
 
 module.exports = router;
 
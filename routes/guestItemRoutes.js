@@ -5,6 +5,7 @@ const {
   getClaimsByGuest,
   getClaimsByItem,
   createClaim,
+  createClaimsBatch,
   updateClaim,
   deleteClaim,
   deleteClaimsByGuest,
@@ -16,6 +17,7 @@ router.get('/', getAllClaims);
 router.get('/guest/:guestName/:guestNumber', getClaimsByGuest);
 router.get('/item/:itemName', getClaimsByItem);
 router.post('/', createClaim);
+router.post('/batch', createClaimsBatch);
 router.put('/:guestName/:guestNumber/:itemName', updateClaim);
 router.delete('/:guestName/:guestNumber/:itemName', deleteClaim);
 router.delete('/guest/:guestName/:guestNumber', deleteClaimsByGuest);
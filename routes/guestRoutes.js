@@ -5,17 +5,21 @@ const {
   getGuest,
   getGuestWithItems,
   getGuestsByUser,
+  searchGuests,
   createGuest,
+  importGuests,
   updateGuest,
   deleteGuest
 } = require('../controllers/guestController');
 
 // Guest routes
 router.get('/', getAllGuests);
+router.get('/search', searchGuests);
 router.get('/user/:userEmail', getGuestsByUser);
 router.get('/:name/:number', getGuest);
 router.get('/:name/:number/items', getGuestWithItems);
 router.post('/', createGuest);
+router.post('/import', importGuests);
 router.put('/:name/:number', updateGuest);
 router.delete('/:name/:number', deleteGuest);
 
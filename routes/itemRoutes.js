@@ -7,7 +7,11 @@ const {
   getItemsByGuest,
   getClaimedItems,
   getUnclaimedItems,
+  getAvailableItems,
+  streamItems,
   createItem,
+  importItems,
+  exportItems,
   updateItem,
   claimItem,
   unclaimItem,
@@ -18,10 +22,14 @@ const {
 router.get('/', getAllItems);
 router.get('/claimed', getClaimedItems);
 router.get('/unclaimed', getUnclaimedItems);
+router.get('/available', getAvailableItems);
+router.get('/stream', streamItems);
+router.get('/export', exportItems);
 router.get('/guest/:guestName/:guestNumber', getItemsByGuest);
 router.get('/:itemName', getItem);
 router.get('/:itemName/guests', getItemWithGuests);
 router.post('/', createItem);
+router.post('/import', importItems);
 router.put('/:itemName', updateItem);
 router.post('/:itemName/claim', claimItem);
 router.post('/:itemName/unclaim', unclaimItem);
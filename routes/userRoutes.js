@@ -4,15 +4,19 @@ const {
   getAllUsers,
   getUser,
   getUserWithGuests,
+  getUserDashboard,
   createUser,
+  loginUser,
   updateUser,
   deleteUser
 } = require('../controllers/userController');
 
 // User routes
 router.get('/', getAllUsers);
+router.post('/login', loginUser);
 router.get('/:email', getUser);
 router.get('/:email/guests', getUserWithGuests);
+router.get('/:email/dashboard', getUserDashboard);
 router.post('/', createUser);
 router.put('/:email', updateUser);
 router.delete('/:email', deleteUser);
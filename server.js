@@ -1,99 +1,13 @@
-const express = require('express');
-const cors = require('cors');
-const bodyParser = require('body-parser');
 require('dotenv').config();
-
-const { createTables } = require('./config/initDb');
-const userRoutes = require('./routes/userRoutes');
-const guestRoutes = require('./routes/guestRoutes');
-const itemRoutes = require('./routes/itemRoutes');
-const guestItemRoutes = require('./routes/guestItemRoutes');
-const adminRoutes = require('./routes/adminRoutes');
-
-const app = express();
-const PORT = process.env.PORT || 3000;
-
-// Middleware
-app.use(cors());
-app.use(bodyParser.json());
-app.use(bodyParser.urlencoded({ extended: true }));
-
-// Request logging middleware
-app.use((req, res, next) => {
-  console.log(`${new Date().toISOString()} - ${req.method} ${req.path}`);
-  next();
-});
-
-// Routes
-app.get('/', (req, res) => {
-  res.json({
-    message: 'AZBS Backend API',
-    version: '1.0.0',
-    endpoints: {
-      users: '/api/users',
-      guests: '/api/guests',
-      items: '/api/items',
-      claims: '/api/claims',
-      admin: '/api/admin'
-    }
-  });
-});
-
-// Health check endpoint for monitoring and keep-alive
-app.get('/health', (req, res) => {
-  res.status(200).json({
-    status: 'healthy',
-    timestamp: new Date().toISOString(),
-    uptime: process.uptime(),
-    environment: process.env.NODE_ENV || 'development'
-  });
-});
-
-app.use('/api/users', userRoutes);
-app.use('/api/guests', guestRoutes);
-app.use('/api/items', itemRoutes);
-app.use('/api/claims', guestItemRoutes);
-app.use('/api/admin', adminRoutes);
-
-// 404 handler
-app.use((req, res) => {
-  res.status(404).json({
-    success: false,
-    error: 'Route not found'
-  });
-});
-
-// Error handling middleware
-app.use((err, req, res, next) => {
-  console.error('Error:', err.stack);
-  res.status(500).json({
-    success: false,
-    error: 'Something went wrong!',
-    message: err.message
-  });
-});
-
-// Initialize database and start server
-const startServer = async () => {
-  try {
-    console.log('Initializing database...');
-    await createTables();
-    
-    app.listen(PORT, () => {
-      console.log(`\n🚀 Server is running on port ${PORT}`);
-      console.log(`📡 API endpoint: http://localhost:${PORT}/api`);
-      console.log(`\nAvailable routes:`);
-      console.log(`  Users:  http://localhost:${PORT}/api/users`);
-      console.log(`  Guests: http://localhost:${PORT}/api/guests`);
-      console.log(`  Items:  http://localhost:${PORT}/api/items`);
-      console.log(`  Claims: http://localhost:${PORT}/api/claims\n`);
-    });
-  } catch (error) {
-    console.error('Failed to start server:', error);
-    process.exit(1);
-  }
-};
-
-startServer();
-
-module.exports = app;
+const clusterMode = require('./utils/cluster');
+
+// Entry point. In cluster mode this process only supervises the workers (see
+// utils/cluster.js); the app, its routes and its database pool are loaded by
+// the workers alone
+if (clusterMode.isClusterPrimary()) {
+  clusterMode.runPrimary();
+} else {
+  const app = require('./app');
+  app.start();
+  module.exports = app;
+}
@@ -0,0 +1,344 @@
+const { Transform } = require('stream');
+const { pipeline } = require('stream/promises');
+const { StringDecoder } = require('string_decoder');
+const { from: copyFrom } = require('pg-copy-streams');
+
+// Helpers for streaming CSV / NDJSON uploads into a staging table with COPY.
+//
+// Both formats are parsed record by record and re-encoded as CSV rows of the
+// staging columns plus a parse_error column for `COPY ... FROM STDIN (FORMAT
+// csv)`. A malformed record (bad quoting, wrong number of columns, invalid
+// JSON, a NUL character, or longer than MAX_RECORD_CHARS) is still copied,
+// with its values blanked and parse_error set, so it is reported as a rejected
+// row instead of aborting the whole COPY.
+
+// Longest CSV record / NDJSON line accepted; longer ones are rejected
+// without buffering the rest of them
+const MAX_RECORD_CHARS = 64 * 1024;
+
+// An upload that sends nothing for this long is aborted (and its transaction
+// rolled back) instead of holding a pool connection
+const UPLOAD_IDLE_TIMEOUT_MS = parseInt(process.env.UPLOAD_IDLE_TIMEOUT_MS, 10) || 30000;
+
+const importError = (message) => {
+  const error = new Error(message);
+  error.code = 'INVALID_IMPORT';
+  return error;
+};
+
+// Work out the upload format from ?format= or the Content-Type header
+const detectImportFormat = (req) => {
+  const format = (req.query.format || '').toLowerCase();
+  if (format === 'csv' || format === 'ndjson') {
+    return format;
+  }
+  const contentType = (req.headers['content-type'] || '').toLowerCase();
+  if (contentType.includes('text/csv')) {
+    return 'csv';
+  }
+  if (contentType.includes('ndjson') || contentType.includes('jsonlines')) {
+    return 'ndjson';
+  }
+  return null;
+};
+
+// True when the request body was already read, e.g. by the JSON or urlencoded
+// body parser because the upload was sent with their Content-Type; importing
+// from it would wait for data that never comes
+const isBodyConsumed = req => Boolean(req._body) || Boolean(req.readableEnded);
+
+// Read the first line of a stream and push the remainder back for later readers
+const readHeaderLine = (stream) => new Promise((resolve, reject) => {
+  if (stream.readableEnded || stream.destroyed) {
+    reject(importError('The upload body was already read or closed'));
+    return;
+  }
+
+  let buffered = Buffer.alloc(0);
+
+  const cleanup = () => {
+    stream.off('data', onData);
+    stream.off('end', onEnd);
+    stream.off('error', onError);
+    stream.off('close', onClose);
+  };
+
+  const onData = (chunk) => {
+    buffered = Buffer.concat([buffered, chunk]);
+    const newline = buffered.indexOf(0x0a);
+    if (newline === -1) {
+      return;
+    }
+    cleanup();
+    stream.pause();
+    const rest = buffered.subarray(newline + 1);
+    if (rest.length > 0) {
+      stream.unshift(rest);
+    }
+    resolve(buffered.subarray(0, newline).toString('utf8').replace(/\r$/, ''));
+  };
+
+  const onEnd = () => {
+    cleanup();
+    resolve(buffered.toString('utf8').replace(/\r$/, ''));
+  };
+
+  const onError = (error) => {
+    cleanup();
+    reject(error);
+  };
+
+  // Closed without 'end' or 'error': the client went away mid-header
+  const onClose = () => {
+    cleanup();
+    reject(importError('The upload ended before the CSV header was complete'));
+  };
+
+  stream.on('data', onData);
+  stream.on('end', onEnd);
+  stream.on('error', onError);
+  stream.on('close', onClose);
+});
+
+// Abort the upload if its connection sees no traffic for UPLOAD_IDLE_TIMEOUT_MS;
+// returns a function that removes the timeout again
+const guardIdleUpload = (source) => {
+  if (typeof source.setTimeout !== 'function') {
+    return () => {};
+  }
+  const onTimeout = () => {
+    source.destroy(importError(`The upload sent no data for ${UPLOAD_IDLE_TIMEOUT_MS / 1000}s`));
+  };
+  source.setTimeout(UPLOAD_IDLE_TIMEOUT_MS, onTimeout);
+  return () => {
+    source.off('timeout', onTimeout);
+    source.setTimeout(0);
+  };
+};
+
+// Parse a CSV header into staging column names, rejecting unknown columns
+const parseCsvHeader = (line, allowedColumns, requiredColumns) => {
+  const columns = line
+    .split(',')
+    .map(column => column.trim().replace(/^"(.*)"$/, '$1').toLowerCase());
+
+  const unknown = columns.filter(column => !allowedColumns.includes(column));
+  if (unknown.length > 0) {
+    throw importError(`Unknown column(s) in CSV header: ${unknown.join(', ')}`);
+  }
+  const missing = requiredColumns.filter(column => !columns.includes(column));
+  if (missing.length > 0) {
+    throw importError(`Missing required column(s) in CSV header: ${missing.join(', ')}`);
+  }
+  return columns;
+};
+
+const csvValue = (value) => {
+  if (value === null || value === undefined) {
+    return '';
+  }
+  const text = typeof value === 'object' ? JSON.stringify(value) : String(value);
+  return `"${text.replace(/"/g, '""')}"`;
+};
+
+// One staging row: the data column values followed by parse_error
+const stagingRow = (values, error = null) => {
+  if (!error && values.some(value => typeof value === 'string' && value.includes('\u0000'))) {
+    return stagingRow(values.map(() => null), 'row contains a NUL character');
+  }
+  return `${[...values, error].map(csvValue).join(',')}\n`;
+};
+
+const tooLongRow = columns => stagingRow(columns.map(() => null), `row is longer than ${MAX_RECORD_CHARS} characters`);
+
+// Transform CSV records (after the header line) into staging rows of `columns`.
+// headerColumns gives the position of each column in the upload; header
+// columns that are not staging columns are dropped.
+const csvToStaging = (headerColumns, columns) => {
+  const decoder = new StringDecoder('utf8');
+  const positions = columns.map(column => headerColumns.indexOf(column));
+
+  let fields = [];
+  let field = '';
+  let quoted = false; // the current field started with a quote
+  let inQuotes = false;
+  let quoteSeen = false; // a quote inside a quoted field: escaped quote or the closing one
+  let length = 0;
+  let error = null;
+
+  const fail = (message) => {
+    error = error || message;
+  };
+
+  const endField = () => {
+    // Unquoted empty fields are NULL, as with COPY itself
+    fields.push(quoted || field !== '' ? field : null);
+    field = '';
+    quoted = false;
+  };
+
+  const endRecord = () => {
+    let row = '';
+    if (fields.length > 0 || field !== '' || quoted || error) {
+      endField();
+      if (!error && fields.length !== headerColumns.length) {
+        fail(`expected ${headerColumns.length} columns, found ${fields.length}`);
+      }
+      row = error
+        ? stagingRow(columns.map(() => null), error)
+        : stagingRow(positions.map(position => (position === -1 ? null : fields[position])));
+    }
+    fields = [];
+    field = '';
+    quoted = false;
+    length = 0;
+    error = null;
+    return row;
+  };
+
+  const append = (char) => {
+    length++;
+    if (length > MAX_RECORD_CHARS) {
+      fail(`row is longer than ${MAX_RECORD_CHARS} characters`);
+    }
+    if (!error) {
+      field += char;
+    }
+  };
+
+  const parse = (text) => {
+    let out = '';
+    for (const char of text) {
+      if (quoteSeen) {
+        quoteSeen = false;
+        if (char === '"') {
+          append('"');
+          continue;
+        }
+        inQuotes = false;
+      }
+
+      if (inQuotes) {
+        if (char === '"') {
+          quoteSeen = true;
+        } else {
+          append(char);
+        }
+      } else if (char === ',') {
+        endField();
+      } else if (char === '\n') {
+        out += endRecord();
+      } else if (char === '\r') {
+        // CRLF line endings
+      } else if (quoted) {
+        fail('unexpected character after a closing quote');
+      } else if (char === '"' && field === '') {
+        quoted = true;
+        inQuotes = true;
+      } else {
+        append(char);
+      }
+    }
+    return out;
+  };
+
+  return new Transform({
+    transform(chunk, encoding, callback) {
+      callback(null, parse(decoder.write(chunk)));
+    },
+    flush(callback) {
+      let out = parse(decoder.end());
+      if (inQuotes && !quoteSeen) {
+        fail('unterminated quoted field');
+      }
+      quoteSeen = false;
+      inQuotes = false;
+      out += endRecord();
+      callback(null, out);
+    }
+  });
+};
+
+// Transform NDJSON text into staging rows of `columns`
+const ndjsonToCsv = (columns) => {
+  const decoder = new StringDecoder('utf8');
+  let pending = '';
+  // Dropping the rest of a line that grew past MAX_RECORD_CHARS
+  let discarding = false;
+
+  const convertLine = (line) => {
+    const trimmed = line.trim();
+    if (!trimmed) {
+      return '';
+    }
+    let record;
+    try {
+      record = JSON.parse(trimmed);
+    } catch (error) {
+      record = null;
+    }
+    if (!record || typeof record !== 'object' || Array.isArray(record)) {
+      return stagingRow(columns.map(() => null), 'invalid JSON object');
+    }
+    return stagingRow(columns.map(column => record[column]));
+  };
+
+  return new Transform({
+    transform(chunk, encoding, callback) {
+      const lines = (pending + decoder.write(chunk)).split('\n');
+      pending = lines.pop();
+      const rows = lines.map((line, index) => (
+        discarding && index === 0 ? tooLongRow(columns) : convertLine(line)
+      ));
+      if (lines.length > 0) {
+        discarding = false;
+      }
+      if (pending.length > MAX_RECORD_CHARS) {
+        discarding = true;
+        pending = '';
+      }
+      callback(null, rows.join(''));
+    },
+    flush(callback) {
+      const last = pending + decoder.end();
+      callback(null, discarding ? tooLongRow(columns) : convertLine(last));
+    }
+  });
+};
+
+// Stream an upload into a staging table on the given client.
+// stagingColumns are the data columns; the table must also have a parse_error column.
+// ignoredColumns may appear in a CSV header (e.g. columns of our own export)
+// and are dropped, as are fields other than stagingColumns in NDJSON
+const copyUpload = async (client, source, { format, table, stagingColumns, requiredColumns, ignoredColumns = [] }) => {
+  if (source.readableEnded || source.destroyed) {
+    throw importError('The upload body was already read or closed');
+  }
+
+  const stopIdleGuard = guardIdleUpload(source);
+  try {
+    let parser;
+    if (format === 'csv') {
+      const header = await readHeaderLine(source);
+      const columns = parseCsvHeader(header, [...stagingColumns, ...ignoredColumns], requiredColumns);
+      parser = csvToStaging(columns, stagingColumns);
+    } else {
+      parser = ndjsonToCsv(stagingColumns);
+    }
+
+    const copy = client.query(copyFrom(
+      `COPY ${table} (${stagingColumns.join(', ')}, parse_error) FROM STDIN WITH (FORMAT csv)`
+    ));
+    await pipeline(source, parser, copy);
+  } finally {
+    stopIdleGuard();
+  }
+};
+
+module.exports = {
+  detectImportFormat,
+  isBodyConsumed,
+  copyUpload,
+  csvToStaging,
+  ndjsonToCsv
+};
@@ -0,0 +1,108 @@
+const crypto = require('crypto');
+const { markPossiblyStale, addCacheTag } = require('./requestContext');
+
+// Small in-process LRU cache with per-entry TTL and hit/miss counters.
+//
+// Map preserves insertion order, so re-inserting a key on every hit keeps the
+// least recently used entry at the front, where it is evicted first.
+//
+// wrap() reports a content tag for the value it returns to the request
+// context: a hash of the value, computed once per entry, so it is the same in
+// every worker and instance that cached the same data and changes whenever the
+// data does. conditionalGet.cached answers If-None-Match from it without a
+// database round trip.
+
+// Content hash of an entry's value, computed on first use
+const tagFor = (entry) => {
+  if (!entry.tag) {
+    entry.tag = crypto
+      .createHash('sha1')
+      .update(String(JSON.stringify(entry.value)))
+      .digest('base64url');
+  }
+  return entry.tag;
+};
+
+class LruCache {
+  constructor({ name, maxEntries = 500, ttlMs = 30000 } = {}) {
+    this.name = name;
+    this.maxEntries = maxEntries;
+    this.ttlMs = ttlMs;
+    this.entries = new Map();
+    this.hits = 0;
+    this.misses = 0;
+    this.evictions = 0;
+    this.invalidations = 0;
+  }
+
+  getEntry(key) {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      this.misses++;
+      return undefined;
+    }
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      this.misses++;
+      return undefined;
+    }
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.hits++;
+    return entry;
+  }
+
+  get(key) {
+    const entry = this.getEntry(key);
+    return entry ? entry.value : undefined;
+  }
+
+  set(key, value) {
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.evictions++;
+    }
+  }
+
+  // Return the cached value for key, or load, cache and return it
+  async wrap(key, loader) {
+    const cached = this.getEntry(key);
+    if (cached) {
+      markPossiblyStale('cache');
+      addCacheTag(tagFor(cached));
+      return cached.value;
+    }
+    const generation = this.invalidations;
+    const value = await loader();
+    // Don't cache a result that may predate an invalidation during the load
+    if (generation === this.invalidations) {
+      this.set(key, value);
+      addCacheTag(tagFor(this.entries.get(key)));
+    }
+    return value;
+  }
+
+  clear() {
+    this.entries.clear();
+    this.invalidations++;
+  }
+
+  stats() {
+    const lookups = this.hits + this.misses;
+    return {
+      name: this.name,
+      size: this.entries.size,
+      max_entries: this.maxEntries,
+      ttl_ms: this.ttlMs,
+      hits: this.hits,
+      misses: this.misses,
+      hit_rate: lookups > 0 ? this.hits / lookups : 0,
+      evictions: this.evictions,
+      invalidations: this.invalidations
+    };
+  }
+}
+
+module.exports = { LruCache };
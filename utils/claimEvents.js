@@ -0,0 +1,141 @@
+const { EventEmitter } = require('events');
+const { Client } = require('pg');
+const pool = require('../config/database');
+const logger = require('./logger');
+
+// Fan-out of item claim/unclaim notifications to in-process subscribers.
+//
+// A single dedicated connection LISTENs on the channel the items trigger in
+// migrations/005_item_claim_notify.sql notifies, so every SSE client shares one database
+// connection instead of polling. The connection is opened with the first
+// subscriber, closed with the last, and re-established whenever it errors or
+// ends. Notifications sent while it was down are lost, so after reconnecting
+// subscribers get a { op: 'resync' } event telling them to reload.
+// config/database.js reserves this connection in each process's DB_POOL_MAX share.
+
+const CHANNEL = 'item_claims';
+const RECONNECT_DELAY_MS = 5000;
+
+const emitter = new EventEmitter();
+emitter.setMaxListeners(0);
+
+let client = null;
+let reconnectTimer = null;
+// Set when the connection was lost while clients were subscribed
+let missedEvents = false;
+
+const scheduleReconnect = () => {
+  if (reconnectTimer || emitter.listenerCount('claim') === 0) {
+    return;
+  }
+  reconnectTimer = setTimeout(() => {
+    reconnectTimer = null;
+    listen();
+  }, RECONNECT_DELAY_MS);
+};
+
+const listen = async () => {
+  if (client) {
+    return;
+  }
+
+  const listener = new Client(pool.options);
+  client = listener;
+
+  listener.on('notification', (message) => {
+    try {
+      emitter.emit('claim', JSON.parse(message.payload));
+    } catch (error) {
+      logger.error('Invalid claim notification payload', error);
+    }
+  });
+
+  // A lost connection (error, or a clean end such as a server restart or an
+  // idle-session timeout) is replaced unless stopListening() ended it
+  const onDisconnect = () => {
+    if (client !== listener) {
+      return;
+    }
+    client = null;
+    missedEvents = true;
+    listener.end().catch(() => {});
+    scheduleReconnect();
+  };
+
+  listener.on('error', (error) => {
+    logger.error('Claim listener connection error', error);
+    onDisconnect();
+  });
+
+  listener.on('end', () => {
+    if (client === listener) {
+      logger.warn('Claim listener connection ended, reconnecting');
+    }
+    onDisconnect();
+  });
+
+  try {
+    await listener.connect();
+    // The last subscriber may have left while we were connecting
+    if (client !== listener) {
+      await listener.end();
+      return;
+    }
+    await listener.query(`LISTEN ${CHANNEL}`);
+    if (missedEvents && client === listener) {
+      missedEvents = false;
+      emitter.emit('claim', { op: 'resync' });
+    }
+  } catch (error) {
+    logger.error('Failed to start claim listener', error);
+    onDisconnect();
+  }
+};
+
+const stopListening = () => {
+  clearTimeout(reconnectTimer);
+  reconnectTimer = null;
+  missedEvents = false;
+  if (client) {
+    const listener = client;
+    client = null;
+    listener.end().catch(() => {});
+  }
+};
+
+// Register a callback for claim events; returns an unsubscribe function.
+// onClose is called if the feed is shut down while still subscribed
+const subscribe = (callback, onClose) => {
+  emitter.on('claim', callback);
+  if (onClose) {
+    emitter.on('close', onClose);
+  }
+  listen();
+
+  return () => {
+    emitter.off('claim', callback);
+    if (onClose) {
+      emitter.off('close', onClose);
+    }
+    if (emitter.listenerCount('claim') === 0) {
+      stopListening();
+    }
+  };
+};
+
+// End every subscription and the LISTEN connection (graceful shutdown)
+const close = () => {
+  emitter.emit('close');
+  emitter.removeAllListeners('claim');
+  emitter.removeAllListeners('close');
+  stopListening();
+};
+
+const subscriberCount = () => emitter.listenerCount('claim');
+
+module.exports = {
+  CHANNEL,
+  subscribe,
+  subscriberCount,
+  close
+};
@@ -0,0 +1,214 @@
+const cluster = require('cluster');
+const childProcess = require('child_process');
+const os = require('os');
+const path = require('path');
+const logger = require('./logger');
+
+// Multi-process mode: the primary forks CLUSTER_WORKERS copies of server.js,
+// which share the listening port, and replaces any worker that dies. Each
+// worker gets CLUSTER_WORKER_COUNT and CLUSTER_WORKER_INDEX in its environment;
+// config/database.js uses the count to split the DB_POOL_MAX budget, and only
+// worker 0 runs singleton background jobs (the dashboard refresher).
+//
+// Migrations run once per instance: the primary applies them in a short-lived
+// `node config/migrate.js` child (so it never opens a pool of its own) and
+// each worker's migrations startup phase waits for the result over IPC. If
+// they fail, the workers exit and the next worker to start tries again.
+//
+// broadcast() relays a message from one worker to all the others through the
+// primary (e.g. item cache invalidation after a write); onBroadcast()
+// registers the receiving handler. Outside cluster mode both are no-ops.
+//
+//   CLUSTER_WORKERS      number of workers, or "auto" for one per CPU
+//                        (default 1 = single process, no cluster)
+//   SHUTDOWN_TIMEOUT_MS  how long SIGTERM waits for in-flight requests (default 10000)
+
+const RESTART_DELAY_MS = 1000;
+const MAX_RESTART_DELAY_MS = 30000;
+// A worker that dies sooner than this after starting counts as a crash loop
+const MIN_HEALTHY_UPTIME_MS = 10000;
+const MIGRATE_SCRIPT = path.join(__dirname, '..', 'config', 'migrate.js');
+
+const envInt = (name, fallback) => {
+  const value = parseInt(process.env[name], 10);
+  return Number.isNaN(value) ? fallback : value;
+};
+
+const shutdownTimeoutMs = envInt('SHUTDOWN_TIMEOUT_MS', 10000);
+
+// Requested worker count, capped so every worker gets at least one pool
+// connection plus its claim event LISTEN connection
+const workerCount = () => {
+  const requested = process.env.CLUSTER_WORKERS === 'auto'
+    ? os.availableParallelism()
+    : envInt('CLUSTER_WORKERS', 1);
+  return Math.max(1, Math.min(requested, Math.floor(envInt('DB_POOL_MAX', 10) / 2)));
+};
+
+const isClusterPrimary = () => cluster.isPrimary && workerCount() > 1;
+
+const isClusterWorker = () => cluster.isWorker;
+
+// Fork the workers and supervise them until SIGTERM/SIGINT
+const runPrimary = () => {
+  const count = workerCount();
+  const slots = new Map();
+  let shuttingDown = false;
+  let migrations = null;
+
+  // Apply pending migrations, or join the run in progress
+  const migrate = () => {
+    if (!migrations) {
+      migrations = new Promise((resolve, reject) => {
+        const child = childProcess.fork(MIGRATE_SCRIPT);
+        child.on('error', reject);
+        child.on('exit', (code, signal) => (
+          code === 0 ? resolve() : reject(new Error(`Migrations exited with ${signal || `code ${code}`}`))
+        ));
+      }).catch((error) => {
+        // Let the next worker that asks retry
+        migrations = null;
+        throw error;
+      });
+    }
+    return migrations;
+  };
+
+  const onWorkerMessage = (worker, message) => {
+    if (message && message.type === 'broadcast') {
+      slots.forEach((slot) => {
+        if (slot.worker && slot.worker !== worker && slot.worker.isConnected()) {
+          slot.worker.send(message);
+        }
+      });
+      return;
+    }
+    if (!message || message.type !== 'migrations:wait') {
+      return;
+    }
+    const reply = error => worker.isConnected() && worker.send({ type: 'migrations:done', error });
+    migrate().then(() => reply(null), error => reply(error.message));
+  };
+
+  const fork = (index) => {
+    const worker = cluster.fork({
+      CLUSTER_WORKER_COUNT: String(count),
+      CLUSTER_WORKER_INDEX: String(index)
+    });
+    const slot = slots.get(index) || { failures: 0 };
+    slot.worker = worker;
+    slot.startedAt = Date.now();
+    slots.set(index, slot);
+    worker.on('exit', (code, signal) => onExit(index, worker, code, signal));
+    worker.on('message', message => onWorkerMessage(worker, message));
+  };
+
+  const onExit = (index, worker, code, signal) => {
+    const slot = slots.get(index);
+    if (slot.worker !== worker) {
+      return;
+    }
+    slot.worker = null;
+
+    if (shuttingDown) {
+      if ([...slots.values()].every(entry => !entry.worker)) {
+        logger.info('All workers stopped');
+        process.exit(0);
+      }
+      return;
+    }
+
+    // Back off when a worker keeps dying right after start (e.g. bad config)
+    slot.failures = Date.now() - slot.startedAt < MIN_HEALTHY_UPTIME_MS ? slot.failures + 1 : 0;
+    const delay = Math.min(RESTART_DELAY_MS * 2 ** slot.failures, MAX_RESTART_DELAY_MS);
+    logger.error('Worker exited, restarting', { worker: index, worker_pid: worker.process.pid, code, signal, restart_in_ms: delay });
+    setTimeout(() => {
+      if (!shuttingDown) {
+        fork(index);
+      }
+    }, delay);
+  };
+
+  const shutdown = (signal) => {
+    if (shuttingDown) {
+      return;
+    }
+    shuttingDown = true;
+    logger.info('Primary shutting down, draining workers', { signal });
+
+    const running = [...slots.values()].filter(slot => slot.worker);
+    if (running.length === 0) {
+      process.exit(0);
+    }
+    running.forEach(slot => slot.worker.process.kill('SIGTERM'));
+
+    // Workers enforce their own drain timeout; this is the backstop
+    setTimeout(() => {
+      logger.warn('Workers did not stop in time, killing');
+      running.forEach(slot => slot.worker && slot.worker.process.kill('SIGKILL'));
+      process.exit(1);
+    }, shutdownTimeoutMs + 5000).unref();
+  };
+
+  process.on('SIGTERM', () => shutdown('SIGTERM'));
+  process.on('SIGINT', () => shutdown('SIGINT'));
+
+  logger.info('Starting cluster', {
+    workers: count,
+    pool_per_worker: Math.floor(envInt('DB_POOL_MAX', 10) / count) - 1
+  });
+  migrate().catch(error => logger.error('Migrations failed', error));
+  for (let index = 0; index < count; index++) {
+    fork(index);
+  }
+};
+
+// In a cluster worker: resolves once the primary has applied migrations
+const waitForMigrations = () => new Promise((resolve, reject) => {
+  const onMessage = (message) => {
+    if (!message || message.type !== 'migrations:done') {
+      return;
+    }
+    process.off('message', onMessage);
+    if (message.error) {
+      reject(new Error(message.error));
+    } else {
+      resolve();
+    }
+  };
+  process.on('message', onMessage);
+  process.send({ type: 'migrations:wait' });
+});
+
+// Send { topic, ...payload } to every other worker of this instance
+const broadcast = (topic, payload = {}) => {
+  if (cluster.isWorker && process.connected) {
+    process.send({ type: 'broadcast', topic, payload });
+  }
+};
+
+// Call handler(payload) for broadcasts on topic sent by other workers
+const onBroadcast = (topic, handler) => {
+  if (!cluster.isWorker) {
+    return;
+  }
+  process.on('message', (message) => {
+    if (message && message.type === 'broadcast' && message.topic === topic) {
+      handler(message.payload);
+    }
+  });
+};
+
+// Worker 0 (or the only process) runs jobs that should exist once per instance
+const isLeaderWorker = () => envInt('CLUSTER_WORKER_INDEX', 0) === 0;
+
+module.exports = {
+  isClusterPrimary,
+  isClusterWorker,
+  runPrimary,
+  waitForMigrations,
+  broadcast,
+  onBroadcast,
+  isLeaderWorker,
+  shutdownTimeoutMs
+};
@@ -0,0 +1,61 @@
+const Dashboard = require('../models/Dashboard');
+const TableVersion = require('../models/TableVersion');
+const logger = require('./logger');
+
+// Periodically refresh the user_dashboards materialized view, but only when one
+// of the tables it summarizes has been written since the last refresh (the
+// committed per-table write versions make that a single cheap lookup).
+//
+//   DASHBOARD_REFRESH_MS  check interval (default 15000, 0 disables)
+
+const SOURCE_TABLES = ['users', 'guests', 'items', 'guest_items'];
+const intervalMs = process.env.DASHBOARD_REFRESH_MS !== undefined
+  ? parseInt(process.env.DASHBOARD_REFRESH_MS, 10)
+  : 15000;
+
+let timer = null;
+let lastToken = null;
+let running = false;
+
+const refreshIfChanged = async () => {
+  if (running) {
+    return;
+  }
+  running = true;
+
+  try {
+    const versions = await TableVersion.findVersions(SOURCE_TABLES);
+    const token = versions.map(row => `${row.table_name}:${row.version}`).join(',');
+    if (token === lastToken) {
+      return;
+    }
+
+    // Versions only count committed writes, and the refresh starts after they
+    // were read, so it includes every write the token describes
+    const start = Date.now();
+    const refreshed = await Dashboard.refresh();
+    if (refreshed) {
+      lastToken = token;
+      logger.debug('Refreshed user_dashboards', { duration_ms: Date.now() - start });
+    }
+  } catch (error) {
+    logger.error('Error refreshing user_dashboards', error);
+  } finally {
+    running = false;
+  }
+};
+
+const start = () => {
+  if (timer || !intervalMs) {
+    return;
+  }
+  timer = setInterval(refreshIfChanged, intervalMs);
+  timer.unref();
+};
+
+const stop = () => {
+  clearInterval(timer);
+  timer = null;
+};
+
+module.exports = { start, stop, refreshIfChanged };
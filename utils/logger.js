@@ -0,0 +1,126 @@
+const fs = require('fs');
+
+// Structured JSON-lines logger.
+//
+// Entries are buffered in memory and written to stdout in one chunk on the next
+// turn of the event loop (or as soon as the buffer grows past FLUSH_BYTES), so
+// handlers never block on a synchronous console write. Anything still buffered
+// is flushed synchronously when the process exits.
+//
+//   LOG_LEVEL            debug | info | warn | error (default info)
+//   LOG_SAMPLE_RATE_2XX  fraction of 2xx and 3xx (e.g. 304) requests logged (default 0.1)
+
+const LEVELS = { debug: 10, info: 20, warn: 30, error: 40 };
+const FLUSH_BYTES = 64 * 1024;
+
+const minLevel = LEVELS[process.env.LOG_LEVEL] || LEVELS.info;
+const sampleRate2xx = process.env.LOG_SAMPLE_RATE_2XX !== undefined
+  ? parseFloat(process.env.LOG_SAMPLE_RATE_2XX)
+  : 0.1;
+
+let buffer = [];
+let bufferedBytes = 0;
+let flushScheduled = false;
+
+const flush = () => {
+  flushScheduled = false;
+  if (buffer.length === 0) {
+    return;
+  }
+  const chunk = buffer.join('');
+  buffer = [];
+  bufferedBytes = 0;
+  process.stdout.write(chunk);
+};
+
+const flushSync = () => {
+  if (buffer.length === 0) {
+    return;
+  }
+  const chunk = buffer.join('');
+  buffer = [];
+  bufferedBytes = 0;
+  try {
+    fs.writeSync(1, chunk);
+  } catch (error) {
+    // stdout is gone; nothing left to report to
+  }
+};
+
+process.on('exit', flushSync);
+
+const serializeError = (error) => ({
+  message: error.message,
+  code: error.code,
+  stack: error.stack
+});
+
+// Accepts an Error, a plain object of fields, or nothing
+const normalizeMeta = (meta) => {
+  if (!meta) {
+    return {};
+  }
+  if (meta instanceof Error) {
+    return { error: serializeError(meta) };
+  }
+  const fields = {};
+  Object.entries(meta).forEach(([key, value]) => {
+    fields[key] = value instanceof Error ? serializeError(value) : value;
+  });
+  return fields;
+};
+
+const write = (level, message, meta) => {
+  if (LEVELS[level] < minLevel) {
+    return;
+  }
+
+  const line = JSON.stringify({
+    time: new Date().toISOString(),
+    level,
+    pid: process.pid,
+    msg: message,
+    ...normalizeMeta(meta)
+  }) + '\n';
+
+  buffer.push(line);
+  bufferedBytes += line.length;
+
+  if (bufferedBytes >= FLUSH_BYTES) {
+    flush();
+  } else if (!flushScheduled) {
+    flushScheduled = true;
+    setImmediate(flush);
+  }
+};
+
+// Express middleware logging one line per finished request; successful
+// responses, including the 304s of conditional GET polling, are sampled, and
+// only client and server errors are always logged
+const requestLogger = (req, res, next) => {
+  const start = process.hrtime.bigint();
+
+  res.on('finish', () => {
+    const isError = res.statusCode >= 400;
+    if (!isError && Math.random() >= sampleRate2xx) {
+      return;
+    }
+    write(res.statusCode >= 500 ? 'error' : res.statusCode >= 400 ? 'warn' : 'info', 'request', {
+      method: req.method,
+      path: req.originalUrl,
+      status: res.statusCode,
+      duration_ms: Number(process.hrtime.bigint() - start) / 1e6
+    });
+  });
+
+  next();
+};
+
+module.exports = {
+  debug: (message, meta) => write('debug', message, meta),
+  info: (message, meta) => write('info', message, meta),
+  warn: (message, meta) => write('warn', message, meta),
+  error: (message, meta) => write('error', message, meta),
+  flush: flushSync,
+  requestLogger
+};
@@ -0,0 +1,189 @@
+const { monitorEventLoopDelay } = require('perf_hooks');
+const { getPoolStats, getReplicaPoolStats } = require('../config/database');
+const { hashPoolStats } = require('./password');
+const admissionControl = require('../middleware/admissionControl');
+const Item = require('../models/Item');
+const readRouting = require('./readRouting');
+
+// Prometheus metrics in the text exposition format, served at GET /metrics.
+//
+// HTTP requests are counted and timed per route pattern (e.g.
+// /api/items/:itemName/claim, so item names don't explode the label set);
+// requests that match no route are grouped under "unmatched". Process and pool
+// gauges are sampled when /metrics is scraped. Values are per process: in
+// cluster mode each worker reports its own.
+
+// Request duration histogram bucket upper bounds, in seconds
+const DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+
+const requestCounts = new Map();
+const requestDurations = new Map();
+let inFlight = 0;
+
+const eventLoopDelay = monitorEventLoopDelay({ resolution: 20 });
+eventLoopDelay.enable();
+
+const escapeLabel = value => String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+
+const formatLabels = labels => `{${Object.entries(labels)
+  .map(([name, value]) => `${name}="${escapeLabel(value)}"`)
+  .join(',')}}`;
+
+// Route pattern for a finished request, e.g. "/api/claims/guest/:guestName/:guestNumber".
+// Requests answered by router-level middleware (a 304 from conditionalGet, a 503
+// during startup) are labelled with their mount path
+const routeLabel = (req) => {
+  if (!req.route) {
+    return req.baseUrl ? `${req.baseUrl}/*` : 'unmatched';
+  }
+  const routePath = typeof req.route.path === 'string' ? req.route.path : String(req.route.path);
+  return `${req.baseUrl}${routePath === '/' && req.baseUrl ? '' : routePath}`;
+};
+
+const observe = (method, route, status, seconds) => {
+  const countKey = `${method} ${route} ${status}`;
+  const count = requestCounts.get(countKey);
+  if (count) {
+    count.value++;
+  } else {
+    requestCounts.set(countKey, { labels: { method, route, status }, value: 1 });
+  }
+
+  const durationKey = `${method} ${route}`;
+  let histogram = requestDurations.get(durationKey);
+  if (!histogram) {
+    histogram = {
+      labels: { method, route },
+      buckets: new Array(DURATION_BUCKETS.length).fill(0),
+      count: 0,
+      sum: 0
+    };
+    requestDurations.set(durationKey, histogram);
+  }
+  histogram.count++;
+  histogram.sum += seconds;
+  DURATION_BUCKETS.forEach((bound, i) => {
+    if (seconds <= bound) {
+      histogram.buckets[i]++;
+    }
+  });
+};
+
+// Express middleware recording every request once it finishes (or is aborted)
+const middleware = (req, res, next) => {
+  const start = process.hrtime.bigint();
+  inFlight++;
+
+  let done = false;
+  const finish = () => {
+    if (done) {
+      return;
+    }
+    done = true;
+    inFlight--;
+    const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+    observe(req.method, routeLabel(req), res.statusCode, seconds);
+  };
+
+  res.on('finish', finish);
+  res.on('close', finish);
+  next();
+};
+
+const metric = (lines, name, type, help, samples) => {
+  lines.push(`# HELP ${name} ${help}`);
+  lines.push(`# TYPE ${name} ${type}`);
+  samples.forEach(([labels, value]) => {
+    lines.push(`${name}${labels && Object.keys(labels).length ? formatLabels(labels) : ''} ${value}`);
+  });
+};
+
+// Render every metric in the Prometheus text format
+const render = () => {
+  const lines = [];
+
+  metric(lines, 'http_requests_total', 'counter', 'HTTP requests by method, route and status code',
+    [...requestCounts.values()].map(({ labels, value }) => [labels, value]));
+
+  lines.push('# HELP http_request_duration_seconds HTTP request latency by method and route');
+  lines.push('# TYPE http_request_duration_seconds histogram');
+  requestDurations.forEach(({ labels, buckets, count, sum }) => {
+    DURATION_BUCKETS.forEach((bound, i) => {
+      lines.push(`http_request_duration_seconds_bucket${formatLabels({ ...labels, le: bound })} ${buckets[i]}`);
+    });
+    lines.push(`http_request_duration_seconds_bucket${formatLabels({ ...labels, le: '+Inf' })} ${count}`);
+    lines.push(`http_request_duration_seconds_sum${formatLabels(labels)} ${sum}`);
+    lines.push(`http_request_duration_seconds_count${formatLabels(labels)} ${count}`);
+  });
+
+  metric(lines, 'http_requests_in_flight', 'gauge', 'HTTP requests currently being served', [[null, inFlight]]);
+
+  // Event loop delay since the previous scrape
+  metric(lines, 'nodejs_eventloop_lag_seconds', 'gauge', 'Event loop delay since the last scrape', [
+    [{ stat: 'mean' }, Number.isNaN(eventLoopDelay.mean) ? 0 : eventLoopDelay.mean / 1e9],
+    [{ stat: 'p99' }, eventLoopDelay.percentile(99) / 1e9],
+    [{ stat: 'max' }, eventLoopDelay.max / 1e9]
+  ]);
+  eventLoopDelay.reset();
+
+  const memory = process.memoryUsage();
+  metric(lines, 'nodejs_heap_used_bytes', 'gauge', 'V8 heap in use', [[null, memory.heapUsed]]);
+  metric(lines, 'nodejs_heap_total_bytes', 'gauge', 'V8 heap allocated', [[null, memory.heapTotal]]);
+  metric(lines, 'process_resident_memory_bytes', 'gauge', 'Resident set size', [[null, memory.rss]]);
+  metric(lines, 'process_uptime_seconds', 'gauge', 'Seconds since the process started', [[null, process.uptime()]]);
+
+  const pool = getPoolStats();
+  metric(lines, 'pg_pool_connections_total', 'gauge', 'Open pg pool connections', [[null, pool.total]]);
+  metric(lines, 'pg_pool_connections_idle', 'gauge', 'Idle pg pool connections', [[null, pool.idle]]);
+  metric(lines, 'pg_pool_waiting_requests', 'gauge', 'Queries waiting for a pg pool connection', [[null, pool.waiting]]);
+  metric(lines, 'pg_pool_connections_max', 'gauge', 'Configured pg pool size', [[null, pool.max]]);
+
+  const replicaPool = getReplicaPoolStats();
+  if (replicaPool) {
+    const routing = readRouting.status();
+    metric(lines, 'pg_replica_connections_total', 'gauge', 'Open read replica pool connections', [[null, replicaPool.total]]);
+    metric(lines, 'pg_replica_waiting_requests', 'gauge', 'Queries waiting for a read replica connection', [[null, replicaPool.waiting]]);
+    metric(lines, 'pg_replica_lag_seconds', 'gauge', 'Read replica replay lag at the last check', [[null, (routing.lag_ms || 0) / 1000]]);
+    metric(lines, 'pg_replica_healthy', 'gauge', 'Whether reads are currently allowed on the replica', [[null, routing.healthy ? 1 : 0]]);
+    metric(lines, 'db_reads_total', 'counter', 'Read-only model queries by target pool', [
+      [{ target: 'primary' }, routing.reads.primary],
+      [{ target: 'replica' }, routing.reads.replica]
+    ]);
+    metric(lines, 'db_replica_fallbacks_total', 'counter', 'Replica reads retried on the primary after a connection error',
+      [[null, routing.reads.fallback]]);
+  }
+
+  const admission = admissionControl.stats();
+  metric(lines, 'admission_route_in_flight', 'gauge', 'In-flight requests per concurrency-limited route group',
+    admission.route_groups.map(group => [{ group: group.name }, group.in_flight]));
+  metric(lines, 'admission_rejected_total', 'counter', 'Requests shed by admission control by reason and class',
+    admission.rejected.map(entry => [{ reason: entry.reason, class: entry.class }, entry.count]));
+
+  const coalescing = [Item.coalescingStats()];
+  metric(lines, 'coalesced_queries_total', 'counter', 'Reads that shared an identical in-flight query instead of running their own',
+    coalescing.flatMap(group => group.methods.map(entry => [{ group: group.name, method: entry.method }, entry.coalesced])));
+
+  const hashing = hashPoolStats();
+  metric(lines, 'password_hash_workers', 'gauge', 'Password hashing worker threads', [[null, hashing.workers]]);
+  metric(lines, 'password_hash_busy_workers', 'gauge', 'Password hashing workers running a task', [[null, hashing.busy]]);
+  metric(lines, 'password_hash_queue_depth', 'gauge', 'Password hashes waiting for a worker', [[null, hashing.queue_depth]]);
+  metric(lines, 'password_hash_tasks_total', 'counter', 'Password hashing tasks by outcome', [
+    [{ outcome: 'completed' }, hashing.completed],
+    [{ outcome: 'failed' }, hashing.failed],
+    [{ outcome: 'rejected' }, hashing.rejected]
+  ]);
+
+  return `${lines.join('\n')}\n`;
+};
+
+// GET /metrics
+const handler = (req, res) => {
+  res.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+  res.send(render());
+};
+
+module.exports = {
+  middleware,
+  handler,
+  render
+};
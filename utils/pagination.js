@@ -0,0 +1,216 @@
+// Keyset (cursor) pagination and field projection helpers for list endpoints.
+//
+// Lists are ordered by created_at DESC plus the table's primary key columns, so
+// the cursor encodes the last row's (created_at, ...primary key) tuple and the
+// next page is fetched with a row comparison that walks the composite indexes
+// created in migrations/003_pagination_indexes.sql instead of scanning the whole table.
+
+const DEFAULT_LIMIT = parseInt(process.env.DEFAULT_PAGE_LIMIT, 10) || 100;
+const MAX_LIMIT = parseInt(process.env.MAX_PAGE_LIMIT, 10) || 500;
+
+// Hidden column carrying the full-precision created_at (JS Dates drop microseconds)
+const CURSOR_COLUMN = '_cursor_created_at';
+
+const listOptionsError = (message) => {
+  const error = new Error(message);
+  error.code = 'INVALID_LIST_OPTIONS';
+  return error;
+};
+
+const encodeCursor = (values) =>
+  Buffer.from(JSON.stringify(values)).toString('base64url');
+
+const decodeCursor = (cursor, length) => {
+  let values;
+  try {
+    values = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+  } catch (error) {
+    throw listOptionsError('Invalid cursor');
+  }
+  if (!Array.isArray(values) || values.length !== length) {
+    throw listOptionsError('Invalid cursor');
+  }
+  return values;
+};
+
+// created_at::text as written into cursors, e.g. "2025-12-09 10:30:00.123456"
+const CURSOR_TIMESTAMP = /^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(\.\d{1,6})?$/;
+
+const isCursorTimestamp = (value) => {
+  const match = typeof value === 'string' && CURSOR_TIMESTAMP.exec(value);
+  if (!match) {
+    return false;
+  }
+  // Reject out-of-range parts (year 0, month 13, Feb 30) that Postgres would refuse
+  const parsed = new Date(`${match[1]}T${match[2]}Z`);
+  return match[1] >= '0001'
+    && !Number.isNaN(parsed.getTime())
+    && parsed.toISOString().slice(0, 19) === `${match[1]}T${match[2]}`;
+};
+
+// Key values are compared with text columns; NUL bytes can't be sent as text
+const isCursorKey = value => (typeof value === 'string' && !value.includes('\u0000'))
+  || (typeof value === 'number' && Number.isFinite(value));
+
+// Decode a created_at + primary key cursor, rejecting values the keyset
+// comparison would fail to cast (so a tampered cursor is a 400, not a 500)
+const decodeKeysetCursor = (cursor, keyColumns) => {
+  const [createdAt, ...keys] = decodeCursor(cursor, keyColumns.length + 1);
+  if (!isCursorTimestamp(createdAt) || !keys.every(isCursorKey)) {
+    throw listOptionsError('Invalid cursor');
+  }
+  return [createdAt, ...keys];
+};
+
+// Parse ?limit=&after=&fields= into list options, validating fields against
+// allowedFields and, when keyColumns is given, the cursor's created_at and keys
+const parseListOptions = (query, allowedFields, keyColumns = null) => {
+  const options = { limit: DEFAULT_LIMIT, after: null, fields: null };
+
+  if (query.limit !== undefined) {
+    const limit = parseInt(query.limit, 10);
+    if (!Number.isInteger(limit) || limit < 1) {
+      throw listOptionsError('limit must be a positive integer');
+    }
+    options.limit = Math.min(limit, MAX_LIMIT);
+  }
+
+  if (query.after) {
+    options.after = String(query.after);
+    if (keyColumns) {
+      decodeKeysetCursor(options.after, keyColumns);
+    }
+  }
+
+  if (query.fields) {
+    const fields = String(query.fields).split(',').map(f => f.trim()).filter(Boolean);
+    const unknown = fields.filter(f => !allowedFields.includes(f));
+    if (unknown.length > 0) {
+      throw listOptionsError(`Unknown field(s): ${unknown.join(', ')}`);
+    }
+    options.fields = fields;
+  }
+
+  return options;
+};
+
+// Fill in defaults for options passed directly to a model (e.g. findAll())
+const normalizeListOptions = (options = {}) => ({
+  limit: Math.min(options.limit || DEFAULT_LIMIT, MAX_LIMIT),
+  after: options.after || null,
+  fields: options.fields || null
+});
+
+// Build the SELECT list for a projection; cursor key columns are always fetched
+const selectColumns = (fields, keyColumns, alias = null) => {
+  const prefix = alias ? `${alias}.` : '';
+  if (!fields) {
+    return `${prefix}*, ${prefix}created_at::text AS ${CURSOR_COLUMN}`;
+  }
+  const columns = [...new Set([...fields, ...keyColumns])];
+  return `${columns.map(c => `${prefix}${c}`).join(', ')}, ${prefix}created_at::text AS ${CURSOR_COLUMN}`;
+};
+
+// Build the keyset WHERE clause, ORDER BY and LIMIT for a page
+// paramOffset is the number of placeholders already used by the caller's query
+const keysetClause = (options, keyColumns, alias = null, paramOffset = 0) => {
+  const prefix = alias ? `${alias}.` : '';
+  const orderColumns = ['created_at', ...keyColumns].map(c => `${prefix}${c}`);
+  const params = [];
+  let where = '';
+
+  if (options.after) {
+    const values = decodeKeysetCursor(options.after, keyColumns);
+    const placeholders = values.map((value, i) => {
+      params.push(value);
+      return i === 0
+        ? `$${paramOffset + i + 1}::timestamp`
+        : `$${paramOffset + i + 1}`;
+    });
+    where = `(${orderColumns.join(', ')}) < (${placeholders.join(', ')})`;
+  }
+
+  params.push(options.limit + 1);
+  const orderBy = `ORDER BY ${orderColumns.map(c => `${c} DESC`).join(', ')}`;
+  const limit = `LIMIT $${paramOffset + params.length}`;
+
+  return { where, orderBy, limit, params };
+};
+
+// Drop the hidden cursor column and apply the ?fields= projection
+const projectRows = (rows, fields) => rows.map(row => {
+  const { [CURSOR_COLUMN]: _cursor, ...rest } = row;
+  if (!fields) {
+    return rest;
+  }
+  const projected = {};
+  fields.forEach(field => {
+    projected[field] = rest[field];
+  });
+  return projected;
+});
+
+// Trim the extra look-ahead row, compute next_cursor and apply the projection
+const toPage = (rows, options, keyColumns) => {
+  const hasMore = rows.length > options.limit;
+  const pageRows = hasMore ? rows.slice(0, options.limit) : rows;
+  const last = pageRows[pageRows.length - 1];
+  const nextCursor = hasMore
+    ? encodeCursor([last[CURSOR_COLUMN], ...keyColumns.map(c => last[c])])
+    : null;
+
+  return { rows: projectRows(pageRows, options.fields), nextCursor };
+};
+
+// Keyset clause for an explicit sort order other than created_at, e.g.
+// [{ column: 'available', desc: true }, { column: 'item_name' }]. The last
+// column must be unique; columns must not be timestamps (the cursor carries
+// their JSON values). Mixed directions rule out a row comparison, so the
+// condition is expanded to (a < $1) OR (a = $1 AND b > $2)
+const orderedKeysetClause = (options, order, alias = null, paramOffset = 0) => {
+  const prefix = alias ? `${alias}.` : '';
+  const params = [];
+  let where = '';
+
+  if (options.after) {
+    decodeCursor(options.after, order.length).forEach(value => params.push(value));
+    const terms = order.map((sort, i) => {
+      const equal = order
+        .slice(0, i)
+        .map((previous, j) => `${prefix}${previous.column} = $${paramOffset + j + 1}`);
+      const compare = `${prefix}${sort.column} ${sort.desc ? '<' : '>'} $${paramOffset + i + 1}`;
+      return `(${[...equal, compare].join(' AND ')})`;
+    });
+    where = `(${terms.join(' OR ')})`;
+  }
+
+  params.push(options.limit + 1);
+  const orderBy = `ORDER BY ${order.map(sort => `${prefix}${sort.column} ${sort.desc ? 'DESC' : 'ASC'}`).join(', ')}`;
+  const limit = `LIMIT $${paramOffset + params.length}`;
+
+  return { where, orderBy, limit, params };
+};
+
+// toPage for orderedKeysetClause results
+const toOrderedPage = (rows, options, order) => {
+  const hasMore = rows.length > options.limit;
+  const pageRows = hasMore ? rows.slice(0, options.limit) : rows;
+  const last = pageRows[pageRows.length - 1];
+  const nextCursor = hasMore
+    ? encodeCursor(order.map(sort => last[sort.column]))
+    : null;
+
+  return { rows: projectRows(pageRows, options.fields), nextCursor };
+};
+
+module.exports = {
+  DEFAULT_LIMIT,
+  MAX_LIMIT,
+  parseListOptions,
+  normalizeListOptions,
+  selectColumns,
+  keysetClause,
+  toPage,
+  orderedKeysetClause,
+  toOrderedPage
+};
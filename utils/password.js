@@ -0,0 +1,136 @@
+const crypto = require('crypto');
+const os = require('os');
+const path = require('path');
+const { WorkerPool } = require('./workerPool');
+
+// Password hashing with scrypt on a bounded worker-thread pool.
+//
+// Key derivation deliberately costs tens of milliseconds of CPU, so it runs in
+// worker threads rather than on the event loop (or libuv's threadpool, which
+// DNS and fs share): a burst of signups/logins queues behind the pool instead
+// of delaying claim and browse requests. When PASSWORD_HASH_MAX_QUEUE tasks are
+// already waiting, calls reject with code 'QUEUE_FULL'.
+//
+// Stored format: scrypt$N$r$p$<salt base64>$<key base64>. Values without the
+// scrypt$ prefix are legacy plaintext passwords; verifyPassword() accepts them
+// and reports needsRehash so they are upgraded on the next successful login.
+//
+//   PASSWORD_HASH_WORKERS    worker threads (default: half the CPUs, at least 1)
+//   PASSWORD_HASH_MAX_QUEUE  queued hashes before rejecting (default 100)
+//   PASSWORD_SCRYPT_N        scrypt cost (default 16384)
+
+const envInt = (name, fallback) => {
+  const value = parseInt(process.env[name], 10);
+  return Number.isNaN(value) ? fallback : value;
+};
+
+const PREFIX = 'scrypt';
+const SCRYPT_N = envInt('PASSWORD_SCRYPT_N', 16384);
+const SCRYPT_R = 8;
+const SCRYPT_P = 1;
+const KEY_LENGTH = 64;
+const SALT_BYTES = 16;
+
+const hashPool = new WorkerPool({
+  name: 'password_hash',
+  filename: path.join(__dirname, 'workers', 'passwordWorker.js'),
+  size: envInt('PASSWORD_HASH_WORKERS', Math.max(1, Math.floor(os.availableParallelism() / 2))),
+  maxQueue: envInt('PASSWORD_HASH_MAX_QUEUE', 100)
+});
+
+// Verified against when an account doesn't exist, so that a login for an
+// unknown email costs the same key derivation as one for a real account
+const DUMMY_HASH = [
+  PREFIX, SCRYPT_N, SCRYPT_R, SCRYPT_P,
+  crypto.randomBytes(SALT_BYTES).toString('base64'),
+  Buffer.alloc(KEY_LENGTH).toString('base64')
+].join('$');
+
+const isHashed = stored => typeof stored === 'string' && stored.startsWith(`${PREFIX}$`);
+
+// Hash a password for storage
+const hashPassword = async (password) => {
+  const salt = crypto.randomBytes(SALT_BYTES).toString('base64');
+  const key = await hashPool.run({
+    op: 'hash',
+    password,
+    salt,
+    N: SCRYPT_N,
+    r: SCRYPT_R,
+    p: SCRYPT_P,
+    keyLength: KEY_LENGTH
+  });
+  return [PREFIX, SCRYPT_N, SCRYPT_R, SCRYPT_P, salt, key].join('$');
+};
+
+// Bounds for parameters read back from a stored hash, so a corrupt value
+// can't make a worker allocate gigabytes or derive an empty key
+const MAX_SCRYPT_N = 2 ** 20;
+const MAX_SCRYPT_R = 32;
+const MAX_SCRYPT_P = 16;
+const MIN_KEY_LENGTH = 16;
+
+const INVALID = { valid: false, needsRehash: false };
+const BASE64 = /^[A-Za-z0-9+/]+={0,2}$/;
+
+// Parse scrypt$N$r$p$salt$key; null when the stored value is malformed
+const parseHash = (stored) => {
+  const parts = stored.split('$');
+  if (parts.length !== 6) {
+    return null;
+  }
+  const [, N, r, p, salt, expected] = parts;
+  const params = { N: Number(N), r: Number(r), p: Number(p) };
+  const validParams = Object.values(params).every(value => Number.isInteger(value) && value > 0)
+    && params.N > 1 && params.N <= MAX_SCRYPT_N && (params.N & (params.N - 1)) === 0
+    && params.r <= MAX_SCRYPT_R && params.p <= MAX_SCRYPT_P;
+  if (!validParams || !BASE64.test(salt) || !BASE64.test(expected)
+    || Buffer.from(expected, 'base64').length < MIN_KEY_LENGTH) {
+    return null;
+  }
+  return { ...params, salt, expected };
+};
+
+// Check a password against a stored value; returns { valid, needsRehash }.
+// A missing or non-string password, or a corrupt stored hash, is simply invalid
+const verifyPassword = async (password, stored) => {
+  if (!stored || typeof stored !== 'string' || typeof password !== 'string') {
+    return INVALID;
+  }
+
+  if (!isHashed(stored)) {
+    const given = Buffer.from(password);
+    const expected = Buffer.from(stored);
+    const valid = given.length === expected.length && crypto.timingSafeEqual(given, expected);
+    return { valid, needsRehash: valid };
+  }
+
+  const parsed = parseHash(stored);
+  if (!parsed) {
+    return INVALID;
+  }
+
+  let valid;
+  try {
+    valid = await hashPool.run({ op: 'verify', password, ...parsed });
+  } catch (error) {
+    // Anything the worker rejects counts as a failed check; a full queue
+    // still surfaces so the caller can answer 503
+    if (error.code === 'QUEUE_FULL') {
+      throw error;
+    }
+    return INVALID;
+  }
+  return { valid, needsRehash: valid && parsed.N !== SCRYPT_N };
+};
+
+// Queue depth and throughput of the hashing pool (for /metrics)
+const hashPoolStats = () => hashPool.stats();
+
+module.exports = {
+  hashPassword,
+  verifyPassword,
+  isHashed,
+  hashPoolStats,
+  DUMMY_HASH
+};
@@ -0,0 +1,73 @@
+const pool = require('../config/database');
+const logger = require('./logger');
+
+// Read a query's result in batches through a server-side cursor.
+//
+// Yields arrays of at most batchSize rows, so callers can stream arbitrarily
+// large results with flat memory. The cursor lives in a transaction on a
+// dedicated pooled client, which is released when iteration finishes, fails,
+// or is abandoned early (e.g. the HTTP client disconnected).
+//
+// Because that transaction stays open while the HTTP client reads, it is
+// time-boxed: iteration fails once the cursor has been open for
+// STREAM_MAX_DURATION_MS, and the database ends the session if no FETCH
+// arrives for twice STREAM_IDLE_TIMEOUT_MS (utils/responseStream.js gives up
+// on a stalled reader after STREAM_IDLE_TIMEOUT_MS; this is the backstop).
+//
+//   STREAM_MAX_DURATION_MS  longest a cursor may stay open (default 300000)
+//   STREAM_IDLE_TIMEOUT_MS  longest wait for a slow reader (default 30000)
+
+const envInt = (name, fallback) => {
+  const value = parseInt(process.env[name], 10);
+  return Number.isNaN(value) ? fallback : value;
+};
+
+const STREAM_MAX_DURATION_MS = envInt('STREAM_MAX_DURATION_MS', 300000);
+const STREAM_IDLE_TIMEOUT_MS = envInt('STREAM_IDLE_TIMEOUT_MS', 30000);
+
+async function* cursorBatches(text, values = [], batchSize = 500) {
+  const client = await pool.connect();
+  // The pool stops listening for errors on checked-out clients; if the server
+  // ends an idle cursor session, surface it on the next FETCH instead of as an
+  // unhandled 'error' event
+  const onError = (error) => {
+    logger.warn('Cursor connection lost', { error: error.message });
+  };
+  client.on('error', onError);
+  const deadline = Date.now() + STREAM_MAX_DURATION_MS;
+  let failed = false;
+
+  try {
+    await client.query('BEGIN READ ONLY');
+    await client.query(`SET LOCAL idle_in_transaction_session_timeout = ${STREAM_IDLE_TIMEOUT_MS * 2}`);
+    await client.query(`DECLARE list_cursor NO SCROLL CURSOR FOR ${text}`, values);
+
+    while (true) {
+      if (Date.now() > deadline) {
+        throw new Error(`Cursor open longer than ${STREAM_MAX_DURATION_MS}ms`);
+      }
+      const result = await client.query(`FETCH ${batchSize} FROM list_cursor`);
+      if (result.rows.length === 0) {
+        break;
+      }
+      yield result.rows;
+      if (result.rows.length < batchSize) {
+        break;
+      }
+    }
+  } catch (error) {
+    failed = true;
+    throw error;
+  } finally {
+    client.removeListener('error', onError);
+    try {
+      await client.query(failed ? 'ROLLBACK' : 'COMMIT');
+      client.release();
+    } catch (error) {
+      // Don't return a broken connection to the pool
+      client.release(error);
+    }
+  }
+}
+
+module.exports = { cursorBatches, STREAM_IDLE_TIMEOUT_MS };
@@ -0,0 +1,326 @@
+const { AsyncLocalStorage } = require('async_hooks');
+const logger = require('./logger');
+
+// Per-query timing for the shared pg pool.
+//
+// instrumentPool() wraps pool.query and the query method of every pooled
+// client, so both one-off queries and transaction work are timed. Each query
+// is attributed to the model method that issued it, such as "Item.findAll":
+// labelMethods() runs every static method of a model class inside an
+// AsyncLocalStorage label, which follows the method's awaits down to the
+// query. Queries issued outside a labelled method count as "unlabeled".
+// Durations go into rolling per-method histograms (QUERY_STATS_WINDOW_MS,
+// split into slots so old data ages out smoothly); queries slower than
+// SLOW_QUERY_MS are logged, and a sample of those is logged again with its
+// EXPLAIN plan unless queries are already waiting for a pool connection.
+//
+//   QUERY_STATS_WINDOW_MS     aggregation window (default 300000)
+//   SLOW_QUERY_MS             slow query threshold (default 500, 0 disables)
+//   SLOW_QUERY_EXPLAIN_RATE   fraction of slow queries explained (default 0.1)
+
+const envNumber = (name, fallback) => {
+  const value = parseFloat(process.env[name]);
+  return Number.isNaN(value) ? fallback : value;
+};
+
+const WINDOW_MS = envNumber('QUERY_STATS_WINDOW_MS', 300000);
+const WINDOW_SLOTS = 5;
+const SLOT_MS = WINDOW_MS / WINDOW_SLOTS;
+const SLOW_QUERY_MS = envNumber('SLOW_QUERY_MS', 500);
+const EXPLAIN_RATE = envNumber('SLOW_QUERY_EXPLAIN_RATE', 0.1);
+
+// Histogram bucket upper bounds in milliseconds (the last bucket is +Inf)
+const BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000];
+
+// Marks a query config issued by this module (EXPLAIN) so it is not recorded
+const SKIP = Symbol('queryStats.skip');
+// Carries the caller name from pool.query to the pooled client's query
+const CALLER = Symbol('queryStats.caller');
+
+const MAX_LOGGED_SQL = 2000;
+// Plans can only be explained for plain DML; not for BEGIN, FETCH, COPY, ...
+const EXPLAINABLE = /^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b/i;
+
+// ---------------------------------------------------------------------------
+// Caller attribution
+// ---------------------------------------------------------------------------
+
+const labels = new AsyncLocalStorage();
+const UNLABELED = 'unlabeled';
+
+// Name of the model method the current query runs in, e.g. "Item.findAll"
+const callerName = () => labels.getStore() || UNLABELED;
+
+const isAsyncIterator = value => value
+  && typeof value.next === 'function'
+  && typeof value[Symbol.asyncIterator] === 'function';
+
+// Run every static method of a model class under a "<Class>.<method>" label.
+// Async iterators (cursor streams) get their steps labelled too, since their
+// queries run when the consumer pulls, not when the method is called
+const labelMethods = (ModelClass) => {
+  Object.getOwnPropertyNames(ModelClass).forEach((name) => {
+    const descriptor = Object.getOwnPropertyDescriptor(ModelClass, name);
+    if (typeof descriptor.value !== 'function') {
+      return;
+    }
+    const method = descriptor.value;
+    const label = `${ModelClass.name}.${name}`;
+    const inLabel = fn => function labelled(...args) {
+      return labels.run(label, () => fn.apply(this, args));
+    };
+    const labelledMethod = inLabel(function () {
+      const result = method.apply(this, arguments);
+      if (isAsyncIterator(result)) {
+        ['next', 'return', 'throw'].forEach((step) => {
+          if (typeof result[step] === 'function') {
+            result[step] = inLabel(result[step]);
+          }
+        });
+      }
+      return result;
+    });
+    Object.defineProperty(ModelClass, name, { ...descriptor, value: labelledMethod });
+  });
+  return ModelClass;
+};
+
+// ---------------------------------------------------------------------------
+// Rolling histograms
+// ---------------------------------------------------------------------------
+
+let slots = [];
+
+const newMethodStats = () => ({
+  count: 0,
+  errors: 0,
+  rows: 0,
+  total_ms: 0,
+  max_ms: 0,
+  slow: 0,
+  buckets: new Array(BUCKETS_MS.length + 1).fill(0)
+});
+
+const currentSlot = (now) => {
+  const latest = slots[slots.length - 1];
+  if (latest && now - latest.startedAt < SLOT_MS) {
+    return latest;
+  }
+  const slot = { startedAt: now, methods: new Map() };
+  slots = slots.filter(entry => now - entry.startedAt < WINDOW_MS - SLOT_MS);
+  slots.push(slot);
+  return slot;
+};
+
+const bucketIndex = (durationMs) => {
+  const index = BUCKETS_MS.findIndex(bound => durationMs <= bound);
+  return index === -1 ? BUCKETS_MS.length : index;
+};
+
+const record = (method, durationMs, rowCount, failed) => {
+  const slot = currentSlot(Date.now());
+  let stats = slot.methods.get(method);
+  if (!stats) {
+    stats = newMethodStats();
+    slot.methods.set(method, stats);
+  }
+  stats.count++;
+  stats.total_ms += durationMs;
+  stats.max_ms = Math.max(stats.max_ms, durationMs);
+  stats.buckets[bucketIndex(durationMs)]++;
+  if (failed) {
+    stats.errors++;
+  } else {
+    stats.rows += rowCount || 0;
+  }
+  if (SLOW_QUERY_MS > 0 && durationMs >= SLOW_QUERY_MS) {
+    stats.slow++;
+  }
+};
+
+// Estimate a percentile as the upper bound of the bucket it falls into
+const bucketPercentile = (buckets, count, p, maxMs) => {
+  const target = Math.ceil((p / 100) * count);
+  let seen = 0;
+  for (let i = 0; i < buckets.length; i++) {
+    seen += buckets[i];
+    if (seen >= target) {
+      return i < BUCKETS_MS.length ? Math.min(BUCKETS_MS[i], maxMs) : maxMs;
+    }
+  }
+  return maxMs;
+};
+
+const round = (value) => Math.round(value * 100) / 100;
+
+// Aggregates over the rolling window, slowest total time first
+const snapshot = () => {
+  const now = Date.now();
+  const merged = new Map();
+
+  slots
+    .filter(slot => now - slot.startedAt < WINDOW_MS)
+    .forEach((slot) => {
+      slot.methods.forEach((stats, method) => {
+        const target = merged.get(method) || newMethodStats();
+        target.count += stats.count;
+        target.errors += stats.errors;
+        target.rows += stats.rows;
+        target.total_ms += stats.total_ms;
+        target.max_ms = Math.max(target.max_ms, stats.max_ms);
+        target.slow += stats.slow;
+        stats.buckets.forEach((value, i) => { target.buckets[i] += value; });
+        merged.set(method, target);
+      });
+    });
+
+  const methods = [...merged.entries()]
+    .map(([method, stats]) => ({
+      method,
+      calls: stats.count,
+      errors: stats.errors,
+      slow: stats.slow,
+      rows: stats.rows,
+      total_ms: round(stats.total_ms),
+      mean_ms: round(stats.total_ms / stats.count),
+      p50_ms: round(bucketPercentile(stats.buckets, stats.count, 50, stats.max_ms)),
+      p95_ms: round(bucketPercentile(stats.buckets, stats.count, 95, stats.max_ms)),
+      p99_ms: round(bucketPercentile(stats.buckets, stats.count, 99, stats.max_ms)),
+      max_ms: round(stats.max_ms),
+      histogram: Object.fromEntries(stats.buckets.map((value, i) => [
+        i < BUCKETS_MS.length ? `le_${BUCKETS_MS[i]}` : 'le_inf',
+        value
+      ]))
+    }))
+    .sort((a, b) => b.total_ms - a.total_ms);
+
+  return {
+    window_ms: WINDOW_MS,
+    slow_query_ms: SLOW_QUERY_MS,
+    explain_rate: EXPLAIN_RATE,
+    methods
+  };
+};
+
+const reset = () => {
+  slots = [];
+};
+
+// ---------------------------------------------------------------------------
+// Slow query log
+// ---------------------------------------------------------------------------
+
+let explaining = false;
+
+const logSlowQuery = (pool, method, text, values, durationMs, rowCount) => {
+  const sql = text.length > MAX_LOGGED_SQL ? `${text.slice(0, MAX_LOGGED_SQL)}...` : text;
+  logger.warn('Slow query', { method, duration_ms: round(durationMs), rows: rowCount, sql: sql.replace(/\s+/g, ' ').trim() });
+
+  // One EXPLAIN at a time, for a sample of slow statements, off the request path,
+  // and never while requests are queued for a connection it would take.
+  // The plan is fetched on another connection, so it cannot see temp tables
+  if (explaining || pool.waitingCount > 0 || Math.random() >= EXPLAIN_RATE || !EXPLAINABLE.test(text)) {
+    return;
+  }
+  explaining = true;
+  pool.query({ text: `EXPLAIN (FORMAT JSON) ${text}`, values, [SKIP]: true })
+    .then((result) => {
+      logger.warn('Slow query plan', { method, duration_ms: round(durationMs), plan: result.rows[0]['QUERY PLAN'] });
+    })
+    .catch((error) => {
+      logger.debug('Could not explain slow query', { method, error });
+    })
+    .finally(() => {
+      explaining = false;
+    });
+};
+
+// ---------------------------------------------------------------------------
+// Instrumentation
+// ---------------------------------------------------------------------------
+
+// Streams (COPY, cursors) are submittables and are left untimed
+const isSubmittable = config => config && typeof config.submit === 'function';
+
+const instrumentClient = (pool, client) => {
+  const originalQuery = client.query;
+
+  client.query = function instrumentedQuery(config, values, callback) {
+    if (!config || isSubmittable(config) || config[SKIP]) {
+      return originalQuery.apply(this, arguments);
+    }
+
+    const method = config[CALLER] || callerName();
+    const text = typeof config === 'string' ? config : config.text;
+    const queryValues = typeof values === 'function' || values === undefined
+      ? config.values
+      : values;
+    const start = process.hrtime.bigint();
+
+    const finish = (error, result) => {
+      const durationMs = Number(process.hrtime.bigint() - start) / 1e6;
+      const rowCount = result ? result.rowCount : null;
+      record(method, durationMs, rowCount, Boolean(error));
+      if (!error && SLOW_QUERY_MS > 0 && durationMs >= SLOW_QUERY_MS) {
+        logSlowQuery(pool, method, text || '', queryValues, durationMs, rowCount);
+      }
+    };
+
+    if (typeof values === 'function') {
+      return originalQuery.call(this, config, (error, result) => {
+        finish(error, result);
+        values(error, result);
+      });
+    }
+    if (typeof callback === 'function') {
+      return originalQuery.call(this, config, values, (error, result) => {
+        finish(error, result);
+        callback(error, result);
+      });
+    }
+    return originalQuery.call(this, config, values).then(
+      (result) => {
+        finish(null, result);
+        return result;
+      },
+      (error) => {
+        finish(error);
+        throw error;
+      }
+    );
+  };
+};
+
+// Time every query issued through the pool or its clients
+const instrumentPool = (pool) => {
+  pool.on('connect', client => instrumentClient(pool, client));
+
+  // pool.query checks out a client asynchronously, possibly in the async
+  // context of the query that released it, so name the caller here and pass
+  // it along
+  const originalQuery = pool.query;
+  pool.query = function instrumentedPoolQuery(config, values, callback) {
+    if (!config || isSubmittable(config) || config[SKIP]) {
+      return originalQuery.apply(this, arguments);
+    }
+    const named = typeof config === 'string'
+      ? { text: config, [CALLER]: callerName() }
+      : { ...config, [CALLER]: callerName() };
+    return originalQuery.call(this, named, values, callback);
+  };
+
+  return pool;
+};
+
+// Mark an internal query (health/lag checks) so it is not timed or logged
+const untracked = config => (typeof config === 'string'
+  ? { text: config, [SKIP]: true }
+  : { ...config, [SKIP]: true });
+
+module.exports = {
+  instrumentPool,
+  labelMethods,
+  untracked,
+  snapshot,
+  reset
+};
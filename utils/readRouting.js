@@ -0,0 +1,224 @@
+const pool = require('../config/database');
+const { replicaPool } = pool;
+const logger = require('./logger');
+const requestContext = require('./requestContext');
+const { untracked } = require('./queryStats');
+
+// Read-replica routing for read-only model methods.
+//
+// Models send their reads through readPool.query(); everything else (writes,
+// transactions, cursors, migrations) keeps using the primary pool. A read goes
+// to the replica (DATABASE_REPLICA_URL) unless:
+//   - it is part of a write request (POST/PUT/PATCH/DELETE);
+//   - the client made a successful write in the last READ_YOUR_WRITES_MS, so a
+//     guest who just claimed an item sees their claim. Successful writes answer
+//     with the time the window ends, as a primary_until cookie and an
+//     X-Primary-Until header; the client sends either back. It travels with the
+//     client, so it holds whichever worker or instance serves the next read;
+//   - the replica's measured lag is above REPLICA_MAX_LAG_MS, or the last lag
+//     check failed.
+// A replica read that fails to connect marks the replica unhealthy and is
+// retried on the primary. Shared results (the item cache, coalesced queries)
+// are keyed on target() so a primary-pinned read never reuses replica data.
+// Without DATABASE_REPLICA_URL every read uses the primary and none of this
+// costs anything.
+//
+//   DATABASE_REPLICA_URL    replica connection string (optional)
+//   REPLICA_MAX_LAG_MS      lag above which the replica is bypassed (default 1000)
+//   REPLICA_LAG_CHECK_MS    lag check interval (default 2000)
+//   READ_YOUR_WRITES_MS     per-client primary window after a write (default 5000)
+
+const envInt = (name, fallback) => {
+  const value = parseInt(process.env[name], 10);
+  return Number.isNaN(value) ? fallback : value;
+};
+
+const MAX_LAG_MS = envInt('REPLICA_MAX_LAG_MS', 1000);
+const LAG_CHECK_MS = envInt('REPLICA_LAG_CHECK_MS', 2000);
+const READ_YOUR_WRITES_MS = envInt('READ_YOUR_WRITES_MS', 5000);
+
+// Replay lag in milliseconds; 0 when the replica has replayed everything it
+// received, or when it is not a standby at all (e.g. a second local database)
+const LAG_SQL = `
+  SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) * 1000, 0)
+  END AS lag_ms`;
+
+const READ_METHODS = new Set(['GET', 'HEAD', 'OPTIONS']);
+
+const PIN_COOKIE = 'primary_until';
+const PIN_HEADER = 'X-Primary-Until';
+const PIN_COOKIE_PATTERN = new RegExp(`(?:^|;\\s*)${PIN_COOKIE}=(\\d+)`);
+
+const replica = {
+  healthy: false,
+  lagMs: null,
+  checkedAt: null,
+  lastError: null
+};
+const reads = { primary: 0, replica: 0, fallback: 0 };
+let lagTimer = null;
+
+const useReplica = () => {
+  if (!replicaPool || !replica.healthy) {
+    return false;
+  }
+  const context = requestContext.current();
+  return !(context && context.primary);
+};
+
+// Where a read issued now, in the current request, would go
+const target = () => (useReplica() ? 'replica' : 'primary');
+
+// Socket-level failures reaching the replica
+const NETWORK_ERRORS = new Set([
+  'ECONNREFUSED', 'ECONNRESET', 'ETIMEDOUT', 'EHOSTUNREACH',
+  'ENETUNREACH', 'ENOTFOUND', 'EAI_AGAIN', 'EPIPE'
+]);
+// SQLSTATEs for a lost or refused session: class 08 (connection exception),
+// admin/crash shutdown and cannot-connect-now (57P01-57P03), too many connections
+const CONNECTION_SQLSTATE = /^(08...|57P0[123]|53300)$/;
+// pg reports pool checkout timeouts and dropped sockets without a code
+const CONNECTION_MESSAGE = /^(timeout exceeded when trying to connect|Connection terminated)/;
+
+// Errors that mean the replica is unreachable, not that the query was wrong
+const isConnectionError = (error) => {
+  if (error.code) {
+    return NETWORK_ERRORS.has(error.code) || CONNECTION_SQLSTATE.test(error.code);
+  }
+  return CONNECTION_MESSAGE.test(error.message || '');
+};
+
+const markUnhealthy = (error) => {
+  if (replica.healthy) {
+    logger.warn('Read replica unavailable, reading from primary', { error });
+  }
+  replica.healthy = false;
+  replica.lastError = error.message;
+};
+
+// Drop-in for pool.query() in read-only model methods
+const readPool = {
+  query(config, values) {
+    if (!useReplica()) {
+      reads.primary++;
+      return pool.query(config, values);
+    }
+    reads.replica++;
+    requestContext.markPossiblyStale('replica');
+    return replicaPool.query(config, values).catch((error) => {
+      if (!isConnectionError(error)) {
+        throw error;
+      }
+      markUnhealthy(error);
+      reads.fallback++;
+      return pool.query(config, values);
+    });
+  }
+};
+
+const checkLag = async () => {
+  try {
+    const result = await replicaPool.query(untracked(LAG_SQL));
+    const lagMs = Number(result.rows[0].lag_ms);
+    const healthy = lagMs <= MAX_LAG_MS;
+    if (healthy !== replica.healthy) {
+      logger.info(healthy ? 'Routing reads to replica' : 'Replica lagging, reading from primary', {
+        lag_ms: Math.round(lagMs),
+        max_lag_ms: MAX_LAG_MS
+      });
+    }
+    replica.healthy = healthy;
+    replica.lagMs = lagMs;
+    replica.lastError = null;
+  } catch (error) {
+    markUnhealthy(error);
+  } finally {
+    replica.checkedAt = new Date().toISOString();
+  }
+};
+
+// True while the request carries a read-your-writes window that has not
+// ended. Values further ahead than one window are not ours and are ignored
+const isPinned = (req) => {
+  const match = req.get(PIN_HEADER) || (PIN_COOKIE_PATTERN.exec(req.headers.cookie || '') || [])[1];
+  const until = Number(match);
+  if (!until) {
+    return false;
+  }
+  const remaining = until - Date.now();
+  return remaining > 0 && remaining <= READ_YOUR_WRITES_MS;
+};
+
+// Hand the client a read-your-writes window as the response headers go out,
+// once the final status is known
+const pinAfterWrite = (res) => {
+  const writeHead = res.writeHead;
+  res.writeHead = function (statusCode, ...rest) {
+    if (statusCode < 400) {
+      const until = Date.now() + READ_YOUR_WRITES_MS;
+      this.setHeader(PIN_HEADER, String(until));
+      this.appendHeader('Set-Cookie', `${PIN_COOKIE}=${until}; Max-Age=${Math.ceil(READ_YOUR_WRITES_MS / 1000)}; Path=/api; HttpOnly; SameSite=Lax`);
+    }
+    return writeHead.call(this, statusCode, ...rest);
+  };
+};
+
+// Start measuring replica lag; resolves after the first check
+const start = async () => {
+  if (!replicaPool || lagTimer) {
+    return;
+  }
+  lagTimer = setInterval(checkLag, LAG_CHECK_MS);
+  lagTimer.unref();
+  await checkLag();
+  if (!replica.healthy) {
+    throw new Error(`Read replica not usable yet: ${replica.lastError || `lag ${Math.round(replica.lagMs)}ms`}`);
+  }
+};
+
+const stop = () => {
+  clearInterval(lagTimer);
+  lagTimer = null;
+};
+
+// Express middleware (after requestContext.middleware): pins write requests,
+// and reads by clients that just wrote, to the primary
+const middleware = (req, res, next) => {
+  if (!replicaPool) {
+    return next();
+  }
+
+  const isWrite = !READ_METHODS.has(req.method);
+  const context = requestContext.current();
+  if (context) {
+    context.primary = isWrite || isPinned(req);
+  }
+  if (isWrite) {
+    pinAfterWrite(res);
+  }
+
+  next();
+};
+
+// Routing state for /health and /metrics
+const status = () => ({
+  enabled: Boolean(replicaPool),
+  healthy: replica.healthy,
+  lag_ms: replica.lagMs === null ? null : Math.round(replica.lagMs),
+  max_lag_ms: MAX_LAG_MS,
+  checked_at: replica.checkedAt,
+  last_error: replica.lastError,
+  reads: { ...reads }
+});
+
+module.exports = {
+  readPool,
+  target,
+  middleware,
+  start,
+  stop,
+  status
+};
@@ -0,0 +1,46 @@
+const { AsyncLocalStorage } = require('async_hooks');
+
+// Per-request state that middleware and models share without threading it
+// through every call (AsyncLocalStorage follows the request's async work).
+//
+//   primary      read-only queries must use the primary (set by readRouting)
+//   staleSources where parts of the response came from something that can lag
+//                the primary tables: the item cache, a coalesced query started
+//                before this request, the read replica or a materialized view.
+//                conditionalGet only uses table versions as the ETag when this
+//                is empty.
+//   cacheTags    tags of the cache entries the response was built from (set by
+//                LruCache); conditionalGet.cached turns them into the ETag.
+
+const storage = new AsyncLocalStorage();
+
+// Express middleware: run the rest of the request in a fresh context
+const middleware = (req, res, next) => {
+  storage.run({ primary: false, staleSources: new Set(), cacheTags: [] }, next);
+};
+
+// The current request's context, or undefined outside a request
+const current = () => storage.getStore();
+
+// Note that the response may include data older than the latest commit
+const markPossiblyStale = (source) => {
+  const context = storage.getStore();
+  if (context) {
+    context.staleSources.add(source);
+  }
+};
+
+// Note that the response was built from a cache entry with this content tag
+const addCacheTag = (tag) => {
+  const context = storage.getStore();
+  if (context) {
+    context.cacheTags.push(tag);
+  }
+};
+
+module.exports = {
+  middleware,
+  current,
+  markPossiblyStale,
+  addCacheTag
+};
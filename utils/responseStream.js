@@ -0,0 +1,107 @@
+const logger = require('./logger');
+const { STREAM_IDLE_TIMEOUT_MS } = require('./queryCursor');
+
+// Stream batches of rows (e.g. from utils/queryCursor.js) to an HTTP response.
+// Rows are serialized batch by batch and writes respect backpressure, so memory
+// stays flat regardless of result size. Stops reading (and releases the cursor)
+// if the client goes away.
+//
+// The first batch is read before anything is written, so connection or query
+// errors still reject and can be answered with a normal error response.
+//
+// A client that stops reading for STREAM_IDLE_TIMEOUT_MS is disconnected, so
+// it can't keep the cursor's connection and transaction open indefinitely.
+
+// Resolves true once res drains or closes, false if it stalls past timeoutMs
+const waitForDrain = (res, timeoutMs) => new Promise((resolve) => {
+  const done = (drained) => {
+    clearTimeout(timer);
+    res.off('drain', onDrain);
+    res.off('close', onDrain);
+    resolve(drained);
+  };
+  const onDrain = () => done(true);
+  const timer = setTimeout(() => done(false), timeoutMs);
+  res.on('drain', onDrain);
+  res.on('close', onDrain);
+});
+
+const streamBatches = async (res, batches, { contentType, prefix = '', formatRow, separator = '', suffix = () => '' }) => {
+  let closed = false;
+  res.on('close', () => {
+    closed = true;
+  });
+
+  let next = await batches.next();
+
+  res.status(200);
+  res.setHeader('Content-Type', contentType);
+  res.write(prefix);
+
+  let count = 0;
+
+  try {
+    while (!next.done) {
+      if (closed) {
+        await batches.return();
+        return;
+      }
+      const rows = next.value;
+      const chunk = rows.map(formatRow).join(separator);
+      if (!res.write(count > 0 ? `${separator}${chunk}` : chunk)
+        && !(await waitForDrain(res, STREAM_IDLE_TIMEOUT_MS))) {
+        logger.warn('Client stopped reading, aborting stream', { path: res.req.originalUrl, rows_sent: count });
+        await batches.return();
+        res.destroy();
+        return;
+      }
+      count += rows.length;
+      next = await batches.next();
+    }
+  } catch (error) {
+    // Headers are already sent; abort so the client sees a truncated body
+    logger.error('Error streaming response', error);
+    res.destroy(error);
+    return;
+  }
+
+  res.end(suffix(count));
+};
+
+// The usual list envelope: {"success":true,"data":[ ...rows... ],"count":N}
+const streamJsonArray = (res, batches) => streamBatches(res, batches, {
+  contentType: 'application/json; charset=utf-8',
+  prefix: '{"success":true,"data":[',
+  formatRow: row => JSON.stringify(row),
+  separator: ',',
+  suffix: count => `],"count":${count}}`
+});
+
+// One JSON object per line
+const streamNdjson = (res, batches) => streamBatches(res, batches, {
+  contentType: 'application/x-ndjson; charset=utf-8',
+  formatRow: row => `${JSON.stringify(row)}\n`
+});
+
+const csvCell = (value) => {
+  if (value === null || value === undefined) {
+    return '';
+  }
+  const text = value instanceof Date
+    ? value.toISOString()
+    : typeof value === 'object' ? JSON.stringify(value) : String(value);
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+};
+
+// CSV with a header row; object values (e.g. json_agg columns) are written as JSON
+const streamCsv = (res, batches, columns) => streamBatches(res, batches, {
+  contentType: 'text/csv; charset=utf-8',
+  prefix: `${columns.join(',')}\n`,
+  formatRow: row => `${columns.map(column => csvCell(row[column])).join(',')}\n`
+});
+
+module.exports = {
+  streamJsonArray,
+  streamNdjson,
+  streamCsv
+};
@@ -0,0 +1,83 @@
+const { markPossiblyStale } = require('./requestContext');
+
+// Single-flight coalescing of identical concurrent reads.
+//
+// While a query for a given method and arguments is in flight, further calls
+// with the same key wait for it and share its result instead of issuing the
+// same SELECT again. Nothing is kept once the query settles, so unlike
+// LruCache this never serves stale data - it only deduplicates simultaneous
+// work. Callers share one result object and must treat it as read-only.
+//
+// clear() detaches the flights in progress, so a write can make sure callers
+// arriving after it don't join a read that started before it.
+//
+//   COALESCE_QUERIES  set to false to run every call separately (default true)
+
+const enabled = process.env.COALESCE_QUERIES !== 'false';
+
+class SingleFlight {
+  constructor({ name }) {
+    this.name = name;
+    this.flights = new Map();
+    this.counters = new Map();
+  }
+
+  countersFor(method) {
+    let counters = this.counters.get(method);
+    if (!counters) {
+      counters = { calls: 0, executions: 0, coalesced: 0 };
+      this.counters.set(method, counters);
+    }
+    return counters;
+  }
+
+  // Run fn, or join the identical call of method(...args) already in flight
+  run(method, args, fn) {
+    const counters = this.countersFor(method);
+    counters.calls++;
+
+    if (!enabled) {
+      counters.executions++;
+      return fn();
+    }
+
+    const key = `${method}:${JSON.stringify(args)}`;
+    const existing = this.flights.get(key);
+    if (existing) {
+      counters.coalesced++;
+      // The shared query may have started before this request's latest write
+      markPossiblyStale('coalesced');
+      return existing;
+    }
+
+    counters.executions++;
+    const flight = Promise.resolve()
+      .then(fn)
+      .finally(() => {
+        if (this.flights.get(key) === flight) {
+          this.flights.delete(key);
+        }
+      });
+    this.flights.set(key, flight);
+    return flight;
+  }
+
+  clear() {
+    this.flights.clear();
+  }
+
+  stats() {
+    return {
+      name: this.name,
+      enabled,
+      in_flight: this.flights.size,
+      methods: [...this.counters.entries()].map(([method, counters]) => ({
+        method,
+        ...counters,
+        saved_rate: counters.calls > 0 ? counters.coalesced / counters.calls : 0
+      }))
+    };
+  }
+}
+
+module.exports = { SingleFlight };
@@ -0,0 +1,128 @@
+const logger = require('./logger');
+
+// Startup phase tracking and readiness.
+//
+// The server binds its port before touching the database, then runs the
+// startup phases (migrations, pool warm-up, cache warm-up) in the background.
+// Each phase is timed and logged, and /ready reports 503 until they are done,
+// while /health answers immediately so a spun-down instance wakes as fast as
+// possible. API requests arriving before readiness wait for it (up to
+// STARTUP_WAIT_MS) instead of racing the migrations.
+//
+//   STARTUP_WAIT_MS  how long an early API request waits for readiness (default 30000)
+
+const waitMs = process.env.STARTUP_WAIT_MS !== undefined
+  ? parseInt(process.env.STARTUP_WAIT_MS, 10)
+  : 30000;
+
+const bootStartedAt = Date.now();
+const phases = [];
+let state = 'starting';
+let readyAt = null;
+let failure = null;
+
+let resolveReady;
+let rejectReady;
+const readyPromise = new Promise((resolve, reject) => {
+  resolveReady = resolve;
+  rejectReady = reject;
+});
+// Nobody may be waiting when startup fails; the failure is reported by the caller
+readyPromise.catch(() => {});
+
+// Run and time one startup phase. Optional phases log their error and carry on
+const phase = async (name, fn, { optional = false } = {}) => {
+  const start = Date.now();
+  const entry = { name, status: 'running', duration_ms: null };
+  phases.push(entry);
+
+  try {
+    const result = await fn();
+    entry.status = 'done';
+    entry.duration_ms = Date.now() - start;
+    logger.info('Startup phase complete', { phase: name, duration_ms: entry.duration_ms });
+    return result;
+  } catch (error) {
+    entry.status = 'failed';
+    entry.duration_ms = Date.now() - start;
+    if (!optional) {
+      throw error;
+    }
+    logger.warn('Optional startup phase failed', { phase: name, duration_ms: entry.duration_ms, error });
+    return undefined;
+  }
+};
+
+const markReady = () => {
+  // Shutdown began before startup finished
+  if (state !== 'starting') {
+    return;
+  }
+  state = 'ready';
+  readyAt = Date.now();
+  logger.info('Server ready', {
+    startup_ms: readyAt - bootStartedAt,
+    uptime_ms: Math.round(process.uptime() * 1000),
+    phases: phases.map(({ name, duration_ms }) => ({ name, duration_ms }))
+  });
+  resolveReady();
+};
+
+const markFailed = (error) => {
+  state = 'failed';
+  failure = error;
+  rejectReady(error);
+};
+
+// Shutting down: /ready goes back to 503 while in-flight requests finish
+const markDraining = () => {
+  state = 'draining';
+};
+
+const isReady = () => state === 'ready';
+
+const status = () => ({
+  state,
+  startup_ms: readyAt ? readyAt - bootStartedAt : Date.now() - bootStartedAt,
+  phases: phases.map(entry => ({ ...entry })),
+  error: failure ? failure.message : undefined
+});
+
+// Express middleware holding requests until startup completes
+const waitUntilReady = async (req, res, next) => {
+  if (state === 'ready' || state === 'draining') {
+    return next();
+  }
+
+  let timer;
+  const timeout = new Promise((resolve) => {
+    timer = setTimeout(resolve, waitMs, 'timeout');
+  });
+
+  try {
+    const outcome = await Promise.race([readyPromise, timeout]);
+    if (outcome !== 'timeout') {
+      return next();
+    }
+  } catch (error) {
+    // startup failed; fall through to 503
+  } finally {
+    clearTimeout(timer);
+  }
+
+  res.set('Retry-After', '5');
+  res.status(503).json({
+    success: false,
+    error: 'Server is starting up, please retry shortly'
+  });
+};
+
+module.exports = {
+  phase,
+  markReady,
+  markFailed,
+  markDraining,
+  isReady,
+  status,
+  waitUntilReady
+};
@@ -0,0 +1,46 @@
+const TableVersion = require('../models/TableVersion');
+const logger = require('./logger');
+
+// Periodically fold the table_version_deltas rows written since the last run,
+// so reading a version keeps summing a handful of rows however many writes
+// there were. Runs in one process per instance (cluster worker 0); concurrent
+// runs on several instances are harmless.
+//
+//   TABLE_VERSION_COMPACT_MS  compaction interval (default 10000, 0 disables)
+
+const intervalMs = process.env.TABLE_VERSION_COMPACT_MS !== undefined
+  ? parseInt(process.env.TABLE_VERSION_COMPACT_MS, 10)
+  : 10000;
+
+let timer = null;
+let running = false;
+
+const compact = async () => {
+  if (running) {
+    return;
+  }
+  running = true;
+
+  try {
+    await TableVersion.compact();
+  } catch (error) {
+    logger.error('Error compacting table versions', error);
+  } finally {
+    running = false;
+  }
+};
+
+const start = () => {
+  if (timer || !intervalMs) {
+    return;
+  }
+  timer = setInterval(compact, intervalMs);
+  timer.unref();
+};
+
+const stop = () => {
+  clearInterval(timer);
+  timer = null;
+};
+
+module.exports = { start, stop, compact };
@@ -0,0 +1,166 @@
+const { Worker } = require('worker_threads');
+const logger = require('./logger');
+
+// Fixed-size pool of worker threads for CPU-bound tasks, with a bounded queue.
+//
+// Tasks are posted to an idle worker or queued; once maxQueue tasks are
+// waiting, run() rejects immediately with code 'QUEUE_FULL' so callers can
+// shed load instead of building an unbounded backlog. Workers that crash are
+// replaced and their in-flight task is rejected. Workers are only ref'd while
+// running a task, so an idle pool never keeps the process alive.
+//
+// The worker script receives { id, payload } messages and must reply with
+// { id, result } or { id, error }.
+
+class WorkerPool {
+  constructor({ name, filename, size = 2, maxQueue = 100 }) {
+    this.name = name;
+    this.filename = filename;
+    this.size = Math.max(1, size);
+    this.maxQueue = maxQueue;
+    this.workers = [];
+    this.idle = [];
+    this.queue = [];
+    this.tasks = new Map();
+    this.nextId = 1;
+    this.completed = 0;
+    this.failed = 0;
+    this.rejected = 0;
+    this.totalRunMs = 0;
+    this.totalWaitMs = 0;
+    this.closed = false;
+  }
+
+  // Workers are started on first use, so an unused pool costs nothing at boot
+  start() {
+    while (this.workers.length < this.size) {
+      this.spawn();
+    }
+  }
+
+  spawn() {
+    const worker = new Worker(this.filename);
+    worker.currentTask = null;
+
+    worker.on('message', ({ id, result, error }) => {
+      const task = this.tasks.get(id);
+      this.tasks.delete(id);
+      worker.currentTask = null;
+      worker.unref();
+      if (task) {
+        this.totalRunMs += Date.now() - task.startedAt;
+        if (error) {
+          this.failed++;
+          task.reject(new Error(error));
+        } else {
+          this.completed++;
+          task.resolve(result);
+        }
+      }
+      this.release(worker);
+    });
+
+    worker.on('error', (error) => {
+      logger.error('Worker thread crashed', { pool: this.name, error });
+      this.replace(worker, error);
+    });
+
+    worker.on('exit', (code) => {
+      if (!this.closed && this.workers.includes(worker)) {
+        this.replace(worker, new Error(`Worker exited with code ${code}`));
+      }
+    });
+
+    worker.unref();
+    this.workers.push(worker);
+    this.idle.push(worker);
+  }
+
+  replace(worker, error) {
+    if (!this.workers.includes(worker)) {
+      return;
+    }
+    this.workers = this.workers.filter(entry => entry !== worker);
+    this.idle = this.idle.filter(entry => entry !== worker);
+    if (worker.currentTask) {
+      this.tasks.delete(worker.currentTask.id);
+      this.failed++;
+      worker.currentTask.reject(error);
+    }
+    if (!this.closed) {
+      this.spawn();
+      this.drain();
+    }
+  }
+
+  release(worker) {
+    this.idle.push(worker);
+    this.drain();
+  }
+
+  // Hand queued tasks to idle workers
+  drain() {
+    while (this.idle.length > 0 && this.queue.length > 0) {
+      const worker = this.idle.shift();
+      const task = this.queue.shift();
+      this.dispatch(worker, task);
+    }
+  }
+
+  dispatch(worker, task) {
+    task.startedAt = Date.now();
+    this.totalWaitMs += task.startedAt - task.queuedAt;
+    worker.currentTask = task;
+    worker.ref();
+    this.tasks.set(task.id, task);
+    worker.postMessage({ id: task.id, payload: task.payload });
+  }
+
+  // Run a task on the pool; resolves with the worker's result
+  run(payload) {
+    if (this.closed) {
+      return Promise.reject(new Error(`Worker pool ${this.name} is closed`));
+    }
+    this.start();
+
+    if (this.idle.length === 0 && this.queue.length >= this.maxQueue) {
+      this.rejected++;
+      const error = new Error(`Worker pool ${this.name} queue is full`);
+      error.code = 'QUEUE_FULL';
+      return Promise.reject(error);
+    }
+
+    return new Promise((resolve, reject) => {
+      const task = { id: this.nextId++, payload, resolve, reject, queuedAt: Date.now() };
+      this.queue.push(task);
+      this.drain();
+    });
+  }
+
+  stats() {
+    const finished = this.completed + this.failed;
+    return {
+      name: this.name,
+      workers: this.workers.length,
+      busy: this.workers.length - this.idle.length,
+      queue_depth: this.queue.length,
+      max_queue: this.maxQueue,
+      completed: this.completed,
+      failed: this.failed,
+      rejected: this.rejected,
+      mean_run_ms: finished > 0 ? this.totalRunMs / finished : 0,
+      mean_wait_ms: finished > 0 ? this.totalWaitMs / finished : 0
+    };
+  }
+
+  async close() {
+    this.closed = true;
+    const error = new Error(`Worker pool ${this.name} is closed`);
+    this.queue.splice(0).forEach(task => task.reject(error));
+    await Promise.all(this.workers.map(worker => worker.terminate()));
+    this.workers = [];
+    this.idle = [];
+  }
+}
+
+module.exports = { WorkerPool };
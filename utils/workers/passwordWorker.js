@@ -0,0 +1,27 @@
+const { parentPort } = require('worker_threads');
+const crypto = require('crypto');
+
+// Worker thread for utils/password.js: runs scrypt key derivation off the
+// main event loop. Messages are { id, payload: { op, ... } }.
+
+const hash = ({ password, salt, N, r, p, keyLength }) => {
+  const maxmem = 256 * N * r;
+  return crypto
+    .scryptSync(password, Buffer.from(salt, 'base64'), keyLength, { N, r, p, maxmem })
+    .toString('base64');
+};
+
+const verify = ({ password, salt, N, r, p, expected }) => {
+  const expectedKey = Buffer.from(expected, 'base64');
+  const derived = Buffer.from(hash({ password, salt, N, r, p, keyLength: expectedKey.length }), 'base64');
+  return crypto.timingSafeEqual(derived, expectedKey);
+};
+
+parentPort.on('message', ({ id, payload }) => {
+  try {
+    const result = payload.op === 'verify' ? verify(payload) : hash(payload);
+    parentPort.postMessage({ id, result });
+  } catch (error) {
+    parentPort.postMessage({ id, error: error.message });
+  }
+});